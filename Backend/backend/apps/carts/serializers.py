@@ -41,14 +41,14 @@ class CartSerializer(serializers.ModelSerializer):
         fields = [
             "id",
             "user",
-            "guest",
+            "guest_id",
             "created_at",
             "updated_at",
             "items",
             "total_items",
             "total_amount",
         ]
-        read_only_fields = ["id", "created_at", "updated_at", "items", "total_items", "total_amount"]
+        read_only_fields = ["id", "guest_id", "created_at", "updated_at", "items", "total_items", "total_amount"]
 
     def get_total_items(self, obj):
         return sum(item.quantity for item in obj.items.all())
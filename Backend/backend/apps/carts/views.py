@@ -12,6 +12,7 @@ from django.contrib.auth import get_user_model
 
 from .models import Cart, CartItem
 from .serializers import CartSerializer, CartItemSerializer
+from apps.core import metrics
 from apps.core.permissions import IsOwnerOrReadOnly
 from apps.auth_app.models import Guest  # your existing Guest model
 
@@ -26,14 +27,14 @@ class CartViewSet(viewsets.ModelViewSet):
       - POST /api/carts/current/add_item/
     But here we keep a generic ViewSet.
     """
-    queryset = Cart.objects.select_related("user", "guest").all()
+    queryset = Cart.objects.select_related("user").all()
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
 
     def get_queryset(self):
         user = self.request.user
         if user.is_authenticated:
-            return Cart.objects.filter(user=user).select_related("user", "guest")
+            return Cart.objects.filter(user=user).select_related("user")
         # Guests usually use other endpoints (current cart via guest_id)
         return Cart.objects.none()
 
@@ -55,7 +56,7 @@ class CartViewSet(viewsets.ModelViewSet):
                 session_token=guest_id,
                 defaults={"expires_at": timezone.now() + timezone.timedelta(days=7)},
             )
-            cart, _ = Cart.objects.get_or_create(guest=guest)
+            cart, _ = Cart.objects.get_or_create(guest_id=guest.session_token)
             return cart, guest_id
 
         # No user, no guest -> create a new guest
@@ -64,7 +65,7 @@ class CartViewSet(viewsets.ModelViewSet):
             session_token=new_guest_id,
             expires_at=timezone.now() + timezone.timedelta(days=7),
         )
-        cart = Cart.objects.create(guest=guest)
+        cart = Cart.objects.create(guest_id=guest.session_token)
         return cart, new_guest_id
 
     @action(detail=False, methods=["get"], url_path="current")
@@ -103,6 +104,7 @@ class CartViewSet(viewsets.ModelViewSet):
         if not created:
             item.quantity += quantity
             item.save()
+        metrics.CART_ITEMS_ADDED.inc()
 
         data = CartSerializer(cart).data
         if guest_id:
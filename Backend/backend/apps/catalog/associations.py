@@ -0,0 +1,166 @@
+# apps/catalog/associations.py
+"""
+"Frequently bought together" from real purchases, for product pages.
+
+rebuild() streams the lines of purchased orders (paid, shipped or
+delivered) sorted by order, turns each order into a basket of distinct
+products and counts, in one pass:
+
+- how many baskets hold each product,
+- how many hold each pair of products: a sparse upper-triangular
+  co-occurrence matrix, kept as one Counter keyed by the pair packed
+  into an int. Products get dense int ids as they are first seen, so
+  nothing in the counters is a UUID.
+
+Pair keys are counted in large chunks through Counter.update(), which
+does the tallying in C. Baskets over `max_basket` products (bulk B2B
+orders, say) count for their products but add no pairs, which would
+grow with the square of their size.
+
+Every pair seen in at least `min_orders` baskets is scored by cosine,
+together / sqrt(a * b), or lift, together * baskets / (a * b), and each
+product keeps its `top_k` best neighbours in ProductAssociation. The
+table is replaced in one transaction; the product page reads it with a
+single lookup on the (product, rank) index, see bought_together().
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import combinations, groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+
+from apps.orders.models import PURCHASED_STATUSES, OrderItem
+
+from .models import ProductAssociation
+
+
+METRICS = ("cosine", "lift")
+
+# Pair (a, b), a < b, is counted under a << _SHIFT | b.
+_SHIFT = 32
+_MASK = (1 << _SHIFT) - 1
+# Pair keys buffered before each Counter.update().
+_CHUNK = 200_000
+
+
+class Counts:
+    """Basket and co-occurrence counts over dense product ids."""
+
+    def __init__(self):
+        self.products: List = []          # dense id -> product id
+        self.positions: Dict = {}         # product id -> dense id
+        self.baskets = 0
+        self.items = Counter()            # dense id -> baskets holding it
+        self.pairs = Counter()            # packed pair -> baskets holding both
+
+    def pair(self, key: int):
+        return key >> _SHIFT, key & _MASK
+
+
+def count_baskets(rows: Iterable, max_basket: int = 50) -> Counts:
+    """Counts from (order id, product id) rows sorted by order id."""
+    counts = Counts()
+    positions, products = counts.positions, counts.products
+    items, pairs = [], []
+
+    for _, lines in groupby(rows, key=itemgetter(0)):
+        basket = set()
+        for _, product_id in lines:
+            position = positions.get(product_id)
+            if position is None:
+                position = positions[product_id] = len(products)
+                products.append(product_id)
+            basket.add(position)
+
+        counts.baskets += 1
+        items.extend(basket)
+        if 1 < len(basket) <= max_basket:
+            pairs.extend(a << _SHIFT | b for a, b in combinations(sorted(basket), 2))
+            if len(pairs) >= _CHUNK:
+                counts.pairs.update(pairs)
+                pairs.clear()
+        if len(items) >= _CHUNK:
+            counts.items.update(items)
+            items.clear()
+
+    counts.items.update(items)
+    counts.pairs.update(pairs)
+    return counts
+
+
+def neighbours(counts: Counts, metric: str = "cosine", top_k: int = 10, min_orders: int = 2) -> Dict[int, list]:
+    """{dense id: [(score, together, dense id), ...] best first}."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {METRICS}.")
+    items, baskets = counts.items, counts.baskets
+    candidates = defaultdict(list)
+    for key, together in counts.pairs.items():
+        if together < min_orders:
+            continue
+        a, b = counts.pair(key)
+        if metric == "lift":
+            score = together * baskets / (items[a] * items[b])
+        else:
+            score = together / math.sqrt(items[a] * items[b])
+        candidates[a].append((score, together, b))
+        candidates[b].append((score, together, a))
+    return {a: heapq.nlargest(top_k, rows) for a, rows in candidates.items()}
+
+
+def purchased_rows(chunk_size: int = 20_000):
+    """(order id, product id) of every purchased order line, by order."""
+    return (
+        OrderItem.objects
+        .filter(order__status__in=PURCHASED_STATUSES)
+        .order_by("order_id")
+        .values_list("order_id", "product_variant__product_id")
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def rebuild(metric: str = "cosine", top_k: int = 10, min_orders: int = 2,
+            max_basket: int = 50, batch_size: int = 5000) -> dict:
+    """Recount from the orders and replace ProductAssociation; stats."""
+    counts = count_baskets(purchased_rows(), max_basket=max_basket)
+    top = neighbours(counts, metric=metric, top_k=top_k, min_orders=min_orders)
+
+    products = counts.products
+    written = 0
+    with transaction.atomic():
+        ProductAssociation.objects.all().delete()
+        batch = []
+        for a, rows in top.items():
+            for rank, (score, together, b) in enumerate(rows, start=1):
+                batch.append(ProductAssociation(
+                    product_id=products[a],
+                    related_id=products[b],
+                    rank=rank,
+                    score=round(score, 6),
+                    orders=together,
+                ))
+            if len(batch) >= batch_size:
+                ProductAssociation.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        ProductAssociation.objects.bulk_create(batch)
+        written += len(batch)
+
+    return {
+        "baskets": counts.baskets,
+        "products": len(products),
+        "pairs": len(counts.pairs),
+        "rows": written,
+    }
+
+
+def bought_together(product_id) -> List[ProductAssociation]:
+    """A product's published neighbours, best first, with their cards."""
+    return list(
+        ProductAssociation.objects
+        .filter(product_id=product_id, related__card__is_published=True)
+        .select_related("related__card")
+        .order_by("rank")
+    )
@@ -0,0 +1,110 @@
+# apps/catalog/availability.py
+"""
+Which color/size combinations of a product can be bought, as a compact
+matrix for the product page:
+
+    {
+        "product": "<uuid>",
+        "colors": [{"slug": "black", "name": "Black", "hex_code": "#000000"}, ...],
+        "sizes": [{"slug": "9", "name": "9"}, ...],
+        "matrix": [                       # one row per color, one cell per size
+            [{"variant": "<uuid>", "price": "99.99", "stock": "low"}, null, ...],
+            ...
+        ],
+    }
+
+`stock` is a bucket, not the count: "out", "low" (up to
+CATALOG_LOW_STOCK) or "in". The payload is built with one query and
+kept in the catalog cache per product, dropped when the product's
+variants change (see signals.py), so the frontend can poll it with
+If-None-Match and mostly get 304s.
+"""
+import hashlib
+import json
+from decimal import Decimal
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+
+from . import cache as response_cache
+from .models import Product, ProductVariant
+
+
+PAYLOAD_PREFIX = "catalog:availability:"
+
+
+def stock_bucket(in_stock: int) -> str:
+    if in_stock <= 0:
+        return "out"
+    if in_stock <= getattr(settings, "CATALOG_LOW_STOCK", 5):
+        return "low"
+    return "in"
+
+
+def _better(cell: dict, other: dict) -> bool:
+    # Duplicate color/size variants: prefer in stock, then cheaper.
+    return (cell["stock"] == "out", Decimal(cell["price"])) < (other["stock"] == "out", Decimal(other["price"]))
+
+
+def build(product_id) -> Optional[dict]:
+    """The availability payload, or None if the product doesn't exist."""
+    rows = list(
+        ProductVariant.objects
+        .filter(product_id=product_id)
+        .order_by("color__name", "pk")
+        .values_list(
+            "pk", "price", "sale_price", "in_stock",
+            "color__slug", "color__name", "color__hex_code",
+            "size__slug", "size__name", "size__sort_order",
+        )
+    )
+    if not rows and not Product.objects.filter(pk=product_id).exists():
+        return None
+
+    colors, sizes, cells = {}, {}, {}
+    for pk, price, sale_price, in_stock, color, color_name, hex_code, size, size_name, sort_order in rows:
+        colors.setdefault(color, {"slug": color, "name": color_name, "hex_code": hex_code})
+        sizes.setdefault(size, (sort_order, size_name))
+        cell = {
+            "variant": str(pk),
+            "price": str(sale_price if sale_price is not None else price),
+            "stock": stock_bucket(in_stock),
+        }
+        current = cells.get((color, size))
+        if current is None or _better(cell, current):
+            cells[(color, size)] = cell
+
+    size_slugs = sorted(sizes, key=lambda slug: sizes[slug])
+    return {
+        "product": str(product_id),
+        "colors": list(colors.values()),
+        "sizes": [{"slug": slug, "name": sizes[slug][1]} for slug in size_slugs],
+        "matrix": [
+            [cells.get((color, size)) for size in size_slugs]
+            for color in colors
+        ],
+    }
+
+
+def get(product_id) -> Tuple[Optional[dict], Optional[str]]:
+    """(payload, ETag) from the cache, built on a miss; (None, None) if
+    the product doesn't exist."""
+    cache = response_cache.get_cache() if response_cache.is_enabled() else None
+    key = f"{PAYLOAD_PREFIX}{product_id}"
+    if cache is not None:
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+
+    data = build(product_id)
+    if data is None:
+        return None, None
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+    entry = (data, f'"{digest}"')
+    if cache is not None:
+        cache.set(key, entry, getattr(settings, "CATALOG_CACHE_TIMEOUT", 300))
+    return entry
+
+
+def invalidate(product_ids: Iterable) -> None:
+    response_cache.get_cache().delete_many([f"{PAYLOAD_PREFIX}{pk}" for pk in product_ids])
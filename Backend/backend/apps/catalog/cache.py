@@ -0,0 +1,236 @@
+# apps/catalog/cache.py
+"""
+Read-through response cache for the catalog API.
+
+A cached response is keyed by the view, action, object pk, host and the
+normalized query string, plus the current version tag of every model
+the response renders. Writing a model bumps only that model's tag
+(from post_save/post_delete, see signals.py), so exactly the entries
+that depend on it stop matching and expire on their own. Nothing is
+ever flushed.
+
+Tags are bumped in the process that made the write, so every worker
+must share the cache: Redis, Memcached or the database cache in
+production. LocMemCache only suits a single process (development,
+tests); `manage.py check --deploy` rejects it (see checks.py).
+
+The same views answer conditional GETs. The ETag comes from
+MAX(updated_at) and COUNT(*) of the rendered models (the count catches
+deletes), memoized under the version tags, so a revalidation that
+matches gets its 304 without touching the DB or the serializers.
+Last-Modified is the time of the latest tag bump instead: bulk writes
+and update() leave updated_at alone but do bump the tag.
+"""
+import hashlib
+import time
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from apps.core import metrics
+
+
+TAG_PREFIX = "catalog:tag:"
+RESPONSE_PREFIX = "catalog:resp:"
+FINGERPRINT_PREFIX = "catalog:fingerprint:"
+
+
+def get_cache():
+    return caches[getattr(settings, "CATALOG_CACHE_ALIAS", "default")]
+
+
+def is_enabled() -> bool:
+    return getattr(settings, "CATALOG_RESPONSE_CACHE", True)
+
+
+def conditional_get_enabled() -> bool:
+    return getattr(settings, "CATALOG_CONDITIONAL_GET", True)
+
+
+def tag_key(model) -> str:
+    return f"{TAG_PREFIX}{model._meta.label_lower}"
+
+
+def _new_version() -> int:
+    # The time of the bump (or of the tag's creation), in ns. A tag that
+    # was evicted never comes back with a version an old entry was stored
+    # under, and the newest version doubles as Last-Modified.
+    return time.time_ns()
+
+
+# ---------- Version tags ----------
+
+def get_versions(models: Iterable) -> list:
+    cache = get_cache()
+    keys = [tag_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model) -> None:
+    cache = get_cache()
+    key = tag_key(model)
+    # Never backwards, even if the clock is.
+    cache.set(key, max(_new_version(), (cache.get(key) or 0) + 1), timeout=None)
+
+
+# ---------- Validators ----------
+
+def last_modified(versions: Iterable) -> Optional[int]:
+    """
+    The second of the latest tag bump, or None when it is not reliable.
+
+    HTTP dates have one-second resolution: a bump later in the current
+    second would keep the same Last-Modified, and a client holding the
+    earlier response would get a wrong 304. So none is sent until that
+    second has passed (clients then revalidate by ETag).
+    """
+    versions = [version for version in versions if version is not None]
+    if not versions:
+        return None
+    latest = max(versions) // 10 ** 9
+    return latest if latest < int(time.time()) else None
+
+
+def get_validators(models: Iterable) -> Tuple[Optional[int], str]:
+    """
+    (latest tag bump as a timestamp or None, fingerprint) across `models`.
+
+    The fingerprint runs one aggregate per model the first time a set
+    of versions is seen; after that it is a cache read until one of the
+    models is written.
+    """
+    models = list(models)
+    cache = get_cache()
+    versions = get_versions(models)
+    key = FINGERPRINT_PREFIX + _digest(
+        *(model._meta.label_lower for model in models),
+        *(str(version) for version in versions),
+    )
+    fingerprint = cache.get(key)
+    if fingerprint is None:
+        stamps = []
+        for model in models:
+            row = model.objects.aggregate(latest=Max("updated_at"), count=Count("pk"))
+            latest = row["latest"]
+            stamps.append((latest.timestamp() if latest else None, row["count"]))
+        fingerprint = _digest(*(f"{stamp}:{count}" for stamp, count in stamps))
+        timeout = getattr(settings, "CATALOG_CACHE_TIMEOUT", 300)
+        cache.set(key, fingerprint, timeout)
+    return last_modified(versions), fingerprint
+
+
+# ---------- Stats ----------
+
+def stats() -> dict:
+    """Hits and misses from the catalog_cache_requests_total counter."""
+    hits, misses = (int(value) for value in metrics.cache_lookups(metrics.collect()))
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
+
+
+# ---------- Responses ----------
+
+def normalized_query(request) -> str:
+    """Query string with params sorted by name (values keep their order)."""
+    params = request.query_params
+    return "&".join(
+        f"{key}={value}"
+        for key in sorted(params)
+        for value in params.getlist(key)
+    )
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _request_parts(view, request) -> list:
+    return [
+        view.basename,
+        view.action,
+        str(view.kwargs.get(view.lookup_url_kwarg or view.lookup_field, "")),
+        request.build_absolute_uri("/"),
+        request.accepted_renderer.format,
+        normalized_query(request),
+    ]
+
+
+def response_key(view, request, models) -> str:
+    digest = _digest(
+        *_request_parts(view, request),
+        *(str(version) for version in get_versions(models)),
+    )
+    return f"{RESPONSE_PREFIX}{view.basename}:{digest}"
+
+
+def response_etag(view, request, fingerprint: str) -> str:
+    return '"%s"' % _digest(*_request_parts(view, request), fingerprint)
+
+
+class CachedResponseMixin:
+    """
+    Serve `list` and `retrieve` through the response cache, with ETag
+    and Last-Modified headers and 304s for matching revalidations.
+
+    `cache_models` must name every model the response renders; a write
+    to any of them invalidates the cached entries of this view.
+    """
+
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not conditional_get_enabled():
+            return self._cached_response(handler, request, *args, **kwargs)
+
+        last_modified, fingerprint = get_validators(self.cache_models)
+        etag = response_etag(self, request, fingerprint)
+
+        # Checked before the cache or the serializers are touched.
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = self._cached_response(handler, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        if not is_enabled():
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = response_key(self, request, self.cache_models)
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.CACHE_REQUESTS.inc(result="hit")
+            return Response(cached)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = getattr(settings, "CATALOG_CACHE_TIMEOUT", 300)
+            cache.set(key, response.data, timeout)
+        metrics.CACHE_REQUESTS.inc(result="miss")
+        return response
@@ -0,0 +1,43 @@
+# apps/catalog/checks.py
+"""
+System checks for the catalog.
+
+The response cache, the conditional-GET validators and the availability
+and wishlist caches are invalidated by writing to the catalog cache
+(version tags, deletes). On a per-process backend such as LocMemCache
+those writes only reach the process that made them: every other worker
+keeps serving its stale entries until they time out. Production needs a
+shared backend (Redis, Memcached, the database cache), so
+`manage.py check --deploy` fails on a per-process one. A deployment
+that really runs a single process can silence catalog.E001.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from . import cache as response_cache
+
+
+PER_PROCESS_BACKENDS = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs=None, **kwargs):
+    if not (response_cache.is_enabled() or response_cache.conditional_get_enabled()):
+        return []
+    alias = getattr(settings, "CATALOG_CACHE_ALIAS", "default")
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend not in PER_PROCESS_BACKENDS:
+        return []
+    return [
+        Error(
+            f"CATALOG_CACHE_ALIAS {alias!r} uses {backend.rsplit('.', 1)[-1]}, "
+            "which is not shared between processes.",
+            hint=(
+                "Catalog cache invalidations only reach the worker that made "
+                "them. Point the alias at a shared cache (Redis, Memcached, "
+                "database), or turn CATALOG_RESPONSE_CACHE and "
+                "CATALOG_CONDITIONAL_GET off."
+            ),
+            id="catalog.E001",
+        )
+    ]
@@ -0,0 +1,333 @@
+# apps/catalog/facet_index.py
+"""
+In-process bitmap index for the product facet filters.
+
+Every product gets a bit position, assigned in (created_at, id) order,
+and every facet value (color, size, gender, brand, category slug) keeps
+a bitmap of the products that have it. A product is indexed under its
+category and every ancestor category, so selecting a parent matches
+the whole subtree. Bitmaps are Python ints, so a
+filter is `OR` within a facet and `AND` across facets, and a facet
+count is int.bit_count(): no joins and no DISTINCT.
+
+Like the search index, it is built lazily per process and kept up to
+date by the catalog signals, which only reach the process that made the
+write. Every index remembers the response-cache version tags of the
+tables it was built from (see TAG_MODELS) and is rebuilt as soon as one
+of them moves, so a write in another worker shows up on the next
+request, before anything rendered from it is cached under the new tags.
+FACET_INDEX_MAX_AGE is a backstop for writes that bump no tag.
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from . import cache as response_cache
+
+
+# Facet name -> (values row field) for products and variants. Category
+# rows carry the materialized path, expanded to ancestor slugs on load.
+PRODUCT_FACET_FIELDS = {
+    "gender": "gender__slug",
+    "brand": "brand__slug",
+    "category": "category__path",
+}
+VARIANT_FACET_FIELDS = {
+    "color": "color__slug",
+    "size": "size__slug",
+}
+FACETS = (*VARIANT_FACET_FIELDS, *PRODUCT_FACET_FIELDS)
+
+
+class FacetIndex:
+    def __init__(self):
+        self.positions: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        self.live = 0
+        self.bitmaps: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self.doc_values: Dict[str, Dict[str, frozenset]] = {}
+        self.built_at = time.monotonic()
+        # Version tags of TAG_MODELS when the build started.
+        self.versions: Optional[list] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    # ---------- Writes ----------
+
+    def set(self, product_id, values: Dict[str, Iterable[str]]) -> None:
+        """Index (or re-index) a product with its values per facet."""
+        product_id = str(product_id)
+        values = {
+            facet: frozenset(v for v in values.get(facet, ()) if v is not None)
+            for facet in FACETS
+        }
+        with self._lock:
+            position = self.positions.get(product_id)
+            if position is None:
+                position = self.positions[product_id] = len(self.ids)
+                self.ids.append(product_id)
+                self.live |= 1 << position
+            else:
+                self._clear(product_id, position)
+            bit = 1 << position
+            for facet, facet_values in values.items():
+                bitmaps = self.bitmaps[facet]
+                for value in facet_values:
+                    bitmaps[value] = bitmaps.get(value, 0) | bit
+            self.doc_values[product_id] = values
+
+    def remove(self, product_id) -> None:
+        product_id = str(product_id)
+        with self._lock:
+            position = self.positions.pop(product_id, None)
+            if position is None:
+                return
+            self._clear(product_id, position)
+            del self.doc_values[product_id]
+            self.ids[position] = None
+            self.live &= ~(1 << position)
+
+    def _clear(self, product_id: str, position: int) -> None:
+        mask = ~(1 << position)
+        for facet, facet_values in self.doc_values.get(product_id, {}).items():
+            bitmaps = self.bitmaps[facet]
+            for value in facet_values:
+                remaining = bitmaps.get(value, 0) & mask
+                if remaining:
+                    bitmaps[value] = remaining
+                else:
+                    bitmaps.pop(value, None)
+
+    # ---------- Reads ----------
+
+    def match(self, selection: Dict[str, Iterable[str]], exclude: Optional[str] = None) -> int:
+        """
+        Bitmap of products matching `selection` ({facet: [values]}):
+        any of the values within a facet, every facet that has values.
+        """
+        result = self.live
+        for facet, values in selection.items():
+            if facet == exclude or not values:
+                continue
+            bitmaps = self.bitmaps[facet]
+            any_of = 0
+            for value in values:
+                any_of |= bitmaps.get(value, 0)
+            result &= any_of
+            if not result:
+                break
+        return result
+
+    def product_ids(
+        self, bitmap: int, offset: int = 0, limit: Optional[int] = None
+    ) -> List[str]:
+        """Product ids in `bitmap`, newest first."""
+        if limit == 0 or not bitmap:
+            return []
+        ids = self.ids
+        bits = bin(bitmap)[2:]
+        top = len(bits) - 1
+        found = []
+        start = bits.find("1")
+        while start != -1:
+            if offset:
+                offset -= 1
+            else:
+                found.append(ids[top - start])
+                if limit is not None and len(found) >= limit:
+                    break
+            start = bits.find("1", start + 1)
+        return found
+
+    def bitmap_of(self, product_ids: Iterable) -> int:
+        """Bitmap for a set of product ids (e.g. search hits)."""
+        positions = self.positions
+        bitmap = 0
+        for product_id in product_ids:
+            position = positions.get(str(product_id))
+            if position is not None:
+                bitmap |= 1 << position
+        return bitmap
+
+    def counts(self, selection: Dict[str, Iterable[str]], within: Optional[int] = None) -> dict:
+        """
+        Product counts per facet value. Each facet is counted with every
+        other facet's selection applied but not its own (multi-select),
+        restricted to the `within` bitmap if given.
+        """
+        base = self.live if within is None else self.live & within
+        data = {}
+        with self._lock:
+            for facet in FACETS:
+                matching = self.match(selection, exclude=facet) & base
+                data[facet] = {
+                    value: count
+                    for value, bitmap in self.bitmaps[facet].items()
+                    if (count := (bitmap & matching).bit_count())
+                }
+            data["total"] = (self.match(selection) & base).bit_count()
+        return data
+
+    def add_rows(self, product_rows: Iterable[tuple], variant_rows: Iterable[tuple]) -> None:
+        """
+        Index rows shaped like ("id", *PRODUCT_FACET_FIELDS) and
+        ("product_id", *VARIANT_FACET_FIELDS); a product value may be a
+        tuple of several values. Products are given bit positions in the
+        order of `product_rows`.
+        """
+        variant_values: Dict[str, Dict[str, set]] = {}
+        for product_id, *values in variant_rows:
+            product_values = variant_values.setdefault(str(product_id), {})
+            for facet, value in zip(VARIANT_FACET_FIELDS, values):
+                product_values.setdefault(facet, set()).add(value)
+
+        for product_id, *values in product_rows:
+            product_values = variant_values.get(str(product_id), {})
+            for facet, value in zip(PRODUCT_FACET_FIELDS, values):
+                product_values[facet] = set(value) if isinstance(value, tuple) else {value}
+            self.set(product_id, product_values)
+
+
+class IndexedResults:
+    """
+    The products of a bitmap, newest first, as a sequence Django's
+    Paginator understands: the count is a popcount and slicing loads
+    only that page from `queryset`, in one query.
+    """
+
+    ordered = True
+
+    def __init__(self, index: FacetIndex, bitmap: int, queryset):
+        self.index = index
+        self.bitmap = bitmap
+        self.queryset = queryset
+
+    def count(self) -> int:
+        return self.bitmap.bit_count()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop, _ = key.indices(self.count())
+        ids = self.index.product_ids(self.bitmap, offset=start, limit=max(stop - start, 0))
+        rows = {str(obj.pk): obj for obj in self.queryset.filter(pk__in=ids)}
+        # Products deleted by another worker are simply skipped.
+        return [rows[pk] for pk in ids if pk in rows]
+
+
+# ---------- Process-wide index ----------
+
+_index: Optional[FacetIndex] = None
+_index_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return getattr(settings, "FACET_INDEX", True)
+
+
+def _category_slugs() -> Dict[str, tuple]:
+    """{category path: slugs of the category and all its ancestors}."""
+    from .models import Category
+
+    slugs = dict(Category.objects.values_list("path", "slug"))
+    return {
+        path: tuple(slugs[p] for p in Category.ancestor_paths(path) if p in slugs)
+        for path in slugs
+    }
+
+
+def _product_rows(product_ids=None):
+    from .models import Product, ProductVariant
+
+    products = Product.objects.order_by("created_at", "id")
+    variants = ProductVariant.objects.order_by()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+        variants = variants.filter(product_id__in=product_ids)
+
+    categories = _category_slugs()
+    product_rows = (
+        (*row[:-1], categories.get(row[-1], ()))
+        for row in products.values_list("id", *PRODUCT_FACET_FIELDS.values()).iterator(chunk_size=2000)
+    )
+    return (
+        product_rows,
+        variants.values_list("product_id", *VARIANT_FACET_FIELDS.values()).iterator(chunk_size=5000),
+    )
+
+
+def tag_models() -> tuple:
+    """
+    Models whose version tags date the index. Product itself is left
+    out, its tag also moves on every popularity update; a product write
+    that changes a facet rebuilds its card, which bumps ProductCard.
+    """
+    from .models import Brand, Category, Color, Gender, ProductCard, ProductVariant, Size
+
+    return (ProductCard, ProductVariant, Category, Gender, Brand, Color, Size)
+
+
+def build_index(versions: Optional[list] = None) -> FacetIndex:
+    index = FacetIndex()
+    index.versions = versions
+    index.add_rows(*_product_rows())
+    return index
+
+
+def _fresh(index: FacetIndex, versions: list) -> bool:
+    max_age = getattr(settings, "FACET_INDEX_MAX_AGE", 300)
+    if max_age is not None and time.monotonic() - index.built_at >= max_age:
+        return False
+    return index.versions == versions
+
+
+def get_index() -> FacetIndex:
+    global _index
+
+    # Read before building: a write during the build leaves the index
+    # with the older tags, so the next request rebuilds again.
+    versions = response_cache.get_versions(tag_models())
+    index = _index
+    if index is not None and _fresh(index, versions):
+        return index
+
+    with _index_lock:
+        if _index is index:
+            _index = build_index(versions)
+    return _index
+
+
+def loaded_index() -> Optional[FacetIndex]:
+    return _index
+
+
+def reset_index() -> None:
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def refresh_products(product_ids: Iterable) -> None:
+    """Re-index the given products in the loaded index (if any)."""
+    index = loaded_index()
+    if index is None:
+        return
+    product_ids = [str(pk) for pk in product_ids]
+    product_rows, variant_rows = _product_rows(product_ids)
+    variant_rows = list(variant_rows)
+    seen = set()
+    rows = []
+    for row in product_rows:
+        seen.add(str(row[0]))
+        rows.append(row)
+    index.add_rows(rows, variant_rows)
+    for product_id in product_ids:
+        if product_id not in seen:
+            index.remove(product_id)
@@ -0,0 +1,100 @@
+# apps/catalog/filters.py
+
+from django.conf import settings
+from django.db.models import F, Func, IntegerField
+from rest_framework import filters
+
+from . import search
+
+
+class SearchRank(Func):
+    """
+    `CASE pk WHEN <id0> THEN 0 WHEN <id1> THEN 1 ... ELSE n END`.
+
+    Built directly instead of through Case/When, which resolves a full
+    lookup per id. The DB evaluates the CASE linearly for every row, so
+    only the top hits get an individual rank; the long tail shares the
+    last one and falls back to the default ordering.
+    """
+    output_field = IntegerField()
+
+    def __init__(self, ids):
+        super().__init__(F("pk"))
+        self.ids = list(ids)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        pk = self.source_expressions[0]
+        pk_sql, params = compiler.compile(pk)
+        prep = pk.output_field.get_db_prep_value
+
+        whens = []
+        for position, value in enumerate(self.ids):
+            whens.append("WHEN %s THEN %s")
+            params.extend([prep(value, connection), position])
+        params.append(len(self.ids))
+        return f"CASE {pk_sql} {' '.join(whens)} ELSE %s END", params
+
+
+class IndexedSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter that answers ?search= from the
+    in-process inverted index instead of LIKE scans.
+
+    Put it after OrderingFilter: results come back in relevance order
+    unless the client asked for an explicit ?ordering=. At most
+    SEARCH_MAX_RESULTS matches are kept; `request.search_truncated` says
+    whether there were more.
+    """
+
+    def get_index(self):
+        return search.get_index()
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        limit = getattr(settings, "SEARCH_MAX_RESULTS", 1000)
+        # One extra hit tells whether the cap cut anything off; the
+        # paginator reports it as `search_truncated`.
+        ids = self.get_index().search(" ".join(terms), limit=limit + 1)
+        request.search_truncated = len(ids) > limit
+        ids = ids[:limit]
+        if not ids:
+            return queryset.none()
+
+        queryset = queryset.filter(pk__in=ids)
+        ordering_param = filters.OrderingFilter.ordering_param
+        if request.query_params.get(ordering_param):
+            return queryset
+
+        rank = SearchRank(ids[: getattr(settings, "SEARCH_RANKED_RESULTS", 100)])
+        return queryset.annotate(search_rank=rank).order_by(
+            "search_rank", *queryset.query.order_by
+        )
+
+
+class CatalogOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that also understands `view.ordering_aliases`, a map
+    from public ?ordering= names to stored columns (price -> min_price).
+    Aliased columns are nullable; NULLs sort last in both directions.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+
+        aliases = getattr(view, "ordering_aliases", {})
+        terms = []
+        for term in ordering:
+            field = term.lstrip("-")
+            if field in aliases:
+                column = F(aliases[field])
+                if term.startswith("-"):
+                    term = column.desc(nulls_last=True)
+                else:
+                    term = column.asc(nulls_last=True)
+            terms.append(term)
+        return queryset.order_by(*terms)
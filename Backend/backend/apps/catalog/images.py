@@ -0,0 +1,231 @@
+# apps/catalog/images.py
+"""
+Resized renditions ("derivatives") of product images.
+
+Each ProductImage gets a manifest in `derivatives`:
+
+    {
+        "source": "products/peg.jpg",
+        "width": 2400, "height": 1600,
+        "renditions": {
+            "webp": [{"name": "products/derivatives/peg-200w.3f9c...webp", "width": 200}, ...],
+            "jpeg": [...],
+        },
+    }
+
+File names carry a hash of their content, so a URL never changes
+meaning and can be served with a far-future, immutable cache header.
+Renditions of an upload are rendered on a background thread once its
+transaction commits (see signals.py and render_later()), never in the
+request itself, and by `manage.py generate_image_derivatives` for
+existing rows or anything a worker didn't get to.
+"""
+import hashlib
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = "products/derivatives"
+
+# Format -> (Pillow format, file extension, MIME type, save options).
+FORMATS = {
+    "avif": ("AVIF", "avif", "image/avif", {"quality": 55}),
+    "webp": ("WEBP", "webp", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def get_widths() -> tuple:
+    return tuple(getattr(settings, "CATALOG_IMAGE_WIDTHS", (200, 400, 800, 1600)))
+
+
+def get_formats() -> tuple:
+    return tuple(getattr(settings, "CATALOG_IMAGE_FORMATS", ("webp", "jpeg")))
+
+
+def is_current(image) -> bool:
+    """True if `image` (a ProductImage) has renditions of its current file."""
+    return bool(image.image) and image.derivatives.get("source") == image.image.name
+
+
+# ---------- Rendering ----------
+
+def _target_widths(source_width: int, widths) -> list:
+    # Never upscale; a source smaller than every width keeps its own.
+    targets = sorted({width for width in widths if width <= source_width})
+    return targets or [source_width]
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    pillow_format, _, _, options = FORMATS[fmt]
+    if fmt == "jpeg" and image.mode != "RGB":
+        # JPEG has no alpha: flatten onto white.
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def render(data: bytes, widths, formats) -> tuple:
+    """
+    Resize and encode image bytes: ((width, height), [(fmt, width, bytes)]).
+    Pure, so it can run in a worker process.
+    """
+    with Image.open(io.BytesIO(data)) as opened:
+        full_size = opened.size
+        largest = max(widths)
+        if opened.width > 2 * largest:
+            # JPEG sources decode straight at a reduced scale (>= 2x the
+            # largest rendition, so the final resample keeps its quality).
+            opened.draft("RGB", (2 * largest, 2 * largest * opened.height // opened.width))
+        decoded_size = opened.size
+        source = ImageOps.exif_transpose(opened)
+        source.load()
+    if source.size != decoded_size:
+        # Rotated by its EXIF orientation.
+        full_size = full_size[::-1]
+    source_width, source_height = full_size
+
+    renditions = []
+    # Largest first, each one resized from the previous rendition rather
+    # than the full-size source: far fewer pixels to resample.
+    resized = source
+    for width in reversed(_target_widths(source_width, widths)):
+        height = max(1, round(source_height * width / source_width))
+        if resized.width != width:
+            resized = resized.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for fmt in formats:
+            renditions.append((fmt, width, _encode(resized, fmt)))
+    renditions.reverse()
+    return (source_width, source_height), renditions
+
+
+def derivative_name(source_name: str, fmt: str, width: int, content: bytes) -> str:
+    stem = posixpath.splitext(posixpath.basename(source_name))[0]
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    return f"{DERIVATIVES_DIR}/{stem}-{width}w.{digest}.{FORMATS[fmt][1]}"
+
+
+def build_manifest(source_name: str, widths=None, formats=None) -> dict:
+    """
+    Render the renditions of a stored image, save any that don't exist
+    yet and return the manifest. Touches the storage, not the database.
+    """
+    widths = get_widths() if widths is None else widths
+    formats = get_formats() if formats is None else formats
+    with default_storage.open(source_name, "rb") as source:
+        data = source.read()
+    (width, height), rendered = render(data, widths, formats)
+
+    renditions = {fmt: [] for fmt in formats}
+    for fmt, rendition_width, content in rendered:
+        name = derivative_name(source_name, fmt, rendition_width, content)
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(content))
+        renditions[fmt].append({"name": name, "width": rendition_width})
+    return {"source": source_name, "width": width, "height": height, "renditions": renditions}
+
+
+def refresh_derivatives(image_id) -> bool:
+    """
+    Build and store the manifest of one ProductImage. Returns False if
+    its file is missing or isn't an image (the original is served then).
+    """
+    from . import cache as response_cache
+    from . import services
+    from .models import ProductImage
+
+    name, product_id = (
+        ProductImage.objects
+        .filter(pk=image_id)
+        .values_list("image", "product_id")
+        .first()
+    ) or (None, None)
+    if not name:
+        return False
+    try:
+        manifest = build_manifest(name)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        logger.warning("No derivatives for %s: %s", name, exc)
+        return False
+
+    # Only if the image wasn't replaced meanwhile. update() sends no
+    # signals, so drop the cached image responses and copy the manifest
+    # onto the product's card here.
+    if ProductImage.objects.filter(pk=image_id, image=name).update(derivatives=manifest):
+        response_cache.bump_version(ProductImage)
+        services.refresh_product_cards([product_id])
+    return True
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def render_later(image_id) -> None:
+    """
+    Queue refresh_derivatives(image_id) on this process's rendering
+    thread and return at once. One thread, so uploads are rendered in
+    order and Pillow never competes with more than one request.
+    """
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-derivatives")
+    _renderer.submit(_render_job, image_id)
+
+
+def _render_job(image_id) -> None:
+    try:
+        refresh_derivatives(image_id)
+    except Exception:
+        # Left for generate_image_derivatives to pick up.
+        logger.exception("Rendering derivatives of image %s failed", image_id)
+    finally:
+        # The thread's own connection; requests never see it.
+        connection.close()
+
+
+# ---------- Serializing ----------
+
+def srcset(image, url) -> dict:
+    """
+    {MIME type: "url 200w, url 400w, ..."} from an image's manifest, for
+    <picture><source type=... srcset=...>. `url` maps a storage name to
+    the URL to emit. Empty if the renditions are missing or stale.
+    """
+    if not is_current(image):
+        return {}
+    return manifest_srcset(image.derivatives, url)
+
+
+def manifest_srcset(manifest: dict, url, source_name=None) -> dict:
+    """
+    srcset() from a bare manifest, e.g. the copy on a ProductCard. With
+    `source_name`, empty unless the manifest was rendered from it.
+    """
+    if not manifest or (source_name is not None and manifest.get("source") != source_name):
+        return {}
+    return {
+        FORMATS[fmt][2]: ", ".join(
+            f"{url(rendition['name'])} {rendition['width']}w" for rendition in renditions
+        )
+        for fmt, renditions in manifest["renditions"].items()
+        if fmt in FORMATS and renditions
+    }
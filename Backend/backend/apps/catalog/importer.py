@@ -0,0 +1,393 @@
+# apps/catalog/importer.py
+"""
+Streaming bulk import of products, variants and collection memberships.
+
+Input is one row per variant (CSV or JSON lines), with the product's
+columns repeated on each of its variants:
+
+    slug, name, brand, category, gender        required, product
+    description, is_published, collections    optional, product
+    sku, price, color, size                    required, variant
+    sale_price, in_stock, weight               optional, variant
+
+`collections` is a "|"-separated list in CSV, a list or that string in
+JSONL. Brands, categories, genders, colors, sizes and collections are
+referenced by slug and resolved from maps loaded once; they must exist.
+
+Rows are read lazily and applied a batch at a time, so memory stays
+flat whatever the size of the feed. Each batch costs a handful of
+queries: one lookup of the batch's existing products and variants, then
+bulk_create for new rows and bulk_update for rows that changed. Rows
+that didn't change are not written. Collection memberships are only
+added, never removed. Bulk writes send no signals, so each batch
+refreshes the derived data (prices, cards, availability, the search and
+facet indexes) for the products it changed itself.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache as response_cache
+from . import availability, facet_index, search, services
+from .models import (
+    Brand,
+    Category,
+    Collection,
+    Color,
+    Gender,
+    Product,
+    ProductCollection,
+    ProductVariant,
+    Size,
+)
+
+
+PRODUCT_FIELDS = ("name", "description", "category_id", "gender_id", "brand_id", "is_published")
+VARIANT_FIELDS = ("product_id", "price", "sale_price", "color_id", "size_id", "in_stock", "weight")
+REQUIRED_COLUMNS = ("slug", "name", "brand", "category", "gender", "sku", "price", "color", "size")
+
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+# Error messages kept for the report; later ones are only counted.
+MAX_ERRORS = 100
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    skipped: int = 0
+    products_created: int = 0
+    products_updated: int = 0
+    variants_created: int = 0
+    variants_updated: int = 0
+    memberships_created: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+# ---------- Reading ----------
+
+def read_rows(stream: io.TextIOBase, fmt: str) -> Iterator[dict]:
+    """
+    Rows from a CSV or JSONL text stream, one at a time. A JSONL line
+    that isn't a JSON object comes through as a RowError, for run() to
+    skip and report like any other bad row.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield RowError(f"line {number}: invalid JSON ({exc.msg})")
+            continue
+        if not isinstance(row, dict):
+            yield RowError(f"line {number}: expected a JSON object")
+            continue
+        yield row
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _decimal(row, key, required=False) -> Optional[Decimal]:
+    value = _text(row.get(key))
+    if not value:
+        if required:
+            raise RowError(f"{key} is required")
+        return None
+    try:
+        number = Decimal(value)
+        if not number.is_finite():
+            # NaN would pass the checks in parse(), and break them (NaN < 0 raises).
+            raise InvalidOperation
+        number = number.quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise RowError(f"invalid {key}: {value!r}")
+    if number < 0:
+        raise RowError(f"{key} must be non-negative")
+    return number
+
+
+def _number(row, key, cast, default):
+    value = _text(row.get(key))
+    if not value:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        raise RowError(f"invalid {key}: {value!r}")
+
+
+# ---------- Importing ----------
+
+class CatalogImporter:
+    """
+    Apply rows to the catalog in batches. With dry_run nothing is
+    written; `on_change` is called with a line per created or changed
+    object either way.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 1000,
+        dry_run: bool = False,
+        on_change: Optional[Callable[[str], None]] = None,
+    ):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.on_change = on_change
+        self.stats = ImportStats()
+        self.touched_models = set()
+        self.maps = {
+            "brand": self._slug_map(Brand),
+            "category": self._slug_map(Category),
+            "gender": self._slug_map(Gender),
+            "color": self._slug_map(Color),
+            "size": self._slug_map(Size),
+            "collection": self._slug_map(Collection),
+        }
+
+    @staticmethod
+    def _slug_map(model) -> Dict[str, object]:
+        return dict(model.objects.order_by().values_list("slug", "pk"))
+
+    def run(self, rows: Iterable[dict]) -> ImportStats:
+        batch = []
+        for line, row in enumerate(rows, start=1):
+            self.stats.rows += 1
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                batch.append(self.parse(row))
+            except RowError as exc:
+                self.stats.skipped += 1
+                if len(self.stats.errors) < MAX_ERRORS:
+                    self.stats.errors.append(f"row {line}: {exc}")
+                continue
+            if len(batch) >= self.batch_size:
+                self.apply(batch)
+                batch = []
+        if batch:
+            self.apply(batch)
+        return self.stats
+
+    def _resolve(self, kind: str, slug: str):
+        try:
+            return self.maps[kind][slug]
+        except KeyError:
+            raise RowError(f"unknown {kind} {slug!r}")
+
+    def parse(self, row: dict) -> dict:
+        missing = [key for key in REQUIRED_COLUMNS if not _text(row.get(key))]
+        if missing:
+            raise RowError(f"missing {', '.join(missing)}")
+
+        product = {
+            "name": _text(row["name"]),
+            "category_id": self._resolve("category", _text(row["category"])),
+            "gender_id": self._resolve("gender", _text(row["gender"])),
+            "brand_id": self._resolve("brand", _text(row["brand"])),
+        }
+        if "description" in row:
+            product["description"] = _text(row["description"])
+        if "is_published" in row:
+            value = row["is_published"]
+            product["is_published"] = (
+                value if isinstance(value, bool) else _text(value).lower() in TRUE_VALUES
+            )
+
+        collections = row.get("collections") or []
+        if isinstance(collections, str):
+            collections = [slug for slug in collections.split("|") if slug.strip()]
+        collection_ids = [self._resolve("collection", _text(slug)) for slug in collections]
+
+        price = _decimal(row, "price", required=True)
+        sale_price = _decimal(row, "sale_price")
+        if sale_price is not None and sale_price > price:
+            raise RowError("sale_price cannot be greater than price")
+
+        variant = {
+            "price": price,
+            "sale_price": sale_price,
+            "color_id": self._resolve("color", _text(row["color"])),
+            "size_id": self._resolve("size", _text(row["size"])),
+            "in_stock": _number(row, "in_stock", int, 0),
+            "weight": _number(row, "weight", float, 0.0),
+        }
+        return {
+            "slug": _text(row["slug"]),
+            "product": product,
+            "collections": collection_ids,
+            "sku": _text(row["sku"]),
+            "variant": variant,
+        }
+
+    def apply(self, batch: List[dict]) -> None:
+        # Later rows win when a slug or sku repeats within the batch.
+        products, variants, memberships = {}, {}, set()
+        for row in batch:
+            products.setdefault(row["slug"], {}).update(row["product"])
+            variants[row["sku"]] = (row["slug"], row["variant"])
+            memberships.update((row["slug"], pk) for pk in row["collections"])
+
+        with transaction.atomic():
+            self.touched_models = set()
+            product_ids, written_products = self._upsert_products(products)
+            changed_products = written_products | self._upsert_variants(variants, product_ids)
+            self._add_memberships(memberships, product_ids)
+            if self.dry_run:
+                return
+
+            # What the signals do for single saves (see signals.py): derived
+            # rows in the transaction, caches and indexes once it commits.
+            if changed_products:
+                services.refresh_product_prices(changed_products)
+                services.refresh_product_cards(changed_products)
+            touched = frozenset(self.touched_models)
+            transaction.on_commit(
+                lambda: self._after_commit(touched, written_products, changed_products)
+            )
+
+    @staticmethod
+    def _after_commit(touched_models, written_products, changed_products) -> None:
+        # Bulk writes send no signals.
+        for model in touched_models:
+            response_cache.bump_version(model)
+        if not changed_products:
+            return
+        availability.invalidate(changed_products)
+        # This process's search and facet indexes, if loaded.
+        index = search.loaded_index()
+        if index is not None and written_products:
+            index.add_rows(
+                Product.objects.filter(pk__in=written_products).values_list(*search.PRODUCT_ROW_FIELDS)
+            )
+        facet_index.refresh_products(changed_products)
+
+    def _report(self, line: str) -> None:
+        if self.on_change is not None:
+            self.on_change(line)
+
+    def _diff(self, obj, values: dict) -> dict:
+        return {
+            name: (getattr(obj, name), value)
+            for name, value in values.items()
+            if getattr(obj, name) != value
+        }
+
+    def _upsert_products(self, products: Dict[str, dict]):
+        existing = {
+            product.slug: product
+            for product in Product.objects.filter(slug__in=products).only("pk", "slug", *PRODUCT_FIELDS)
+        }
+        now = timezone.now()
+        created, updated, update_fields = [], [], set()
+        for slug, values in products.items():
+            product = existing.get(slug)
+            if product is None:
+                created.append(Product(slug=slug, **values))
+                self._report(f"+ product {slug}")
+                continue
+            diff = self._diff(product, values)
+            if not diff:
+                continue
+            for name, (_, value) in diff.items():
+                setattr(product, name, value)
+            product.updated_at = now
+            update_fields.update(diff)
+            updated.append(product)
+            self._report(f"~ product {slug}: " + ", ".join(
+                f"{name} {old!r} -> {new!r}" for name, (old, new) in diff.items()
+            ))
+
+        if not self.dry_run:
+            Product.objects.bulk_create(created)
+            if updated:
+                Product.objects.bulk_update(updated, [*update_fields, "updated_at"])
+            if created or updated:
+                self.touched_models.add(Product)
+        self.stats.products_created += len(created)
+        self.stats.products_updated += len(updated)
+
+        product_ids = {slug: product.pk for slug, product in existing.items()}
+        product_ids.update((product.slug, product.pk) for product in created)
+        return product_ids, {product.pk for product in (*created, *updated)}
+
+    def _upsert_variants(self, variants: Dict[str, tuple], product_ids: Dict[str, object]):
+        existing = {
+            variant.sku: variant
+            for variant in ProductVariant.objects.filter(sku__in=variants).only("pk", "sku", *VARIANT_FIELDS)
+        }
+        now = timezone.now()
+        created, updated, update_fields = [], [], set()
+        changed = set()
+        for sku, (slug, values) in variants.items():
+            values = {"product_id": product_ids[slug], **values}
+            variant = existing.get(sku)
+            if variant is None:
+                created.append(ProductVariant(sku=sku, **values))
+                self._report(f"+ variant {sku}")
+                continue
+            diff = self._diff(variant, values)
+            if not diff:
+                continue
+            if "product_id" in diff:
+                # Moved to another product: the old one changes too.
+                changed.add(diff["product_id"][0])
+            for name, (_, value) in diff.items():
+                setattr(variant, name, value)
+            variant.updated_at = now
+            update_fields.update(diff)
+            updated.append(variant)
+            self._report(f"~ variant {sku}: " + ", ".join(
+                f"{name} {old!r} -> {new!r}" for name, (old, new) in diff.items()
+            ))
+
+        if not self.dry_run:
+            ProductVariant.objects.bulk_create(created)
+            if updated:
+                ProductVariant.objects.bulk_update(updated, [*update_fields, "updated_at"])
+            if created or updated:
+                self.touched_models.add(ProductVariant)
+        self.stats.variants_created += len(created)
+        self.stats.variants_updated += len(updated)
+
+        changed.update(variant.product_id for variant in (*created, *updated))
+        return changed
+
+    def _add_memberships(self, memberships, product_ids: Dict[str, object]) -> None:
+        if not memberships:
+            return
+        pairs = {(product_ids[slug], collection_id) for slug, collection_id in memberships}
+        existing = set(
+            ProductCollection.objects
+            .filter(product_id__in={product_id for product_id, _ in pairs})
+            .values_list("product_id", "collection_id")
+        )
+        new = pairs - existing
+        if self.on_change is not None:
+            slugs = {product_id: slug for slug, product_id in product_ids.items()}
+            collections = {pk: slug for slug, pk in self.maps["collection"].items()}
+            for product_id, collection_id in sorted(new, key=str):
+                self._report(f"+ collection {collections[collection_id]} <- {slugs[product_id]}")
+        if new and not self.dry_run:
+            ProductCollection.objects.bulk_create(
+                [ProductCollection(product_id=p, collection_id=c) for p, c in new],
+                ignore_conflicts=True,
+            )
+            self.touched_models.add(ProductCollection)
+        self.stats.memberships_created += len(new)
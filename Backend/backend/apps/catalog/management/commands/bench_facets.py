@@ -0,0 +1,183 @@
+# apps/catalog/management/commands/bench_facets.py
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.catalog import facet_index
+from apps.catalog.models import (
+    Brand, Category, Color, Gender, Product, ProductVariant, Size,
+)
+from apps.catalog.views import ProductViewSet
+
+
+COLORS = ["black", "white", "red", "blue", "green", "grey", "pink", "orange"]
+SIZES = ["6", "7", "8", "9", "10", "11", "12", "13"]
+BRANDS = ["nike", "jordan", "acg", "sb", "converse"]
+CATEGORIES = ["running", "lifestyle", "training", "basketball", "trail", "skate"]
+GENDERS = ["men", "women", "kids"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark product facet filtering and facet counts: SQL joins vs the "
+        "bitmap index. Data is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=20_000)
+        parser.add_argument("--variants-per-product", type=int, default=6)
+        parser.add_argument("--queries", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        with transaction.atomic():
+            self.stdout.write(
+                f"Creating {options['products']} synthetic products "
+                f"x {options['variants_per_product']} variants..."
+            )
+            self._seed(rng, options["products"], options["variants_per_product"])
+            queries = self._queries(rng, options["queries"])
+
+            with override_settings(FACET_INDEX=False):
+                orm_list = self._run(queries, self._list)
+                orm_counts = self._run(queries, self._counts)
+
+            facet_index.reset_index()
+            started = time.perf_counter()
+            index = facet_index.get_index()
+            build_secs = time.perf_counter() - started
+
+            index_list = self._run(queries, self._list)
+            index_counts = self._run(queries, self._counts)
+
+            with override_settings(FACET_INDEX=False):
+                mismatches = sum(
+                    self._counts(query) != self._counts_indexed(query)
+                    for query in queries
+                )
+
+            facet_index.reset_index()
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Index build: {build_secs:.2f}s, {len(index)} products")
+        self._report("List, SQL joins", orm_list)
+        self._report("List, bitmap index", index_list)
+        self._report("Counts, SQL", orm_counts)
+        self._report("Counts, bitmap index", index_counts)
+        self.stdout.write(self.style.SUCCESS(
+            f"Mean speedup: list {statistics.mean(orm_list) / statistics.mean(index_list):.1f}x, "
+            f"counts {statistics.mean(orm_counts) / statistics.mean(index_counts):.1f}x"
+        ))
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{mismatches} facet count mismatches"))
+
+    # ---------- Data ----------
+
+    def _seed(self, rng, count, per_product):
+        genders = [
+            Gender.objects.get_or_create(slug=f"bench-{slug}", defaults={"label": slug})[0]
+            for slug in GENDERS
+        ]
+        brands = [Brand.objects.create(name=slug, slug=f"bench-{slug}") for slug in BRANDS]
+        categories = [
+            Category.objects.create(name=slug, slug=f"bench-{slug}") for slug in CATEGORIES
+        ]
+        colors = [
+            Color.objects.create(name=slug, slug=f"bench-{slug}", hex_code="#000000")
+            for slug in COLORS
+        ]
+        sizes = [
+            Size.objects.create(name=slug, slug=f"bench-{slug}", sort_order=int(slug))
+            for slug in SIZES
+        ]
+
+        products = Product.objects.bulk_create([
+            Product(
+                name=f"Bench Product {i}",
+                slug=f"bench-product-{i}",
+                category=rng.choice(categories),
+                gender=rng.choice(genders),
+                brand=rng.choice(brands),
+                is_published=True,
+            )
+            for i in range(count)
+        ], batch_size=5000)
+
+        variants = []
+        for i, product in enumerate(products):
+            for j in range(per_product):
+                variants.append(ProductVariant(
+                    product=product,
+                    sku=f"BENCH-{i}-{j}",
+                    price=Decimal(rng.randint(40, 200)),
+                    color=rng.choice(colors),
+                    size=rng.choice(sizes),
+                    in_stock=rng.randint(0, 20),
+                ))
+            if len(variants) >= 10_000:
+                ProductVariant.objects.bulk_create(variants)
+                variants = []
+        ProductVariant.objects.bulk_create(variants)
+
+    def _queries(self, rng, count):
+        facets = {
+            "color": COLORS, "size": SIZES, "brand": BRANDS,
+            "category": CATEGORIES, "gender": GENDERS,
+        }
+        queries = []
+        for _ in range(count):
+            query = {}
+            for facet in rng.sample(sorted(facets), rng.randint(1, 3)):
+                values = rng.sample(facets[facet], rng.randint(1, 2))
+                query[facet] = ",".join(f"bench-{value}" for value in values)
+            queries.append(query)
+        return queries
+
+    # ---------- Timing ----------
+
+    def _view(self, query, action):
+        view = ProductViewSet()
+        view.request = Request(APIRequestFactory().get("/", query))
+        view.action = action
+        view.format_kwarg = None
+        view.kwargs = {}
+        return view
+
+    def _list(self, query):
+        view = self._view(query, "list")
+        page = view.paginate_queryset(view.filter_queryset(view.get_queryset()))
+        return [product.pk for product in page]
+
+    def _counts(self, query):
+        view = self._view(query, "facets")
+        return view._facets(view.request).data
+
+    def _counts_indexed(self, query):
+        with override_settings(FACET_INDEX=True):
+            return self._counts(query)
+
+    def _run(self, queries, run):
+        times = []
+        for query in queries:
+            started = time.perf_counter()
+            run(query)
+            times.append(time.perf_counter() - started)
+        return times
+
+    def _report(self, label, times):
+        ordered = sorted(times)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        self.stdout.write(
+            f"{label:<22} mean {statistics.mean(times) * 1000:8.2f} ms  "
+            f"p50 {statistics.median(times) * 1000:8.2f} ms  "
+            f"p95 {p95 * 1000:8.2f} ms"
+        )
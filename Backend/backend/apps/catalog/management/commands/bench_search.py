@@ -0,0 +1,153 @@
+# apps/catalog/management/commands/bench_search.py
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.catalog import search
+from apps.catalog.filters import IndexedSearchFilter
+from apps.catalog.models import Brand, Category, Gender, Product
+from apps.catalog.views import ProductViewSet
+
+
+MODELS = [
+    "pegasus", "vomero", "invincible", "structure", "vaporfly", "alphafly",
+    "streakfly", "revolution", "winflo", "infinity", "metcon", "court",
+    "dunk", "blazer", "cortez", "huarache", "presto", "waffle", "killshot",
+]
+ADJECTIVES = [
+    "premium", "lightweight", "breathable", "responsive", "cushioned",
+    "durable", "classic", "retro", "waterproof", "trail", "road", "knit",
+    "leather", "suede", "mesh", "foam", "carbon", "everyday", "racing",
+]
+NOUNS = [
+    "runner", "trainer", "sneaker", "shoe", "boot", "slide", "flat",
+    "spike", "sandal", "mule",
+]
+BRANDS = ["Nike", "Jordan", "ACG", "SB", "Converse"]
+CATEGORIES = ["Running", "Lifestyle", "Training", "Basketball", "Trail", "Skate"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark ?search= on a synthetic catalog: DRF SearchFilter vs the "
+        "inverted index. Data is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--page-size", type=int, default=15)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        page_size = options["page_size"]
+
+        with transaction.atomic():
+            self.stdout.write(f"Creating {options['products']} synthetic products...")
+            self._seed(rng, options["products"])
+            queries = self._queries(rng, options["queries"])
+
+            view = SimpleNamespace(search_fields=ProductViewSet.search_fields)
+            legacy = filters.SearchFilter()
+            legacy_times = self._run(queries, lambda request: legacy.filter_queryset(
+                request, Product.objects.order_by("-created_at"), view,
+            ), page_size)
+
+            started = time.perf_counter()
+            index = search.build_index()
+            build_secs = time.perf_counter() - started
+
+            indexed = IndexedSearchFilter()
+            indexed.get_index = lambda: index
+            indexed_times = self._run(queries, lambda request: indexed.filter_queryset(
+                request, Product.objects.order_by("-created_at"), view,
+            ), page_size)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"Index build: {build_secs:.2f}s, {len(index)} docs, "
+            f"{len(index.postings)} terms"
+        )
+        self._report("SearchFilter (LIKE)", legacy_times)
+        self._report("Inverted index", indexed_times)
+        speedup = statistics.mean(legacy_times) / statistics.mean(indexed_times)
+        self.stdout.write(self.style.SUCCESS(f"Mean speedup: {speedup:.1f}x"))
+
+    def _seed(self, rng, count):
+        gender, _ = Gender.objects.get_or_create(
+            slug="bench-unisex", defaults={"label": "Unisex"},
+        )
+        brands = [
+            Brand.objects.create(name=name, slug=f"bench-{name.lower()}")
+            for name in BRANDS
+        ]
+        categories = [
+            Category.objects.create(name=name, slug=f"bench-{name.lower()}")
+            for name in CATEGORIES
+        ]
+
+        batch = []
+        for i in range(count):
+            words = [rng.choice(MODELS), rng.choice(ADJECTIVES), rng.choice(NOUNS)]
+            name = f"{' '.join(w.title() for w in words)} {i}"
+            description = " ".join(
+                rng.choice(ADJECTIVES + NOUNS + MODELS) for _ in range(rng.randint(8, 20))
+            )
+            batch.append(Product(
+                name=name,
+                slug=f"bench-product-{i}",
+                description=description,
+                brand=rng.choice(brands),
+                category=rng.choice(categories),
+                gender=gender,
+                is_published=True,
+            ))
+            if len(batch) >= 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+
+    def _queries(self, rng, count):
+        queries = []
+        for _ in range(count):
+            kind = rng.random()
+            if kind < 0.4:
+                queries.append(rng.choice(MODELS))
+            elif kind < 0.7:
+                queries.append(f"{rng.choice(MODELS)} {rng.choice(NOUNS)}")
+            elif kind < 0.9:
+                word = rng.choice(MODELS + ADJECTIVES)
+                queries.append(word[: rng.randint(3, len(word))])
+            else:
+                queries.append(f"{rng.choice(ADJECTIVES)} {rng.choice(MODELS)}")
+        return queries
+
+    def _run(self, queries, filter_queryset, page_size):
+        factory = APIRequestFactory()
+        times = []
+        for query in queries:
+            request = Request(factory.get("/", {"search": query}))
+            started = time.perf_counter()
+            queryset = filter_queryset(request)
+            queryset.count()
+            list(queryset.values_list("pk", flat=True)[:page_size])
+            times.append(time.perf_counter() - started)
+        return times
+
+    def _report(self, label, times):
+        ordered = sorted(times)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        self.stdout.write(
+            f"{label:<22} mean {statistics.mean(times) * 1000:8.2f} ms  "
+            f"p50 {statistics.median(times) * 1000:8.2f} ms  "
+            f"p95 {p95 * 1000:8.2f} ms"
+        )
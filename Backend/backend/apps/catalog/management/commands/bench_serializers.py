@@ -0,0 +1,182 @@
+# apps/catalog/management/commands/bench_serializers.py
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.catalog.models import (
+    Brand, Category, Color, Gender, Product, ProductImage, ProductVariant, Size,
+)
+from apps.catalog.serializers.compiled import CompiledSerializer
+from apps.catalog.serializers.ProductVariant import ProductVariantSerializer
+from apps.catalog.serializers.serializers import (
+    ProductImageSerializer,
+    ProductSerializer,
+)
+
+
+COLORS = ["black", "white", "red", "blue", "green"]
+SIZES = ["8", "9", "10", "11", "12"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark rows/second of the DRF serializers vs the compiled "
+        "serializers on a synthetic catalog (created in a transaction "
+        "that is rolled back)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--variants", type=int, default=10_000)
+        parser.add_argument("--variants-per-product", type=int, default=10)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.rounds = options["rounds"]
+        request = Request(APIRequestFactory().get("/api/catalog/products/"))
+        self.context = {"request": request}
+
+        with transaction.atomic():
+            self.stdout.write(f"Creating {options['variants']} synthetic variants...")
+            self._seed(options["variants"], options["variants_per_product"])
+
+            variants = list(
+                ProductVariant.objects.select_related("color", "size").order_by("sku")
+            )
+            images = list(ProductImage.objects.order_by("product_id", "sort_order"))
+            products = list(
+                Product.objects
+                .select_related("category", "gender", "brand")
+                .prefetch_related(
+                    Prefetch(
+                        "variants",
+                        queryset=ProductVariant.objects.select_related("color", "size"),
+                    ),
+                    "images",
+                )
+                .order_by("slug")
+            )
+
+            self._compare("ProductVariantSerializer", ProductVariantSerializer, variants)
+            self._compare_values(variants)
+            self._compare("ProductImageSerializer", ProductImageSerializer, images)
+            self._compare(
+                "ProductSerializer", ProductSerializer, products,
+                unit=f"products ({len(variants)} nested variants)",
+            )
+
+            transaction.set_rollback(True)
+
+    def _seed(self, variant_count, per_product):
+        gender, _ = Gender.objects.get_or_create(
+            slug="bench-unisex", defaults={"label": "Unisex"},
+        )
+        brand = Brand.objects.create(name="Bench", slug="bench-brand")
+        category = Category.objects.create(name="Bench", slug="bench-category")
+        colors = [
+            Color.objects.create(name=c.title(), slug=f"bench-{c}", hex_code="#000000")
+            for c in COLORS
+        ]
+        sizes = [
+            Size.objects.create(name=s, slug=f"bench-{s}", sort_order=int(s))
+            for s in SIZES
+        ]
+
+        products = Product.objects.bulk_create([
+            Product(
+                name=f"Bench Runner {i}",
+                slug=f"bench-runner-{i:06d}",
+                description="Synthetic product for serializer benchmarks.",
+                category=category,
+                gender=gender,
+                brand=brand,
+                is_published=True,
+            )
+            for i in range(-(-variant_count // per_product))
+        ])
+
+        variants, images = [], []
+        for i, product in enumerate(products):
+            for j in range(per_product):
+                if len(variants) >= variant_count:
+                    break
+                variants.append(ProductVariant(
+                    product=product,
+                    sku=f"BENCH-{i:06d}-{j:02d}",
+                    price=Decimal("120.00"),
+                    sale_price=Decimal("99.99") if j % 3 == 0 else None,
+                    color=colors[j % len(colors)],
+                    size=sizes[(j // len(colors)) % len(sizes)],
+                    in_stock=j,
+                    weight=0.4,
+                    dimensions={"l": 30, "w": 20, "h": 12},
+                ))
+            images.append(ProductImage(
+                product=product, image=f"products/bench-{i}.jpg", is_primary=True,
+            ))
+        ProductVariant.objects.bulk_create(variants, batch_size=2000)
+        ProductImage.objects.bulk_create(images, batch_size=2000)
+
+    # ---------- Timing ----------
+
+    def _best(self, render):
+        best = None
+        for _ in range(self.rounds):
+            started = time.perf_counter()
+            data = render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, data
+
+    def _compare(self, label, serializer_class, rows, unit="rows"):
+        def render():
+            return serializer_class(rows, many=True, context=self.context).data
+
+        with override_settings(CATALOG_COMPILED_SERIALIZERS=False):
+            drf_secs, drf_data = self._best(render)
+        compiled_secs, compiled_data = self._best(render)
+
+        self._check(label, drf_data, compiled_data)
+        self._report(label, len(rows), unit, drf_secs, compiled_secs)
+
+    def _compare_values(self, variants):
+        label = "ProductVariantSerializer from .values()"
+        compiled = CompiledSerializer(ProductVariantSerializer(context=self.context))
+        rows = list(
+            ProductVariant.objects
+            .order_by("sku")
+            .values(*compiled.values_lookups())
+        )
+
+        def render():
+            return ProductVariantSerializer(variants, many=True, context=self.context).data
+
+        with override_settings(CATALOG_COMPILED_SERIALIZERS=False):
+            drf_secs, drf_data = self._best(render)
+        values_secs, values_data = self._best(lambda: compiled.render_rows(rows))
+
+        self._check(label, drf_data, values_data)
+        self._report(label, len(rows), "rows", drf_secs, values_secs)
+
+    def _check(self, label, expected, actual):
+        renderer = JSONRenderer()
+        if renderer.render(expected) != renderer.render(actual):
+            self.stdout.write(self.style.ERROR(f"{label}: output differs from DRF"))
+
+    def _report(self, label, count, unit, drf_secs, compiled_secs):
+        self.stdout.write(f"{label}: {count} {unit}")
+        self.stdout.write(
+            f"  DRF      {drf_secs * 1000:9.1f} ms  {count / drf_secs:12,.0f} rows/s"
+        )
+        self.stdout.write(
+            f"  compiled {compiled_secs * 1000:9.1f} ms  {count / compiled_secs:12,.0f} rows/s"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"  speedup  {drf_secs / compiled_secs:.1f}x"
+        ))
@@ -0,0 +1,424 @@
+# apps/catalog/management/commands/generate_catalog.py
+import os
+import random
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.accounts.models import Address
+from apps.catalog import cache as response_cache
+from apps.catalog import popularity, search, services
+from apps.catalog.models import (
+    Brand,
+    Category,
+    Collection,
+    Color,
+    Gender,
+    Product,
+    ProductCollection,
+    ProductImage,
+    ProductVariant,
+    Review,
+    Size,
+)
+from apps.orders.models import Order, OrderItem, OrderStatus
+
+User = get_user_model()
+
+SEED_IMAGES_DIR = Path(__file__).resolve().parent.parent.parent / "seed_assets" / "products"
+# Anything else in the folder (.DS_Store, notes) is not an image.
+SEED_IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".avif"}
+
+GENDERS = [("Men", "men"), ("Women", "women"), ("Kids", "kids")]
+BRANDS = [("Nike", "nike"), ("Jordan", "jordan"), ("Converse", "converse"), ("ACG", "acg")]
+CATEGORIES = ["Running", "Lifestyle", "Training", "Basketball", "Trail", "Skate"]
+COLLECTIONS = [("Summer '25", "summer-25"), ("Best Sellers", "best-sellers"), ("New Arrivals", "new-arrivals")]
+COLORS = [
+    ("Black", "black", "#000000"), ("White", "white", "#FFFFFF"), ("Red", "red", "#FF0000"),
+    ("Blue", "blue", "#0000FF"), ("Green", "green", "#00FF00"), ("Grey", "grey", "#808080"),
+    ("Pink", "pink", "#FFC0CB"), ("Orange", "orange", "#FFA500"), ("Navy", "navy", "#000080"),
+    ("Volt", "volt", "#CEFF00"),
+]
+SIZES = [str(size) for size in (5, 6, 7, 8, 9, 10, 11, 12, 13, 14)]
+
+MODELS = ["Pegasus", "Air Max", "Revolution", "Zoom Fly", "Infinity Run", "Air Force 1",
+          "Metcon", "Vaporfly", "Court Vision", "Winflo", "Dunk", "Blazer"]
+EDITIONS = ["", "Next Nature", "Premium", "SE", "Retro", "GTX", "Trail", "Low", "Mid", "High"]
+ORDER_STATUSES = [
+    (OrderStatus.DELIVERED, 50), (OrderStatus.PAID, 20), (OrderStatus.SHIPPED, 15),
+    (OrderStatus.PENDING, 10), (OrderStatus.CANCELLED, 5),
+]
+
+
+def _uuid(rng) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def seed_images() -> list:
+    return sorted(
+        path for path in SEED_IMAGES_DIR.iterdir()
+        if path.is_file() and path.suffix.lower() in SEED_IMAGE_SUFFIXES
+    )
+
+
+def _place_image(source: Path, destination: Path, mode: str) -> None:
+    if destination.exists():
+        return
+    if mode == "link":
+        try:
+            os.link(source, destination)
+            return
+        except OSError:
+            pass  # e.g. another filesystem: fall back to a copy
+    shutil.copyfile(source, destination)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic catalog (products, variants, images, "
+        "reviews, users, orders) with batched inserts, for load tests and "
+        "benchmarks. The same --seed always produces the same rows and ids."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1000)
+        parser.add_argument("--variants-per-product", type=int, default=6)
+        parser.add_argument("--reviews-per-product", type=int, default=3)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--orders", type=int, default=500)
+        parser.add_argument("--images-per-product", type=int, default=1)
+        parser.add_argument(
+            "--images", choices=["link", "copy", "none"], default="link",
+            help="Hard-link (falling back to copy), copy, or skip the image files.",
+        )
+        parser.add_argument("--workers", type=int, default=8, help="Threads placing image files.")
+        parser.add_argument("--batch-size", type=int, default=2000, help="Products per insert batch.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--prefix", default="gen",
+            help="Prefix for generated slugs, skus and emails.",
+        )
+        parser.add_argument(
+            "--write-search-snapshot", action="store_true",
+            help=(
+                "Rewrite the shared search index snapshot (SEARCH_INDEX_PATH) "
+                "afterwards, so running workers pick up the changes."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.prefix = options["prefix"]
+        self.seed = options["seed"]
+        self.counts = {}
+
+        max_variants = len(COLORS) * len(SIZES)
+        if not 1 <= options["variants_per_product"] <= max_variants:
+            raise CommandError(f"--variants-per-product must be between 1 and {max_variants}.")
+        if options["reviews_per_product"] and not options["users"]:
+            raise CommandError("Reviews need at least one --users.")
+        if options["orders"] and not options["users"]:
+            raise CommandError("Orders need at least one --users.")
+        if Product.objects.filter(slug__startswith=f"{self.prefix}-").exists():
+            raise CommandError(
+                f"Products with the prefix {self.prefix!r} already exist; "
+                "use another --prefix or a fresh database."
+            )
+
+        started = time.perf_counter()
+        self.taxonomy = self._taxonomy()
+        self.users = self._step("users", self._users)
+
+        executor = None
+        if options["images"] != "none" and options["images_per_product"]:
+            executor = ThreadPoolExecutor(max_workers=options["workers"])
+        try:
+            self._step("products", lambda: self._products(executor))
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+        self._step("orders", self._orders)
+        self._step("derived data", self._derived)
+
+        elapsed = time.perf_counter() - started
+        rows = sum(self.counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s): "
+            + ", ".join(f"{count:,} {name}" for name, count in self.counts.items())
+        ))
+        self._search_snapshot()
+
+    def _search_snapshot(self):
+        # Opt-in: the snapshot is shared by every worker, whatever DB this
+        # process points at (a test or bench DB must never end up there).
+        if not self.options["write_search_snapshot"]:
+            self.stdout.write(
+                "Search index snapshot left alone; run rebuild_search_index "
+                "(or pass --write-search-snapshot) to publish the new products."
+            )
+        elif search.rewrite_snapshot() is not None:
+            self.stdout.write(f"Search index snapshot rewritten -> {search.snapshot_path()}")
+
+    def _step(self, label, run):
+        started = time.perf_counter()
+        result = run()
+        self.stdout.write(f"  {label}: {time.perf_counter() - started:.1f}s")
+        return result
+
+    def _rng(self, stream: str) -> random.Random:
+        # One generator per stream, so e.g. changing --orders doesn't
+        # change the generated products.
+        return random.Random(f"{self.seed}:{self.prefix}:{stream}")
+
+    def _count(self, name: str, count: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    # ---------- Taxonomy ----------
+
+    def _taxonomy(self) -> dict:
+        genders = [
+            Gender.objects.get_or_create(slug=slug, defaults={"label": label})[0]
+            for label, slug in GENDERS
+        ]
+        brands = [
+            Brand.objects.get_or_create(slug=slug, defaults={"name": name})[0]
+            for name, slug in BRANDS
+        ]
+        shoes = Category.objects.get_or_create(slug="shoes", defaults={"name": "Shoes"})[0]
+        categories = [
+            Category.objects.get_or_create(
+                slug=name.lower(), defaults={"name": name, "parent": shoes}
+            )[0]
+            for name in CATEGORIES
+        ]
+        collections = [
+            Collection.objects.get_or_create(slug=slug, defaults={"name": name})[0]
+            for name, slug in COLLECTIONS
+        ]
+        colors = [
+            Color.objects.get_or_create(slug=slug, defaults={"name": name, "hex_code": hex_code})[0]
+            for name, slug, hex_code in COLORS
+        ]
+        sizes = [
+            Size.objects.get_or_create(slug=slug, defaults={"name": slug, "sort_order": int(slug)})[0]
+            for slug in SIZES
+        ]
+        return {
+            "genders": [gender.pk for gender in genders],
+            "brands": [brand.pk for brand in brands],
+            "categories": [category.pk for category in categories],
+            "collections": [collection.pk for collection in collections],
+            "options": [(color.pk, size.pk) for color in colors for size in sizes],
+        }
+
+    # ---------- Users ----------
+
+    def _users(self) -> list:
+        """Create the users with one address each: [(user id, address id)]."""
+        rng = self._rng("users")
+        # One hash for everyone: hashing per user would dominate the run.
+        password = make_password("password", salt=f"{self.prefix}{self.seed}")
+        users = []
+        total = self.options["users"]
+        for start in range(0, total, 5000):
+            batch_users, batch_addresses = [], []
+            for n in range(start, min(start + 5000, total)):
+                user = User(
+                    id=_uuid(rng),
+                    email=f"{self.prefix}-user-{n}@example.com",
+                    name=f"Shopper {n}",
+                    password=password,
+                )
+                address = Address(
+                    id=_uuid(rng),
+                    user_id=user.pk,
+                    type=Address.AddressType.SHIPPING,
+                    line1=f"{rng.randint(1, 999)} Market Street",
+                    city=rng.choice(["Portland", "Austin", "Denver", "Boston"]),
+                    state="NA",
+                    country="US",
+                    postal_code=f"{rng.randint(10000, 99999)}",
+                    is_default=True,
+                )
+                batch_users.append(user)
+                batch_addresses.append(address)
+                users.append((user.pk, address.pk))
+            with transaction.atomic():
+                User.objects.bulk_create(batch_users)
+                Address.objects.bulk_create(batch_addresses)
+            self._count("users", len(batch_users))
+            self._count("addresses", len(batch_addresses))
+        return users
+
+    # ---------- Products ----------
+
+    def _products(self, executor) -> None:
+        rng = self._rng("products")
+        images = seed_images()
+        if executor is not None:
+            media_dir = Path(settings.MEDIA_ROOT) / "products" / "generated"
+            media_dir.mkdir(parents=True, exist_ok=True)
+
+        total = self.options["products"]
+        batch_size = self.options["batch_size"]
+        for start in range(0, total, batch_size):
+            rows = {name: [] for name in ("products", "variants", "images", "collections", "reviews")}
+            files = []
+            for n in range(start, min(start + batch_size, total)):
+                self._product(rng, n, rows, files, images)
+
+            with transaction.atomic():
+                Product.objects.bulk_create(rows["products"])
+                ProductVariant.objects.bulk_create(rows["variants"])
+                ProductImage.objects.bulk_create(rows["images"])
+                ProductCollection.objects.bulk_create(rows["collections"])
+                Review.objects.bulk_create(rows["reviews"])
+            for name, created in rows.items():
+                self._count(name, len(created))
+
+            if executor is not None:
+                for source, name in files:
+                    executor.submit(_place_image, source, media_dir / name, self.options["images"])
+            self.stdout.write(f"    {min(start + batch_size, total):,}/{total:,} products", ending="\r")
+        self.stdout.write("")
+
+    def _product(self, rng, n, rows, files, images) -> None:
+        taxonomy = self.taxonomy
+        name = f"{rng.choice(BRANDS)[0]} {rng.choice(MODELS)} {rng.choice(EDITIONS)}".strip()
+        slug = f"{self.prefix}-{n:07d}"
+        product = Product(
+            id=_uuid(rng),
+            name=f"{name} {n}",
+            slug=slug,
+            description=f"{name}: synthetic product {n} for load testing.",
+            category_id=rng.choice(taxonomy["categories"]),
+            gender_id=rng.choice(taxonomy["genders"]),
+            brand_id=rng.choice(taxonomy["brands"]),
+            is_published=rng.random() < 0.95,
+        )
+        rows["products"].append(product)
+
+        base_price = Decimal(rng.randint(4000, 20000)) / 100
+        on_sale = rng.random() < 0.3
+        for j, (color_id, size_id) in enumerate(
+            rng.sample(taxonomy["options"], self.options["variants_per_product"])
+        ):
+            rows["variants"].append(ProductVariant(
+                id=_uuid(rng),
+                product_id=product.pk,
+                sku=f"{slug}-{j}".upper(),
+                price=base_price,
+                sale_price=(base_price * Decimal("0.8")).quantize(Decimal("0.01")) if on_sale else None,
+                color_id=color_id,
+                size_id=size_id,
+                in_stock=rng.choice((0, rng.randint(1, 50))),
+                weight=round(rng.uniform(0.5, 1.5), 2),
+            ))
+
+        for k in range(self.options["images_per_product"] if images else 0):
+            source = rng.choice(images)
+            name = f"{slug}-{k}{source.suffix}"
+            rows["images"].append(ProductImage(
+                id=_uuid(rng),
+                product_id=product.pk,
+                image=f"products/generated/{name}",
+                sort_order=k,
+                is_primary=k == 0,
+            ))
+            files.append((source, name))
+
+        for collection_id in rng.sample(taxonomy["collections"], rng.randint(0, 2)):
+            rows["collections"].append(ProductCollection(
+                id=_uuid(rng), product_id=product.pk, collection_id=collection_id,
+            ))
+
+        for _ in range(self.options["reviews_per_product"]):
+            user_id, _ = rng.choice(self.users)
+            rows["reviews"].append(Review(
+                id=_uuid(rng),
+                product_id=product.pk,
+                user_id=user_id,
+                rating=rng.choices((1, 2, 3, 4, 5), weights=(5, 5, 15, 35, 40))[0],
+                comment=rng.choice(["", "Great fit.", "Runs small.", "Comfortable all day."]),
+            ))
+
+    # ---------- Orders ----------
+
+    def _orders(self) -> None:
+        rng = self._rng("orders")
+        total = self.options["orders"]
+        products = self.options["products"]
+        if not products:
+            return
+        statuses, weights = zip(*ORDER_STATUSES)
+
+        for start in range(0, total, 2000):
+            planned = []
+            for _ in range(start, min(start + 2000, total)):
+                user_id, address_id = rng.choice(self.users)
+                lines = [
+                    (
+                        f"{self.prefix}-{rng.randrange(products):07d}-"
+                        f"{rng.randrange(self.options['variants_per_product'])}".upper(),
+                        rng.randint(1, 3),
+                    )
+                    for _ in range(rng.randint(1, 4))
+                ]
+                planned.append((_uuid(rng), user_id, address_id, rng.choices(statuses, weights)[0], lines))
+
+            skus = {sku for *_, lines in planned for sku, _ in lines}
+            variants = dict(
+                (sku, (pk, sale_price if sale_price is not None else price))
+                for sku, pk, price, sale_price in (
+                    ProductVariant.objects
+                    .filter(sku__in=skus)
+                    .values_list("sku", "pk", "price", "sale_price")
+                )
+            )
+
+            orders, items = [], []
+            for order_id, user_id, address_id, status, lines in planned:
+                total_amount = Decimal("0.00")
+                for sku, quantity in lines:
+                    variant_id, price = variants[sku]
+                    items.append(OrderItem(
+                        id=_uuid(rng),
+                        order_id=order_id,
+                        product_variant_id=variant_id,
+                        quantity=quantity,
+                        price_at_purchase=price,
+                    ))
+                    total_amount += price * quantity
+                orders.append(Order(
+                    id=order_id,
+                    user_id=user_id,
+                    status=status,
+                    total_amount=total_amount,
+                    shipping_address_id=address_id,
+                    billing_address_id=address_id,
+                ))
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create(items)
+            self._count("orders", len(orders))
+            self._count("order items", len(items))
+
+    # ---------- Derived data ----------
+
+    def _derived(self) -> None:
+        # bulk_create sends no signals: fill in what they would have.
+        services.refresh_product_prices()
+        services.refresh_product_ratings()
+        services.refresh_product_cards()
+        popularity.recompute()
+        for model in (Product, ProductVariant, ProductImage, ProductCollection, Review):
+            response_cache.bump_version(model)
@@ -0,0 +1,95 @@
+# apps/catalog/management/commands/generate_image_derivatives.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps as django_apps
+from django.core.management.base import BaseCommand
+from PIL import Image, UnidentifiedImageError
+
+from apps.catalog import cache as response_cache
+from apps.catalog import images, services
+from apps.catalog.models import ProductImage
+
+
+def _init_worker():
+    # Workers started with spawn/forkserver begin without Django set up.
+    if not django_apps.ready:
+        django.setup()
+
+
+def _build(name, widths, formats):
+    """Worker: (name, manifest or None, error)."""
+    try:
+        return name, images.build_manifest(name, widths, formats), None
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        return name, None, str(exc)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate resized WebP/JPEG renditions for product images that don't "
+        "have them yet (or all of them with --force), in a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Worker processes; 1 renders in this process.",
+        )
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--force", action="store_true", help="Re-render every image.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        widths, formats = images.get_widths(), images.get_formats()
+
+        pending = {}
+        images_qs = ProductImage.objects.exclude(image="").only("id", "product_id", "image", "derivatives")
+        for image in images_qs:
+            if options["force"] or not images.is_current(image):
+                pending.setdefault(image.image.name, []).append((image.pk, image.product_id))
+        names = list(pending)
+        self.stdout.write(f"{len(names)} source images to render with {options['workers']} worker(s)...")
+
+        executor = None
+        if options["workers"] > 1:
+            executor = ProcessPoolExecutor(max_workers=options["workers"], initializer=_init_worker)
+
+        done = failed = 0
+        products = set()
+        try:
+            for start in range(0, len(names), options["batch_size"]):
+                batch = names[start:start + options["batch_size"]]
+                if executor is None:
+                    results = [_build(name, widths, formats) for name in batch]
+                else:
+                    results = executor.map(
+                        _build, batch, [widths] * len(batch), [formats] * len(batch)
+                    )
+
+                updates = []
+                for name, manifest, error in results:
+                    if manifest is None:
+                        failed += 1
+                        self.stdout.write(self.style.WARNING(f"⚠️  {name}: {error}"))
+                        continue
+                    for pk, product_id in pending[name]:
+                        updates.append(ProductImage(pk=pk, derivatives=manifest))
+                        products.add(product_id)
+                ProductImage.objects.bulk_update(updates, ["derivatives"])
+                done += len(updates)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        # bulk_update sends no signals: drop the cached image responses and
+        # copy the new manifests onto the product cards.
+        if done:
+            response_cache.bump_version(ProductImage)
+            services.refresh_product_cards(products)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rendered derivatives for {done} images in {elapsed:.2f}s ({failed} failed)."
+        ))
@@ -0,0 +1,29 @@
+# apps/catalog/management/commands/rebuild_product_cards.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.catalog.services import (
+    refresh_product_cards,
+    refresh_product_prices,
+    refresh_product_ratings,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the denormalized ProductCard rows used by the card listing "
+        "and the stored Product.min_price and review aggregates."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        priced = refresh_product_prices()
+        rated = refresh_product_ratings()
+        written = refresh_product_cards()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rebuilt {written} product cards, {priced} product prices and "
+            f"{rated} rating aggregates in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,21 @@
+# apps/catalog/management/commands/rebuild_search_index.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.catalog import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search index from the DB and write the snapshot workers load."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = search.build_index()
+        search.write_snapshot(index)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Indexed {len(index)} products ({len(index.postings)} terms) "
+            f"in {elapsed:.2f}s -> {search.snapshot_path()}"
+        ))
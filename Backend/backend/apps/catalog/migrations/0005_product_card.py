@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='catalog.product')),
+                ('name', models.CharField(max_length=255)),
+                ('slug', models.SlugField()),
+                ('category_slug', models.SlugField(max_length=120)),
+                ('gender_slug', models.SlugField()),
+                ('brand_slug', models.SlugField(max_length=120)),
+                ('is_published', models.BooleanField(default=False)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('total_stock', models.IntegerField(default=0)),
+                ('color_slugs', models.JSONField(blank=True, default=list)),
+                ('size_slugs', models.JSONField(blank=True, default=list)),
+                ('primary_image', models.CharField(blank=True, max_length=255)),
+                ('rating_avg', models.FloatField(default=0.0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at', 'product'], name='catalog_pro_created_264487_idx'), models.Index(fields=['category_slug'], name='catalog_pro_categor_2f9472_idx'), models.Index(fields=['gender_slug'], name='catalog_pro_gender__b23e14_idx'), models.Index(fields=['brand_slug'], name='catalog_pro_brand_s_2c77ff_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:18
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_min_price(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    ProductVariant = apps.get_model('catalog', 'ProductVariant')
+    lowest = (
+        ProductVariant.objects
+        .filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+        .annotate(lowest=Min(Coalesce('sale_price', 'price')))
+        .values('lowest')
+    )
+    Product.objects.update(min_price=Subquery(lowest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_product_card'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['min_price', 'id'], name='catalog_pro_min_pri_c29a91_idx'),
+        ),
+        migrations.RunPython(backfill_min_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:07
+
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_popularity(apps, schema_editor):
+    # Same scores as apps.catalog.popularity.recompute().
+    Product = apps.get_model('catalog', 'Product')
+    Wishlist = apps.get_model('catalog', 'Wishlist')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+
+    epoch = datetime.fromisoformat(getattr(settings, 'CATALOG_POPULARITY_EPOCH', '2026-01-01'))
+    if epoch.tzinfo is None:
+        epoch = epoch.replace(tzinfo=timezone.utc)
+    half_life = getattr(settings, 'CATALOG_POPULARITY_HALF_LIFE', 14) * 86400
+    wishlist_weight = getattr(settings, 'CATALOG_POPULARITY_WISHLIST_WEIGHT', 0.5)
+
+    def weight(when):
+        return 2.0 ** ((when - epoch).total_seconds() / half_life)
+
+    scores = defaultdict(float)
+    for product_id, quantity, created_at in (
+        OrderItem.objects
+        .filter(order__status__in=['paid', 'shipped', 'delivered'])
+        .values_list('product_variant__product_id', 'quantity', 'order__created_at')
+        .iterator(chunk_size=2000)
+    ):
+        scores[product_id] += quantity * weight(created_at)
+    for product_id, added_at in Wishlist.objects.values_list('product_id', 'added_at').iterator(chunk_size=2000):
+        scores[product_id] += wishlist_weight * weight(added_at)
+
+    Product.objects.bulk_update(
+        [Product(pk=pk, popularity=score) for pk, score in scores.items()],
+        ['popularity'],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_product_association'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='popularity',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['popularity', 'id'], name='catalog_pro_popular_219a22_idx'),
+        ),
+        migrations.RunPython(backfill_popularity, migrations.RunPython.noop),
+    ]
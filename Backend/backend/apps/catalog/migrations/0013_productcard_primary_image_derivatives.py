@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_product_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcard',
+            name='primary_image_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -9,6 +9,8 @@ from .wishlists import Wishlist
 from .variants import ProductVariant
 from .collections import Collection, ProductCollection
 from .filters import Gender, Color, Size
+from .cards import ProductCard
+from .associations import ProductAssociation
 
 __all__ = [
     "Address",
@@ -24,4 +26,6 @@ __all__ = [
     "Gender",
     "Color",
     "Size",
+    "ProductCard",
+    "ProductAssociation",
 ]
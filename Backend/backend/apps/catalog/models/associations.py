@@ -0,0 +1,37 @@
+# catalog/models/associations.py
+from django.db import models
+
+from .products import Product
+
+
+class ProductAssociation(models.Model):
+    """
+    "Frequently bought together": a product's best neighbours by shared
+    orders, rank 1 first. Never written by hand; the whole table is
+    rebuilt by `manage.py rebuild_product_associations`
+    (apps/catalog/associations.py).
+    """
+
+    # Looked up through the (product, rank) unique index below.
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="associations",
+        db_index=False,
+    )
+    related = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    # Purchased orders holding both products.
+    orders = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("product", "rank")
+        ordering = ["product", "rank"]
+
+    def __str__(self) -> str:
+        return f"{self.product_id} -> {self.related_id} (#{self.rank})"
@@ -0,0 +1,53 @@
+# catalog/models/cards.py
+from django.db import models
+
+from .products import Product
+
+
+class ProductCard(models.Model):
+    """
+    Denormalized read model: everything a product-list card needs in one
+    row. Never written by hand; rebuilt by apps.catalog.services from
+    Product, ProductVariant, ProductImage and Review writes.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="card",
+    )
+    name = models.CharField(max_length=255)
+    slug = models.SlugField()
+    category_slug = models.SlugField(max_length=120)
+    gender_slug = models.SlugField(max_length=50)
+    brand_slug = models.SlugField(max_length=120)
+    is_published = models.BooleanField(default=False)
+
+    # Effective price = sale_price if set, else price.
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    total_stock = models.IntegerField(default=0)
+    # Slugs of colors / sizes with at least one variant in stock.
+    color_slugs = models.JSONField(default=list, blank=True)
+    size_slugs = models.JSONField(default=list, blank=True)
+    primary_image = models.CharField(max_length=255, blank=True)
+    # Copy of that image's ProductImage.derivatives (see apps/catalog/images.py).
+    primary_image_derivatives = models.JSONField(default=dict, blank=True)
+    rating_avg = models.FloatField(default=0.0)
+    rating_count = models.PositiveIntegerField(default=0)
+
+    # Copied from the product so cards sort like the product listing.
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "product"]),
+            models.Index(fields=["category_slug"]),
+            models.Index(fields=["gender_slug"]),
+            models.Index(fields=["brand_slug"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Card for {self.name}"
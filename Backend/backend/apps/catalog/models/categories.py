@@ -1,8 +1,18 @@
 # catalog/models/categories.py
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Substr
+
 from apps.core.models import BaseModel
 
 
+PATH_SEPARATOR = "/"
+# The character right after the separator: every path under "a/" sorts
+# before "a0", so a subtree is one range scan on the path index.
+_PATH_END = chr(ord(PATH_SEPARATOR) + 1)
+
+
 class Category(BaseModel):
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=120, unique=True, db_index=True)
@@ -13,12 +23,67 @@ class Category(BaseModel):
         on_delete=models.CASCADE,
         related_name="children",
     )
+    # Materialized path of ids from the root, e.g. "<root>/<child>/".
+    # Maintained in save(); descendants share their ancestor's prefix.
+    path = models.CharField(max_length=255, editable=False, default="")
+    depth = models.PositiveSmallIntegerField(editable=False, default=0)
 
     class Meta:
         verbose_name_plural = "Categories"
         indexes = [
             models.Index(fields=["slug"]),
+            models.Index(fields=["path"]),
         ]
 
     def __str__(self) -> str:
         return self.name
+
+    @staticmethod
+    def subtree_q(path: str, prefix: str = "") -> Q:
+        """`path` and everything under it, as a range on the path index."""
+        return Q(**{
+            f"{prefix}path__gte": path,
+            f"{prefix}path__lt": path[:-1] + _PATH_END,
+        })
+
+    @staticmethod
+    def ancestor_paths(path: str) -> list:
+        """Paths of every category from the root down to `path`."""
+        parts = path.split(PATH_SEPARATOR)[:-1]
+        return [
+            PATH_SEPARATOR.join(parts[: i + 1]) + PATH_SEPARATOR
+            for i in range(len(parts))
+        ]
+
+    def save(self, *args, **kwargs):
+        parent_path = ""
+        if self.parent_id:
+            # Read fresh: the cached parent may have moved since it was loaded.
+            parent_path = (
+                Category.objects.filter(pk=self.parent_id)
+                .values_list("path", flat=True)
+                .get()
+            )
+            if self.path and parent_path.startswith(self.path):
+                raise ValidationError("A category can't be moved under itself.")
+
+        old_path, old_depth = self.path, self.depth
+        self.path = parent_path + self.pk.hex + PATH_SEPARATOR
+        self.depth = self.path.count(PATH_SEPARATOR) - 1
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and old_path != self.path:
+            kwargs["update_fields"] = {*update_fields, "path", "depth"}
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_path and old_path != self.path:
+                # Moved: re-root every descendant in one UPDATE.
+                (
+                    Category.objects
+                    .filter(self.subtree_q(old_path))
+                    .exclude(pk=self.pk)
+                    .update(
+                        path=Concat(Value(self.path), Substr("path", len(old_path) + 1)),
+                        depth=F("depth") + (self.depth - old_depth),
+                    )
+                )
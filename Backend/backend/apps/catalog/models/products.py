@@ -36,17 +36,64 @@ class Product(BaseModel):
         on_delete=models.SET_NULL,
         related_name="+",
     )
+    # Lowest price a shopper pays across the variants (sale_price when
+    # set, else price). Maintained by the catalog signals.
+    min_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    # Review aggregates, kept up to date incrementally by the catalog
+    # signals on every Review save/delete (see services.apply_review_rating).
+    rating_avg = models.FloatField(default=0.0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_total = models.PositiveIntegerField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+    # Recency-weighted units sold plus wishlist adds, for
+    # ?ordering=popularity. Kept up to date by the catalog signals, see
+    # apps/catalog/popularity.py.
+    popularity = models.FloatField(default=0.0, editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=["is_published"]),
             models.Index(fields=["brand"]),
             models.Index(fields=["category"]),
+            # Keyset pagination seeks on (created_at, id).
+            models.Index(fields=["created_at", "id"]),
+            # Price filtering and ?ordering=price.
+            models.Index(fields=["min_price", "id"]),
+            # ?ordering=popularity.
+            models.Index(fields=["popularity", "id"]),
         ]
 
     def __str__(self) -> str:
         return self.name
 
+    @property
+    def rating_histogram(self) -> dict:
+        return {str(stars): getattr(self, f"rating_{stars}") for stars in range(1, 6)}
+
+    @property
+    def recent_reviews(self) -> list:
+        """
+        The newest CATALOG_DETAIL_REVIEWS reviews. The product views
+        prefetch them; otherwise they are queried here.
+        """
+        reviews = getattr(self, "_recent_reviews", None)
+        if reviews is None:
+            limit = getattr(settings, "CATALOG_DETAIL_REVIEWS", 5)
+            reviews = list(
+                self.reviews.select_related("user").order_by("-created_at", "-id")[:limit]
+            )
+        return reviews
+
 
 class ProductImage(BaseModel):
     product = models.ForeignKey(
@@ -64,6 +111,8 @@ class ProductImage(BaseModel):
     image = models.ImageField(upload_to='products/')
     sort_order = models.PositiveIntegerField(default=0)
     is_primary = models.BooleanField(default=False)
+    # Manifest of the resized renditions, see apps/catalog/images.py.
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ["sort_order"]
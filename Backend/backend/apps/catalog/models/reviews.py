@@ -29,7 +29,8 @@ class Review(BaseModel):
         db_table = "reviews"
         ordering = ["-created_at"]
         indexes = [
-            models.Index(fields=["product"]),
+            # A product's reviews, newest first, paged by keyset.
+            models.Index(fields=["product", "created_at", "id"]),
             models.Index(fields=["user"]),
         ]
 
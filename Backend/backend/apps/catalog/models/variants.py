@@ -44,6 +44,8 @@ class ProductVariant(BaseModel):
         indexes = [
             models.Index(fields=["product"]),
             models.Index(fields=["sku"]),
+            # Keyset pagination seeks on (price, id).
+            models.Index(fields=["price", "id"]),
         ]
 
     def __str__(self) -> str:
@@ -0,0 +1,265 @@
+# apps/catalog/pagination.py
+
+import base64
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, OrderBy, Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on the queryset's current ordering plus the
+    primary key as a tiebreaker, e.g. (-created_at, -id).
+
+    Each page is `WHERE (created_at, id) < (last seen) LIMIT n`, so deep
+    pages cost the same as the first one. The total count is included
+    unless the client sends ?count=false. Nullable columns are supported
+    when ordered with an explicit nulls_first/nulls_last.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) != "false":
+            self.count = queryset.count()
+
+        values, reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                (field, not descending, _flip_nulls(nulls))
+                for field, descending, nulls in ordering
+            ]
+        if values is not None:
+            queryset = queryset.filter(self._seek(ordering, values))
+
+        rows = list(queryset.order_by(*self._order_by(ordering))[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.first_position = self._position(rows[0]) if rows else None
+        self.last_position = self._position(rows[-1]) if rows else None
+        return rows
+
+    def get_page_size(self, request):
+        return self.page_size
+
+    def get_ordering(self, queryset):
+        """
+        (field, descending, nulls) triples from the already-ordered
+        queryset, with the pk appended so every position is unique.
+        `nulls` is "first", "last" or None (column is not nullable).
+        """
+        ordering = []
+        for term in queryset.query.order_by:
+            if isinstance(term, str):
+                field, descending, nulls = term.lstrip("-"), term.startswith("-"), None
+            elif isinstance(term, OrderBy) and isinstance(term.expression, F):
+                field, descending = term.expression.name, term.descending
+                nulls = "last" if term.nulls_last else "first" if term.nulls_first else None
+            else:
+                continue
+            ordering.append(("pk" if field == "id" else field, descending, nulls))
+        if not ordering:
+            ordering = [("created_at", True, None)]
+        if ordering[-1][0] != "pk":
+            ordering.append(("pk", ordering[-1][1], None))
+        return ordering
+
+    def _order_by(self, ordering):
+        terms = []
+        for field, descending, nulls in ordering:
+            if nulls is None:
+                terms.append(f"-{field}" if descending else field)
+                continue
+            column = F(field)
+            options = {"nulls_last": True} if nulls == "last" else {"nulls_first": True}
+            terms.append(column.desc(**options) if descending else column.asc(**options))
+        return terms
+
+    def _seek(self, ordering, values):
+        """Rows strictly after `values` in `ordering`."""
+        condition = Q()
+        for i, (field, descending, nulls) in enumerate(ordering):
+            step = _after(field, descending, nulls, values[i])
+            if step is None:
+                continue
+            for (prev_field, _, _), prev_value in zip(ordering[:i], values):
+                if prev_value is None:
+                    step &= Q(**{f"{prev_field}__isnull": True})
+                else:
+                    step &= Q(**{prev_field: prev_value})
+            condition |= step
+        return condition
+
+    def _position(self, obj):
+        return [_encode_value(getattr(obj, field)) for field, _, _ in self.ordering]
+
+    # ---------- Cursors ----------
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            values, reverse = payload["v"], bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Cursors come from the client: each value must be valid for its
+        # column, or the ORM fails deep in the query (a 500).
+        try:
+            values = [
+                value if value is None or model_field is None else model_field.to_python(value)
+                for value, model_field in zip(values, self._ordering_fields())
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def _ordering_fields(self):
+        """The model field of each ordering term (None for annotations)."""
+        fields = []
+        for name, _, _ in self.ordering:
+            model, model_field = self.model, None
+            try:
+                for part in name.split(LOOKUP_SEP):
+                    model_field = model._meta.pk if part == "pk" else model._meta.get_field(part)
+                    model = model_field.related_model or model
+            except FieldDoesNotExist:
+                model_field = None
+            if model_field is not None and model_field.is_relation:
+                model_field = model_field.target_field
+            fields.append(model_field)
+        return fields
+
+    def encode_cursor(self, values, reverse=False):
+        payload = {"v": values}
+        if reverse:
+            payload["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(",", ":")).encode("ascii")
+        ).decode("ascii")
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(self.last_position)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_position is None:
+            url = self.request.build_absolute_uri()
+            return remove_query_param(url, self.cursor_query_param)
+        return self.encode_cursor(self.first_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.count,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer", "nullable": True},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+def _flip_nulls(nulls):
+    return {"first": "last", "last": "first"}.get(nulls)
+
+
+def _after(field, descending, nulls, value):
+    """Q for `field` strictly after `value`, or None if nothing can be."""
+    if value is None:
+        # Past a NULL only the other NULL-side rows remain.
+        return Q(**{f"{field}__isnull": False}) if nulls == "first" else None
+    step = Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+    if nulls == "last":
+        step |= Q(**{f"{field}__isnull": True})
+    return step
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+class CatalogPagination(PageNumberPagination):
+    """
+    Page numbers by default (what the site uses today). Infinite-scroll
+    clients opt into keyset pagination with ?pagination=cursor; the next
+    links they get back carry a ?cursor= and stay in that mode.
+    """
+
+    mode_query_param = "pagination"
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        params = request.query_params
+        return (
+            params.get(self.mode_query_param) == "cursor"
+            or self.keyset_class.cursor_query_param in params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            response = self.keyset.get_paginated_response(data)
+        else:
+            response = super().get_paginated_response(data)
+        # Set by IndexedSearchFilter on ?search= requests.
+        truncated = getattr(self.request, "search_truncated", None)
+        if truncated is not None:
+            response.data["search_truncated"] = truncated
+        return response
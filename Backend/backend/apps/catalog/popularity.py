@@ -0,0 +1,131 @@
+# apps/catalog/popularity.py
+"""
+Product popularity for ?ordering=popularity: units sold plus wishlist
+adds, each counting half as much every CATALOG_POPULARITY_HALF_LIFE
+days.
+
+Decaying the stored scores as time passes would rewrite every product
+row. Instead each event is added already scaled by its time relative to
+a fixed epoch:
+
+    weight = 2 ** ((event time - CATALOG_POPULARITY_EPOCH) / half-life)
+
+At any moment, all the decayed scores equal the stored ones times the
+same factor, so ordering by Product.popularity orders by the decayed
+score. A row then only changes when an event happens (see signals.py):
+
+- an order entering a purchased status (paid, shipped, delivered) adds
+  its units, timed at the order's creation; leaving it (cancelled)
+  takes the same amount back out,
+- a wishlist add adds CATALOG_POPULARITY_WISHLIST_WEIGHT, timed at
+  `added_at`; removing it takes that back out.
+
+Each is one relative UPDATE per product, like the rating aggregates;
+a bulk wishlist remove is a single UPDATE for all of its products.
+`manage.py compact_popularity` recomputes every score from the orders
+and wishlists. Run it periodically: it picks up bulk writes, which send
+no signals, and setting changes, and it clears float drift.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+
+from apps.orders.models import PURCHASED_STATUSES, OrderItem
+
+from . import cache as response_cache
+from .models import Product, Wishlist
+
+
+def _epoch() -> datetime:
+    epoch = datetime.fromisoformat(getattr(settings, "CATALOG_POPULARITY_EPOCH", "2026-01-01"))
+    return epoch if epoch.tzinfo else epoch.replace(tzinfo=dt_timezone.utc)
+
+
+def weight(when: datetime) -> float:
+    """What an event at `when` adds to a score."""
+    half_life = getattr(settings, "CATALOG_POPULARITY_HALF_LIFE", 14) * 86400
+    return 2.0 ** ((when - _epoch()).total_seconds() / half_life)
+
+
+def _add(product_ids: Iterable, amount: float) -> None:
+    Product.objects.filter(pk__in=list(product_ids)).update(popularity=F("popularity") + amount)
+    # update() sends no signals: cached ?ordering=popularity pages go stale.
+    transaction.on_commit(lambda: response_cache.bump_version(Product))
+
+
+def _add_each(amounts: dict) -> None:
+    """_add() with a different amount per product, in one UPDATE."""
+    if not amounts:
+        return
+    Product.objects.filter(pk__in=list(amounts)).update(popularity=F("popularity") + Case(
+        *(When(pk=pk, then=Value(amount)) for pk, amount in amounts.items()),
+        output_field=FloatField(),
+    ))
+    transaction.on_commit(lambda: response_cache.bump_version(Product))
+
+
+def apply_order(order_id, sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) an order's units."""
+    units = defaultdict(int)
+    created_at = None
+    for product_id, quantity, created_at in (
+        OrderItem.objects
+        .filter(order_id=order_id)
+        .values_list("product_variant__product_id", "quantity", "order__created_at")
+    ):
+        units[product_id] += quantity
+    if not units:
+        return
+    amount = sign * weight(created_at)
+    for product_id, quantity in units.items():
+        _add([product_id], quantity * amount)
+
+
+def apply_wishlist(product_ids: Iterable, added_at: datetime, sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) wishlist adds made at `added_at`."""
+    _add(product_ids, sign * getattr(settings, "CATALOG_POPULARITY_WISHLIST_WEIGHT", 0.5) * weight(added_at))
+
+
+def unapply_wishlist_rows(rows: Iterable) -> None:
+    """Take back the wishlist adds of many (product_id, added_at) rows at once."""
+    wishlist_weight = getattr(settings, "CATALOG_POPULARITY_WISHLIST_WEIGHT", 0.5)
+    amounts = defaultdict(float)
+    for product_id, added_at in rows:
+        amounts[product_id] -= wishlist_weight * weight(added_at)
+    _add_each(amounts)
+
+
+def recompute(batch_size: int = 2000) -> int:
+    """
+    Rebuild every Product.popularity from the purchased orders and the
+    wishlists. Returns the number of products with a non-zero score.
+    """
+    scores = defaultdict(float)
+    weights = {}
+    for product_id, quantity, created_at in (
+        OrderItem.objects
+        .filter(order__status__in=PURCHASED_STATUSES)
+        .values_list("product_variant__product_id", "quantity", "order__created_at")
+        .iterator(chunk_size=batch_size)
+    ):
+        # Lines of one order share its weight.
+        if created_at not in weights:
+            weights[created_at] = weight(created_at)
+        scores[product_id] += quantity * weights[created_at]
+
+    wishlist_weight = getattr(settings, "CATALOG_POPULARITY_WISHLIST_WEIGHT", 0.5)
+    for product_id, added_at in Wishlist.objects.values_list("product_id", "added_at").iterator(chunk_size=batch_size):
+        scores[product_id] += wishlist_weight * weight(added_at)
+
+    with transaction.atomic():
+        Product.objects.exclude(popularity=0).update(popularity=0.0)
+        Product.objects.bulk_update(
+            [Product(pk=pk, popularity=score) for pk, score in scores.items()],
+            ["popularity"],
+            batch_size=batch_size,
+        )
+    return len(scores)
@@ -0,0 +1,345 @@
+# apps/catalog/search.py
+"""
+In-process inverted index for product search.
+
+Every product is tokenized from its name, description, brand name and
+category name into a postings map (token -> {doc: weighted term freq}).
+Queries are answered with BM25 ranking: every query term must match
+(same AND semantics as DRF's SearchFilter) and the last term is treated
+as a prefix so search-as-you-type works.
+
+The index lives in process memory. It is built lazily from the DB (or
+loaded from the snapshot written by `manage.py rebuild_search_index`)
+and kept up to date incrementally by the catalog signals, which only
+reach the process that made the write. So that other workers see it
+too, an index older than SEARCH_INDEX_MAX_AGE seconds is replaced: by
+the snapshot if another process wrote a fresher one, else by a rebuild
+from the DB, which is then written out as the new snapshot for the
+others. Commands that write products in bulk (import_catalog,
+generate_catalog) rewrite the snapshot when they finish, if asked to
+with --write-search-snapshot: the snapshot is shared by every worker,
+whatever database the command ran against.
+"""
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Name and brand/category hits rank above description-only hits.
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "brand": 2.0,
+    "category": 2.0,
+    "description": 1.0,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return TOKEN_RE.findall(text.lower())
+
+
+# Values needed to index a product, in the order add_rows() expects.
+PRODUCT_ROW_FIELDS = ("id", "name", "description", "brand__name", "category__name")
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_len: Dict[str, float] = {}
+        self.total_len = 0.0
+        self._vocabulary: Optional[List[str]] = None
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_vocabulary"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    # ---------- Writes ----------
+
+    def add(self, doc_id, fields: Dict[str, str]) -> None:
+        doc_id = str(doc_id)
+        terms = Counter()
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for token in tokenize(text):
+                terms[token] += weight
+
+        with self._lock:
+            self._remove(doc_id)
+            for token, tf in terms.items():
+                self.postings.setdefault(token, {})[doc_id] = tf
+            length = sum(terms.values())
+            self.doc_terms[doc_id] = terms
+            self.doc_len[doc_id] = length
+            self.total_len += length
+            self._vocabulary = None
+
+    def remove(self, doc_id) -> None:
+        with self._lock:
+            self._remove(str(doc_id))
+            self._vocabulary = None
+
+    def _remove(self, doc_id: str) -> None:
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for token in terms:
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[token]
+        self.total_len -= self.doc_len.pop(doc_id, 0.0)
+
+    # ---------- Reads ----------
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+        start = bisect_left(vocabulary, prefix)
+        matches = []
+        for token in vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Return matching doc ids, best first."""
+        return [doc_id for doc_id, _ in self.search_scored(query, limit)]
+
+    def search_scored(
+        self, query: str, limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        raw_terms = query.split()
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            n_docs = len(self.doc_terms)
+            if not n_docs:
+                return []
+            avg_len = self.total_len / n_docs
+
+            # Exact id lookups, mirroring the old `id` search field.
+            exact = [str(uuid.UUID(term)) for term in raw_terms if _is_uuid(term)]
+            exact = [doc_id for doc_id in exact if doc_id in self.doc_terms]
+            if exact:
+                return [(doc_id, math.inf) for doc_id in exact][:limit]
+
+            # Each query term resolves to one or more index tokens; the
+            # last one is a prefix. Terms with no match short-circuit AND.
+            groups = []
+            for position, token in enumerate(tokens):
+                if position == len(tokens) - 1:
+                    group = self._expand_prefix(token)
+                else:
+                    group = [token] if token in self.postings else []
+                if not group:
+                    return []
+                groups.append(group)
+
+            # Intersect candidates starting from the rarest term.
+            def group_docs(group):
+                docs = set()
+                for token in group:
+                    docs.update(self.postings[token])
+                return docs
+
+            groups.sort(key=lambda g: sum(len(self.postings[t]) for t in g))
+            candidates = group_docs(groups[0])
+            for group in groups[1:]:
+                candidates &= group_docs(group)
+                if not candidates:
+                    return []
+
+            doc_len = self.doc_len
+            norms = {
+                doc_id: BM25_K1 * (1 - BM25_B + BM25_B * doc_len[doc_id] / avg_len)
+                for doc_id in candidates
+            }
+            scores = dict.fromkeys(candidates, 0.0)
+            for group in groups:
+                for token in group:
+                    docs = self.postings[token]
+                    df = len(docs)
+                    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                    boost = idf * (BM25_K1 + 1)
+                    # Walk whichever side is smaller.
+                    if df < len(candidates):
+                        hits = [(d, tf) for d, tf in docs.items() if d in candidates]
+                    else:
+                        hits = [(d, docs[d]) for d in candidates if d in docs]
+                    for doc_id, tf in hits:
+                        scores[doc_id] += boost * tf / (tf + norms[doc_id])
+
+        if limit:
+            top = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        else:
+            top = scores.items()
+        return sorted(top, key=lambda item: (-item[1], item[0]))
+
+    def add_rows(self, rows: Iterable[tuple]) -> None:
+        """Index product rows shaped like PRODUCT_ROW_FIELDS."""
+        for pk, name, description, brand, category in rows:
+            self.add(pk, {
+                "name": name,
+                "description": description,
+                "brand": brand,
+                "category": category,
+            })
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
+# ---------- Process-wide index ----------
+
+_index: Optional[SearchIndex] = None
+_index_mtime: Optional[float] = None
+# Wall-clock time the loaded data was read from the DB (for a snapshot,
+# when it was written), comparable across processes.
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def snapshot_path():
+    return getattr(settings, "SEARCH_INDEX_PATH", None)
+
+
+def max_age() -> Optional[float]:
+    return getattr(settings, "SEARCH_INDEX_MAX_AGE", 300)
+
+
+def build_index(rows: Optional[Iterable[tuple]] = None) -> SearchIndex:
+    """Build a fresh index from the DB (or the given product rows)."""
+    from .models import Product
+
+    if rows is None:
+        rows = (
+            Product.objects
+            .values_list(*PRODUCT_ROW_FIELDS)
+            .iterator(chunk_size=2000)
+        )
+
+    index = SearchIndex()
+    index.add_rows(rows)
+    return index
+
+
+def write_snapshot(index: SearchIndex, path=None) -> None:
+    path = path or snapshot_path()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def rewrite_snapshot() -> Optional[SearchIndex]:
+    """
+    Rebuild from the DB and write the snapshot (when SEARCH_INDEX_PATH
+    is set), so every worker picks the result up on its next search.
+    """
+    if not snapshot_path():
+        return None
+    index = build_index()
+    write_snapshot(index)
+    return index
+
+
+def _snapshot_mtime() -> Optional[float]:
+    path = snapshot_path()
+    if not path:
+        return None
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def _expired(built_at: float) -> bool:
+    limit = max_age()
+    return limit is not None and time.time() - built_at >= limit
+
+
+def get_index() -> SearchIndex:
+    """
+    Return the process-wide index. It is (re)loaded from the snapshot
+    when that changed, and rebuilt from the DB when it is older than
+    SEARCH_INDEX_MAX_AGE, see the module docstring.
+    """
+    global _index, _index_mtime, _index_built_at
+
+    index = _index
+    mtime = _snapshot_mtime()
+    if index is not None and mtime == _index_mtime and not _expired(_index_built_at):
+        return index
+
+    with _index_lock:
+        if _index is not index:
+            return _index  # refreshed by another thread meanwhile
+        if mtime is not None and mtime != _index_mtime and not _expired(mtime):
+            with open(snapshot_path(), "rb") as f:
+                _index = pickle.load(f)
+            _index_mtime, _index_built_at = mtime, mtime
+        else:
+            started = time.time()
+            _index = build_index()
+            _index_built_at = started
+            _index_mtime = mtime
+            if snapshot_path():
+                try:
+                    write_snapshot(_index)
+                    _index_mtime = _snapshot_mtime()
+                except OSError:
+                    pass  # read-only deploy: each worker rebuilds on its own
+    return _index
+
+
+def loaded_index() -> Optional[SearchIndex]:
+    """The index if this process has one, without building it."""
+    return _index
+
+
+def reset_index() -> None:
+    global _index, _index_mtime, _index_built_at
+    with _index_lock:
+        _index = None
+        _index_mtime = None
+        _index_built_at = 0.0
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
 from ..models import Color,Size,ProductVariant,Product
+from .compiled import CompiledSerializerMixin
+from .dynamic import DynamicFieldsMixin
 
 # from .serializers import ProductSerializer
 
@@ -14,8 +16,9 @@ class SizeSerializer(serializers.ModelSerializer):
         model = Size
         fields = ["id", "name", "slug", "sort_order"]
 
-class ProductVariantSerializer(serializers.ModelSerializer):
-    
+class ProductVariantSerializer(CompiledSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ("color", "size")
+
     product_id = serializers.PrimaryKeyRelatedField(
         queryset = Product.objects.all(),
     )
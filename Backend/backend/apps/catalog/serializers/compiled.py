@@ -0,0 +1,243 @@
+# apps/catalog/serializers/compiled.py
+"""
+Compiled read path for catalog serializers.
+
+For every object and every field DRF goes through Field.get_attribute(),
+SkipField/None checks and the generic to_representation() dispatch. The
+set of fields is fixed for the whole response, so CompiledSerializer
+walks a serializer's readable fields once and keeps one small render
+function per field; rendering a row is then a loop of plain calls that
+fills a dict.
+
+Values are still converted by the fields' own to_representation() (or
+by an equivalent builtin such as str), so the output is the same as
+serializer.data. Rows can be model instances or, for serializers
+without method fields or to-many relations, `.values()` dicts.
+"""
+import decimal
+from operator import attrgetter, itemgetter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Manager
+from rest_framework import ISO_8601, fields, relations, serializers
+from rest_framework.settings import api_settings
+
+
+def compiled_enabled() -> bool:
+    return getattr(settings, "CATALOG_COMPILED_SERIALIZERS", True)
+
+
+def _datetime_convert(field):
+    """DateTimeField.to_representation with the timezone looked up once."""
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if tz is None:
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, str) or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+    return convert
+
+
+def _decimal_convert(field):
+    """DecimalField.to_representation with the quantize context built once."""
+    coerce_to_string = getattr(
+        field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+    )
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return field.to_representation
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            return field.to_representation(value)
+        return "{:f}".format(value.quantize(exponent, rounding=rounding, context=context))
+    return convert
+
+
+def _fast_convert(field):
+    """A cheaper equivalent of field.to_representation, if there is one."""
+    if type(field) in (fields.CharField, fields.SlugField, fields.EmailField):
+        return str
+    if type(field) is fields.UUIDField and field.uuid_format == "hex_verbose":
+        return str
+    if type(field) is fields.IntegerField:
+        return int
+    if type(field) is fields.DateTimeField:
+        return _datetime_convert(field)
+    if type(field) is fields.DecimalField:
+        return _decimal_convert(field)
+    return field.to_representation
+
+
+def _nullable(get, convert):
+    def render(obj):
+        value = get(obj)
+        return None if value is None else convert(value)
+    return render
+
+
+class CompiledSerializer:
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.model = serializer.Meta.model
+        self.fields = list(serializer._readable_fields)
+        self.names = [field.field_name for field in self.fields]
+        self.renderers = [self._compile(field) for field in self.fields]
+        self._row_renderers = {}
+
+    # ---------- Model instances ----------
+
+    def render(self, instance) -> dict:
+        return {
+            name: render(instance)
+            for name, render in zip(self.names, self.renderers)
+        }
+
+    def render_many(self, instances) -> list:
+        if isinstance(instances, Manager):
+            instances = instances.all()
+        render = self.render
+        return [render(instance) for instance in instances]
+
+    def _model_attname(self, name):
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete:
+            return None
+        return field.attname
+
+    def _getter(self, field):
+        attrs = field.source_attrs
+        if len(attrs) == 1 and self._model_attname(attrs[0]):
+            return attrgetter(attrs[0])
+        return field.get_attribute
+
+    def _compile(self, field):
+        if isinstance(field, serializers.ListSerializer):
+            child = self._child(field.child)
+            get = self._getter(field)
+            return lambda obj: child.render_many(get(obj))
+
+        if isinstance(field, serializers.BaseSerializer):
+            child = self._child(field)
+            return _nullable(self._getter(field), child.render)
+
+        if isinstance(field, fields.SerializerMethodField):
+            method = getattr(field.parent, field.method_name)
+            return method
+
+        if isinstance(field, relations.RelatedField) and field.use_pk_only_optimization():
+            attrs = field.source_attrs
+            attname = self._model_attname(attrs[-1]) if len(attrs) == 1 else None
+            if attname is None:
+                return _nullable(field.get_attribute, field.to_representation)
+            pk_field = field.pk_field
+            convert = pk_field.to_representation if pk_field is not None else None
+            get = attrgetter(attname)
+            if convert is None:
+                return get
+            return _nullable(get, convert)
+
+        return _nullable(self._getter(field), _fast_convert(field))
+
+    # ---------- .values() rows ----------
+
+    def values_lookups(self, prefix="") -> list:
+        """The lookups to pass to .values() for render_rows()."""
+        lookups = []
+        for field in self.fields:
+            key = self._row_key(field, prefix)
+            if isinstance(field, serializers.BaseSerializer):
+                child = self._child(field)
+                pk_key = f"{key}__{child.model._meta.pk.attname}"
+                child_lookups = child.values_lookups(f"{key}__")
+                if pk_key not in child_lookups:
+                    lookups.append(pk_key)
+                lookups.extend(child_lookups)
+            else:
+                lookups.append(key)
+        return lookups
+
+    def render_rows(self, rows) -> list:
+        render = self._row_renderer("")
+        return [render(row) for row in rows]
+
+    def _child(self, field):
+        child = getattr(field, "_compiled", None)
+        if child is None:
+            child = field._compiled = CompiledSerializer(field)
+        return child
+
+    def _row_key(self, field, prefix):
+        if isinstance(field, serializers.ListSerializer) or isinstance(
+            field, fields.SerializerMethodField
+        ) or len(field.source_attrs) != 1:
+            raise TypeError(
+                f"{type(self.serializer).__name__}.{field.field_name} can't be "
+                "rendered from .values() rows"
+            )
+        name = field.source_attrs[0]
+        if isinstance(field, relations.RelatedField):
+            name = self._model_attname(name) or name
+        return prefix + name
+
+    def _row_renderer(self, prefix):
+        renderer = self._row_renderers.get(prefix)
+        if renderer is not None:
+            return renderer
+
+        steps = []
+        for field in self.fields:
+            key = self._row_key(field, prefix)
+            if isinstance(field, serializers.BaseSerializer):
+                child = self._child(field)
+                pk_key = f"{key}__{child.model._meta.pk.attname}"
+                render_child = child._row_renderer(f"{key}__")
+
+                def step(row, pk_key=pk_key, render_child=render_child):
+                    return None if row[pk_key] is None else render_child(row)
+            elif isinstance(field, relations.RelatedField):
+                pk_field = field.pk_field
+                if pk_field is None:
+                    step = itemgetter(key)
+                else:
+                    step = _nullable(itemgetter(key), pk_field.to_representation)
+            else:
+                step = _nullable(itemgetter(key), _fast_convert(field))
+            steps.append((field.field_name, step))
+
+        def renderer(row):
+            return {name: step(row) for name, step in steps}
+
+        self._row_renderers[prefix] = renderer
+        return renderer
+
+
+class CompiledSerializerMixin:
+    """
+    Serializer mixin: to_representation() goes through a CompiledSerializer
+    built once per serializer instance (so once per response for lists).
+    """
+
+    def to_representation(self, instance):
+        if not compiled_enabled():
+            return super().to_representation(instance)
+        compiled = self.__dict__.get("_compiled")
+        if compiled is None:
+            compiled = self._compiled = CompiledSerializer(self)
+        return compiled.render(instance)
@@ -0,0 +1,59 @@
+# apps/catalog/serializers/dynamic.py
+
+from typing import Iterable, Optional
+
+
+def is_included(
+    name: str,
+    fields: Optional[Iterable[str]],
+    expand: Optional[Iterable[str]],
+    expandable_fields: Iterable[str] = (),
+) -> bool:
+    """
+    Whether a field is rendered for the given sparse fieldset.
+
+    `fields` keeps only the named fields and `expand` only the named
+    nested relations out of `expandable_fields`; None means "all".
+    """
+    if fields is not None and name not in fields:
+        return False
+    if expand is not None and name in expandable_fields and name not in expand:
+        return False
+    return True
+
+
+class DynamicFieldsMixin:
+    """
+    ModelSerializer mixin adding `fields=` and `expand=` kwargs.
+
+    Dropped fields are filtered out before DRF copies the declared
+    fields, so their nested serializers are never instantiated.
+    """
+
+    expandable_fields = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        self.only_fields = set(fields) if fields is not None else None
+        self.expand = set(expand) if expand is not None else None
+        super().__init__(*args, **kwargs)
+
+    def include_field(self, name: str) -> bool:
+        return is_included(name, self.only_fields, self.expand, self.expandable_fields)
+
+    def get_fields(self):
+        if self.only_fields is None and self.expand is None:
+            return super().get_fields()
+
+        self._declared_fields = {
+            name: field
+            for name, field in type(self)._declared_fields.items()
+            if self.include_field(name)
+        }
+        try:
+            return super().get_fields()
+        finally:
+            del self._declared_fields
+
+    def get_field_names(self, declared_fields, info):
+        names = super().get_field_names(declared_fields, info)
+        return [name for name in names if self.include_field(name)]
@@ -1,6 +1,8 @@
 # apps/catalog/serializers.py
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
 from ..models.products import Product, ProductImage
@@ -10,7 +12,11 @@ from ..models.reviews import Review
 from ..models.filters.genders import Gender
 from ..models.brands import Brand
 from ..models.wishlists import Wishlist  # if you created it here
+from ..models.cards import ProductCard
+from .. import images
 from .ProductVariant import ProductVariantSerializer
+from .compiled import CompiledSerializerMixin
+from .dynamic import DynamicFieldsMixin
 
 User = get_user_model()
 
@@ -38,17 +44,18 @@ class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Category
-        fields = ["id", "name", "slug", "parent"]
+        fields = ["id", "name", "slug", "parent", "depth"]
 
 
 # ---------- Product-related serializers ----------
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
-        fields = ["url", "is_primary", "sort_order"]
+        fields = ["url", "srcset", "is_primary", "sort_order"]
 
     def get_url(self, obj):
         request = self.context.get("request")
@@ -61,9 +68,19 @@ class ProductImageSerializer(serializers.ModelSerializer):
 
         return obj.image.url  # fallback
 
+    def get_srcset(self, obj):
+        """Resized WebP/JPEG renditions by MIME type ({} until generated)."""
+        request = self.context.get("request")
+        url = default_storage.url
+        if request:
+            return images.srcset(obj, lambda name: request.build_absolute_uri(url(name)))
+        return images.srcset(obj, url)
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(CompiledSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    # Nested relations that ?expand= can switch off.
+    expandable_fields = ("category", "gender", "brand", "variants", "images")
+
     category = CategorySerializer(read_only=True)
     gender = GenderSerializer(read_only=True)
     brand = BrandSerializer(read_only=True)
@@ -78,12 +95,10 @@ class ProductSerializer(serializers.ModelSerializer):
         source="brand", queryset=Brand.objects.all(), write_only=True
     )
     images = ProductImageSerializer(many=True, read_only=True) # Why many = True? Does it makes one product having more than one image url?
-    variants = serializers.SerializerMethodField()
+    # Nested (not a method field) so it reads the viewset's prefetch of
+    # variants with color/size instead of querying per product/variant.
+    variants = ProductVariantSerializer(many=True, read_only=True)
 
-    def get_variants(self,obj):
-        from .ProductVariant import ProductVariantSerializer
-        return ProductVariantSerializer(obj.variants.all(),many=True).data
-    
     class Meta:
         model = Product
         fields = [
@@ -98,12 +113,18 @@ class ProductSerializer(serializers.ModelSerializer):
             "brand",
             "brand_id",
             "is_published",
+            "min_price",
+            "rating_avg",
+            "rating_count",
             "variants",
             "created_at",
             "updated_at",
             "images",
         ]
-        read_only_fields = ["id", "created_at", "updated_at", "variants", "images"]
+        read_only_fields = [
+            "id", "min_price", "rating_avg", "rating_count",
+            "created_at", "updated_at", "variants", "images",
+        ]
 
 
 
@@ -141,13 +162,71 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 class ProductDetailSerializer(ProductSerializer):
     """
-    Detailed product view: includes variants and reviews.
+    Detailed product view: includes variants, the rating histogram and
+    the newest reviews (the rest are paged from /products/<id>/reviews/).
     """
+    expandable_fields = ProductSerializer.expandable_fields + ("reviews",)
+
     variants = ProductVariantSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
+    rating_histogram = serializers.ReadOnlyField()
+    reviews = ReviewSerializer(source="recent_reviews", many=True, read_only=True)
 
     class Meta(ProductSerializer.Meta):
-        fields = ProductSerializer.Meta.fields + ["variants", "reviews"]
+        fields = ProductSerializer.Meta.fields + ["variants", "rating_histogram", "reviews"]
+
+
+# ---------- Product cards (denormalized listing) ----------
+
+class ProductCardSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    id = serializers.UUIDField(source="product_id", read_only=True)
+    image = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductCard
+        fields = [
+            "id",
+            "name",
+            "slug",
+            "category_slug",
+            "gender_slug",
+            "brand_slug",
+            "min_price",
+            "max_price",
+            "total_stock",
+            "color_slugs",
+            "size_slugs",
+            "image",
+            "srcset",
+            "rating_avg",
+            "rating_count",
+            "created_at",
+        ]
+        read_only_fields = fields
+
+    def get_image(self, obj):
+        if not obj.primary_image:
+            return None
+
+        url = default_storage.url(obj.primary_image)
+        request = self.context.get("request")
+        if request:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_srcset(self, obj):
+        """Renditions of the card image by MIME type, as on ProductImageSerializer."""
+        if not obj.primary_image:
+            return {}
+        request = self.context.get("request")
+        url = default_storage.url
+        if request:
+            return images.manifest_srcset(
+                obj.primary_image_derivatives,
+                lambda name: request.build_absolute_uri(url(name)),
+                obj.primary_image,
+            )
+        return images.manifest_srcset(obj.primary_image_derivatives, url, obj.primary_image)
 
 
 # ---------- Collections ----------
@@ -186,3 +265,15 @@ class WishlistSerializer(serializers.ModelSerializer):
             "added_at",
         ]
         read_only_fields = ["id", "user", "product", "added_at"]
+
+
+class WishlistProductIdsSerializer(serializers.Serializer):
+    """Body of the wishlist membership and bulk add/remove actions."""
+
+    product_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+    def validate_product_ids(self, value):
+        limit = getattr(settings, "CATALOG_WISHLIST_BATCH", 100)
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} product ids per request.")
+        return list(dict.fromkeys(value))
@@ -0,0 +1,245 @@
+# apps/catalog/services.py
+
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+from . import cache as response_cache
+from .models import Product, ProductCard, ProductImage, ProductVariant, Review
+
+
+CARD_BATCH_SIZE = 500
+
+CARD_UPDATE_FIELDS = [
+    "name",
+    "slug",
+    "category_slug",
+    "gender_slug",
+    "brand_slug",
+    "is_published",
+    "min_price",
+    "max_price",
+    "total_stock",
+    "color_slugs",
+    "size_slugs",
+    "primary_image",
+    "primary_image_derivatives",
+    "rating_avg",
+    "rating_count",
+    "created_at",
+    "updated_at",
+]
+
+
+def effective_price():
+    """Expression for the price a shopper pays for a variant."""
+    return Coalesce("sale_price", "price")
+
+
+# ---------- Product prices ----------
+
+def refresh_product_prices(product_ids: Optional[Iterable] = None) -> int:
+    """
+    Recompute Product.min_price (all products if None) with a single
+    UPDATE. Returns the number of products updated.
+    """
+    lowest = (
+        ProductVariant.objects
+        .filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(lowest=Min(effective_price()))
+        .values("lowest")
+    )
+    queryset = Product.objects.all()
+    if product_ids is not None:
+        queryset = queryset.filter(pk__in=list(product_ids))
+    return queryset.update(min_price=Subquery(lowest))
+
+
+# ---------- Product ratings ----------
+
+RATING_STARS = range(1, 6)
+
+
+def _rating_average(total, count):
+    return Coalesce(
+        Round(Cast(total, FloatField()) / NullIf(count, 0), 2),
+        0.0,
+        output_field=FloatField(),
+    )
+
+
+def apply_review_rating(product_id, rating: int, sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) one review's rating from the stored
+    aggregates of a product, with a single UPDATE relative to the current
+    row, so concurrent reviews don't overwrite each other.
+    """
+    count = F("rating_count") + sign
+    total = F("rating_total") + sign * rating
+    Product.objects.filter(pk=product_id).update(
+        rating_count=count,
+        rating_total=total,
+        rating_avg=_rating_average(total, count),
+        **{f"rating_{rating}": F(f"rating_{rating}") + sign},
+    )
+
+
+def _review_aggregate(aggregate):
+    return Coalesce(
+        Subquery(
+            Review.objects
+            .filter(product=OuterRef("pk"))
+            .order_by()
+            .values("product")
+            .annotate(value=aggregate)
+            .values("value")
+        ),
+        0,
+    )
+
+
+def refresh_product_ratings(product_ids: Optional[Iterable] = None) -> int:
+    """
+    Recompute the stored review aggregates (all products if None) from
+    the reviews, with a single UPDATE. Returns the number of products
+    updated.
+    """
+    count = _review_aggregate(Count("pk"))
+    total = _review_aggregate(Sum("rating"))
+    queryset = Product.objects.all()
+    if product_ids is not None:
+        queryset = queryset.filter(pk__in=list(product_ids))
+    return queryset.update(
+        rating_count=count,
+        rating_total=total,
+        rating_avg=_rating_average(total, count),
+        **{
+            f"rating_{stars}": _review_aggregate(Count("pk", filter=Q(rating=stars)))
+            for stars in RATING_STARS
+        },
+    )
+
+
+# ---------- Product cards ----------
+
+def build_product_cards(product_ids: Iterable) -> List[ProductCard]:
+    """
+    Build (unsaved) ProductCard rows for the given products with a fixed
+    number of aggregate queries, whatever the batch size.
+    """
+    product_ids = list(product_ids)
+    products = (
+        Product.objects
+        .filter(pk__in=product_ids)
+        .values(
+            "id", "name", "slug", "is_published", "created_at",
+            "category__slug", "gender__slug", "brand__slug",
+            "rating_avg", "rating_count",
+        )
+    )
+
+    prices = {
+        row["product_id"]: row
+        for row in (
+            ProductVariant.objects
+            .filter(product_id__in=product_ids)
+            .values("product_id")
+            .annotate(
+                min_price=Min(effective_price()),
+                max_price=Max(effective_price()),
+                total_stock=Sum("in_stock"),
+            )
+            .order_by()
+        )
+    }
+
+    colors, sizes = {}, {}
+    available = (
+        ProductVariant.objects
+        .filter(product_id__in=product_ids, in_stock__gt=0)
+        .values_list("product_id", "color__slug", "size__slug", "size__sort_order")
+        .order_by("size__sort_order", "color__slug")
+    )
+    for product_id, color, size, _ in available:
+        product_colors = colors.setdefault(product_id, [])
+        if color not in product_colors:
+            product_colors.append(color)
+        product_sizes = sizes.setdefault(product_id, [])
+        if size not in product_sizes:
+            product_sizes.append(size)
+
+    images = {}
+    for product_id, image, derivatives in (
+        ProductImage.objects
+        .filter(product_id__in=product_ids)
+        .order_by("-is_primary", "sort_order")
+        .values_list("product_id", "image", "derivatives")
+    ):
+        images.setdefault(product_id, (image, derivatives))
+
+    cards = []
+    for product in products:
+        pk = product["id"]
+        price = prices.get(pk, {})
+        cards.append(ProductCard(
+            product_id=pk,
+            name=product["name"],
+            slug=product["slug"],
+            category_slug=product["category__slug"],
+            gender_slug=product["gender__slug"],
+            brand_slug=product["brand__slug"],
+            is_published=product["is_published"],
+            min_price=price.get("min_price"),
+            max_price=price.get("max_price"),
+            total_stock=price.get("total_stock") or 0,
+            color_slugs=sorted(colors.get(pk, [])),
+            size_slugs=sizes.get(pk, []),
+            primary_image=images.get(pk, ("",))[0] or "",
+            primary_image_derivatives=images.get(pk, (None, {}))[1] or {},
+            rating_avg=product["rating_avg"],
+            rating_count=product["rating_count"],
+            created_at=product["created_at"],
+        ))
+    return cards
+
+
+def refresh_product_cards(product_ids: Optional[Iterable] = None) -> int:
+    """
+    Upsert cards for the given products (all products if None).
+    Returns the number of cards written.
+    """
+    if product_ids is None:
+        product_ids = Product.objects.values_list("pk", flat=True).iterator(
+            chunk_size=CARD_BATCH_SIZE
+        )
+
+    written = 0
+    batch = []
+    for pk in product_ids:
+        batch.append(pk)
+        if len(batch) >= CARD_BATCH_SIZE:
+            written += _upsert_cards(batch)
+            batch = []
+    if batch:
+        written += _upsert_cards(batch)
+    # bulk_create sends no signals, so invalidate card responses here,
+    # after commit so a concurrent request can't re-cache the old rows
+    # under the new version.
+    if written:
+        transaction.on_commit(lambda: response_cache.bump_version(ProductCard))
+    return written
+
+
+def _upsert_cards(product_ids) -> int:
+    cards = build_product_cards(product_ids)
+    ProductCard.objects.bulk_create(
+        cards,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=CARD_UPDATE_FIELDS,
+    )
+    return len(cards)
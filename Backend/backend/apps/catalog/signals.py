@@ -0,0 +1,267 @@
+# apps/catalog/signals.py
+"""
+Keep derived catalog data (search index, product cards and prices,
+response-cache version tags) in sync with model writes. Connected in
+CatalogConfig.ready().
+"""
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from apps.orders.models import PURCHASED_STATUSES, Order
+
+from . import cache as response_cache
+from . import availability, facet_index, images, popularity, search, services, wishlist
+from .models import (
+    Brand,
+    Category,
+    Collection,
+    Color,
+    Gender,
+    Product,
+    ProductCard,
+    ProductCollection,
+    ProductImage,
+    ProductVariant,
+    Review,
+    Size,
+    Wishlist,
+)
+
+
+def _reindex_products(queryset):
+    index = search.loaded_index()
+    if index is not None:
+        index.add_rows(queryset.values_list(*search.PRODUCT_ROW_FIELDS))
+
+
+# ---------- Search index ----------
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(
+        lambda: _reindex_products(Product.objects.filter(pk=pk))
+    )
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    index = search.loaded_index()
+    if index is not None:
+        pk = instance.pk
+        transaction.on_commit(lambda: index.remove(pk))
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def reindex_related_products(sender, instance, created, **kwargs):
+    # New brands/categories have no products yet; renames touch many.
+    if created:
+        return
+    lookup = "brand" if sender is Brand else "category"
+    queryset = Product.objects.filter(**{lookup: instance})
+    transaction.on_commit(lambda: _reindex_products(queryset))
+
+
+# ---------- Image derivatives ----------
+
+@receiver(post_save, sender=ProductImage)
+def render_image_derivatives(sender, instance, **kwargs):
+    if not getattr(settings, "CATALOG_IMAGE_DERIVATIVES_ON_UPLOAD", True):
+        return
+    if not instance.image or images.is_current(instance):
+        return
+    pk = instance.pk
+    # Rendered on a background thread; the upload request doesn't wait
+    # for Pillow.
+    transaction.on_commit(lambda: images.render_later(pk))
+
+
+# ---------- Rating aggregates ----------
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    # What a loaded row counts for in the stored aggregates, read without
+    # touching deferred fields (those come back as None).
+    instance._counted_rating = (
+        instance.__dict__.get("product_id"), instance.__dict__.get("rating"),
+    )
+
+
+@receiver(post_save, sender=Review)
+def count_review_rating(sender, instance, created, **kwargs):
+    counted = None if created else instance._counted_rating
+    current = (instance.product_id, instance.rating)
+    if counted == current:
+        return
+    if created:
+        services.apply_review_rating(*current)
+    elif None in counted:
+        # Loaded with the rating deferred: recount from the reviews.
+        services.refresh_product_ratings([instance.product_id])
+    else:
+        services.apply_review_rating(*counted, sign=-1)
+        services.apply_review_rating(*current)
+    instance._counted_rating = current
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review_rating(sender, instance, **kwargs):
+    services.apply_review_rating(instance.product_id, instance.rating, sign=-1)
+
+
+# ---------- Product cards, prices and facet bitmaps ----------
+
+# Product ids whose derived data is stale, flushed once per committed
+# transaction so saving nine variants rebuilds the card once, not nine times.
+_stale_cards = threading.local()
+
+
+def schedule_card_refresh(product_ids):
+    pending = getattr(_stale_cards, "ids", None)
+    if pending is None:
+        pending = _stale_cards.ids = set()
+    pending.update(product_ids)
+    transaction.on_commit(_flush_card_refresh)
+
+
+def _flush_card_refresh():
+    pending = getattr(_stale_cards, "ids", None)
+    if not pending:
+        return
+    product_ids = list(pending)
+    pending.clear()
+    services.refresh_product_prices(product_ids)
+    services.refresh_product_cards(product_ids)
+    facet_index.refresh_products(product_ids)
+    availability.invalidate(product_ids)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_card_for_product(sender, instance, **kwargs):
+    schedule_card_refresh([instance.pk])
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_card_for_child(sender, instance, **kwargs):
+    schedule_card_refresh([instance.product_id])
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Gender)
+def refresh_cards_for_taxonomy(sender, instance, created, **kwargs):
+    if created:
+        return
+    if sender is Category:
+        # A move changes the ancestors of every product in the subtree.
+        products = Product.objects.filter(Category.subtree_q(instance.path, prefix="category__"))
+    else:
+        lookup = "brand" if sender is Brand else "gender"
+        products = Product.objects.filter(**{lookup: instance})
+    schedule_card_refresh(products.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Color)
+@receiver(post_save, sender=Size)
+def refresh_cards_for_variant_option(sender, instance, created, **kwargs):
+    if created:
+        return
+    lookup = "color" if sender is Color else "size"
+    schedule_card_refresh(
+        ProductVariant.objects
+        .filter(**{lookup: instance})
+        .values_list("product_id", flat=True)
+        .distinct()
+    )
+
+
+# ---------- Wishlist membership ----------
+
+@receiver(post_save, sender=Wishlist)
+@receiver(post_delete, sender=Wishlist)
+def invalidate_wishlist_ids(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: wishlist.invalidate(user_id))
+
+
+# ---------- Popularity ----------
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    # Read without touching a deferred status (comes back as None).
+    instance._counted_status = instance.__dict__.get("status")
+
+
+@receiver(post_save, sender=Order)
+def count_order_popularity(sender, instance, created, **kwargs):
+    counted = None if created else instance._counted_status
+    instance._counted_status = instance.status
+    if counted is None and not created:
+        return  # loaded with the status deferred; left to compact_popularity
+    was_purchased = counted in PURCHASED_STATUSES
+    is_purchased = instance.status in PURCHASED_STATUSES
+    if was_purchased == is_purchased:
+        return
+    pk = instance.pk
+    sign = 1 if is_purchased else -1
+    # After commit: an order's items may be saved after the order.
+    transaction.on_commit(lambda: popularity.apply_order(pk, sign))
+
+
+@receiver(post_save, sender=Wishlist)
+def count_wishlist_popularity(sender, instance, created, **kwargs):
+    if created:
+        popularity.apply_wishlist([instance.product_id], instance.added_at)
+
+
+@receiver(post_delete, sender=Wishlist)
+def uncount_wishlist_popularity(sender, instance, **kwargs):
+    popularity.apply_wishlist([instance.product_id], instance.added_at, sign=-1)
+
+
+# ---------- Response cache ----------
+
+# ProductCard is written in bulk (services.refresh_product_cards bumps it
+# then), but its rows are also deleted by cascade with their product.
+CACHED_MODELS = (
+    Product,
+    ProductCard,
+    ProductVariant,
+    ProductImage,
+    Review,
+    Category,
+    Gender,
+    Brand,
+    Color,
+    Size,
+    Collection,
+    ProductCollection,
+)
+
+
+def bump_cache_version(sender, **kwargs):
+    # After commit, so a concurrent request can't re-cache the old rows
+    # under the new version.
+    transaction.on_commit(lambda: response_cache.bump_version(sender))
+
+
+for _model in CACHED_MODELS:
+    post_save.connect(
+        bump_cache_version, sender=_model,
+        dispatch_uid=f"catalog-cache-save-{_model.__name__}",
+    )
+    post_delete.connect(
+        bump_cache_version, sender=_model,
+        dispatch_uid=f"catalog-cache-delete-{_model.__name__}",
+    )
@@ -0,0 +1,62 @@
+# apps/catalog/taxonomy.py
+"""
+The catalog taxonomy (genders, colors, sizes, brands, categories and
+collections) as one unpaginated payload, for the frontend to bootstrap
+its filters with a single request.
+
+The payload is keyed by a version hash built from the same validators
+as the conditional GETs (MAX(updated_at) and COUNT(*) per table), so it
+is identical across workers and changes only when one of those tables
+is written. It is rendered once per version and kept in the catalog
+cache for CATALOG_TAXONOMY_TIMEOUT: a version's payload never goes
+stale, so the timeout only bounds how long a superseded one lingers.
+"""
+from django.conf import settings
+
+from . import cache as response_cache
+from .models import Brand, Category, Collection, Color, Gender, Size
+from .serializers.ProductVariant import ColorSerializer, SizeSerializer
+from .serializers.serializers import (
+    BrandSerializer,
+    CategorySerializer,
+    CollectionSerializer,
+    GenderSerializer,
+)
+
+
+PAYLOAD_PREFIX = "catalog:taxonomy:"
+
+# Response key -> (model, ordering, serializer).
+SECTIONS = {
+    "genders": (Gender, ("label",), GenderSerializer),
+    "colors": (Color, ("name",), ColorSerializer),
+    "sizes": (Size, ("sort_order", "name"), SizeSerializer),
+    "brands": (Brand, ("name",), BrandSerializer),
+    "categories": (Category, ("depth", "name"), CategorySerializer),
+    "collections": (Collection, ("name",), CollectionSerializer),
+}
+MODELS = tuple(model for model, _, _ in SECTIONS.values())
+
+
+def current_version() -> str:
+    return response_cache.get_validators(MODELS)[1]
+
+
+def build(version: str) -> dict:
+    data = {"version": version}
+    for key, (model, ordering, serializer_class) in SECTIONS.items():
+        data[key] = serializer_class(model.objects.order_by(*ordering), many=True).data
+    return data
+
+
+def get_payload(version: str) -> dict:
+    if not response_cache.is_enabled():
+        return build(version)
+
+    cache = response_cache.get_cache()
+    key = PAYLOAD_PREFIX + version
+    data = cache.get(key)
+    if data is None:
+        data = build(version)
+        cache.set(key, data, getattr(settings, "CATALOG_TAXONOMY_TIMEOUT", 7 * 24 * 3600))
+    return data
@@ -1,3 +1,1714 @@
-from django.test import TestCase
+import base64
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.checks.registry import registry
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from apps.accounts.models import Address
+from apps.orders.models import Order, OrderItem, OrderStatus
+
+from . import associations, checks, facet_index, images, popularity, search, taxonomy
+from . import cache as response_cache
+from .cache import bump_version, get_cache
+from .management.commands.generate_catalog import SEED_IMAGE_SUFFIXES, SEED_IMAGES_DIR, seed_images
+from .pagination import KeysetPagination
+from .serializers.compiled import CompiledSerializer
+from .serializers.serializers import ProductCardSerializer
+from .serializers.ProductVariant import ProductVariantSerializer
+from .models import (
+    Brand,
+    Category,
+    Collection,
+    Color,
+    Gender,
+    Product,
+    ProductAssociation,
+    ProductCard,
+    ProductImage,
+    ProductVariant,
+    Review,
+    Size,
+    Wishlist,
+)
+from .services import refresh_product_cards, refresh_product_prices, refresh_product_ratings
+
+User = get_user_model()
+
+
+class CatalogFixtures:
+    """
+    Small catalog builder shared by the catalog test cases. The
+    process-wide search and facet indexes are dropped around every test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        search.reset_index()
+        facet_index.reset_index()
+
+    def tearDown(self):
+        search.reset_index()
+        facet_index.reset_index()
+        super().tearDown()
+
+    @classmethod
+    def create_taxonomy(cls):
+        cls.gender = Gender.objects.create(label="Men", slug="men")
+        cls.brand = Brand.objects.create(name="Nike", slug="nike")
+        cls.shoes = Category.objects.create(name="Shoes", slug="shoes")
+        cls.running = Category.objects.create(
+            name="Running", slug="running", parent=cls.shoes
+        )
+        cls.colors = [
+            Color.objects.create(name=name.title(), slug=name, hex_code="#000000")
+            for name in ("red", "black", "white")
+        ]
+        cls.sizes = [
+            Size.objects.create(name=str(n), slug=str(n), sort_order=n)
+            for n in (8, 9, 10)
+        ]
+        Collection.objects.create(name="Best Sellers", slug="best-sellers")
+        cls.user = User.objects.create_user(email="shopper@example.com", password="x")
+        cls.product_count = 0
+
+    @classmethod
+    def create_product(cls):
+        cls.product_count += 1
+        n = cls.product_count
+        product = Product.objects.create(
+            name=f"Nike Pegasus {n}",
+            slug=f"nike-pegasus-{n}",
+            description="Road running shoe.",
+            category=cls.running,
+            gender=cls.gender,
+            brand=cls.brand,
+            is_published=True,
+        )
+        for color in cls.colors:
+            for size in cls.sizes:
+                ProductVariant.objects.create(
+                    product=product,
+                    sku=f"PEG{n}-{color.slug}-{size.slug}",
+                    price=Decimal("100.00"),
+                    sale_price=Decimal("80.00") if size.slug == "9" else None,
+                    color=color,
+                    size=size,
+                    in_stock=5,
+                )
+        ProductImage.objects.create(
+            product=product, image=f"products/peg-{n}.jpg", is_primary=True
+        )
+        Review.objects.create(product=product, user=cls.user, rating=4)
+        Wishlist.objects.create(product=product, user=cls.user)
+        return product
+
+
+@override_settings(
+    SEARCH_INDEX_PATH=None,
+    CATALOG_RESPONSE_CACHE=False,
+    CATALOG_CONDITIONAL_GET=False,
+)
+class CatalogQueryBudgetTests(CatalogFixtures, APITestCase):
+    """
+    Every catalog endpoint runs in a fixed number of queries: the count
+    is asserted against a budget and must not change when the number of
+    rows returned grows. Budgets are for the uncached path.
+    """
+
+    # (url, budget). Budgets are exact so regressions show up as failures.
+    ENDPOINTS = [
+        ("/api/catalog/products/", 4),
+        ("/api/catalog/products/?color=red,black&size=9", 4),
+        ("/api/catalog/products/?search=pegasus", 4),
+        ("/api/catalog/products/?pagination=cursor&count=false", 3),
+        ("/api/catalog/products/?fields=id,name,slug", 2),
+        ("/api/catalog/products/?expand=images", 3),
+        ("/api/catalog/products/?ordering=price&price_min=50", 4),
+        ("/api/catalog/products/facets/?color=red", 6),
+        ("/api/catalog/variants/", 2),
+        ("/api/catalog/product-cards/", 2),
+        ("/api/catalog/categories/", 2),
+        ("/api/catalog/collections/", 2),
+        ("/api/catalog/genders/", 2),
+        ("/api/catalog/colors/", 2),
+        ("/api/catalog/sizes/", 2),
+        ("/api/catalog/brands/", 2),
+        ("/api/catalog/reviews/", 2),
+        ("/api/catalog/wishlist/", 2),
+    ]
+
+    DETAIL_ENDPOINTS = [
+        ("/api/catalog/products/{pk}/", 4),
+        ("/api/catalog/products/{pk}/?expand=", 1),
+        ("/api/catalog/products/{pk}/variants/", 2),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.product = cls.create_product()
+        cls.create_product()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        refresh_product_cards()
+        search.get_index()
+        facet_index.get_index()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(captured)
+
+    def grow_catalog(self, products=6):
+        for _ in range(products):
+            self.create_product()
+        refresh_product_cards()
+        search.reset_index()
+        search.get_index()
+        facet_index.reset_index()
+        facet_index.get_index()
+
+    def test_list_endpoints_stay_within_budget_as_catalog_grows(self):
+        small = {url: self.count_queries(url) for url, _ in self.ENDPOINTS}
+        self.grow_catalog()
+
+        for url, budget in self.ENDPOINTS:
+            with self.subTest(url=url):
+                large = self.count_queries(url)
+                self.assertEqual(small[url], large, f"{url} scales with rows")
+                self.assertLessEqual(large, budget, url)
+
+    def test_detail_endpoints_stay_within_budget(self):
+        for template, budget in self.DETAIL_ENDPOINTS:
+            url = template.format(pk=self.product.pk)
+            with self.subTest(url=url):
+                self.assertLessEqual(self.count_queries(url), budget, url)
+
+
+@override_settings(SEARCH_INDEX_PATH=None, CATALOG_RESPONSE_CACHE=True)
+class CatalogResponseCacheTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.product = cls.create_product()
+
+    def setUp(self):
+        super().setUp()
+        get_cache().clear()
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = self.client.get("/api/catalog/products/?color=red")
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/catalog/products/?color=red")
+        self.assertEqual(first.json(), second.json())
+
+    def test_stats_count_each_lookup_once(self):
+        before = response_cache.stats()
+        self.client.get("/api/catalog/colors/")
+        self.client.get("/api/catalog/colors/")
+        after = response_cache.stats()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+
+    def test_write_invalidates_only_dependent_responses(self):
+        self.client.get("/api/catalog/products/")
+        self.client.get("/api/catalog/colors/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=self.user, rating=2)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get("/api/catalog/products/")
+        self.assertGreater(len(captured), 0)
+        with self.assertNumQueries(0):
+            self.client.get("/api/catalog/colors/")
+
+
+class SharedCacheCheckTests(APITestCase):
+    redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache",
+                         "LOCATION": "redis://localhost:6379"}}
+
+    def test_deploy_check_rejects_per_process_cache(self):
+        errors = checks.check_shared_cache()
+        self.assertEqual([error.id for error in errors], ["catalog.E001"])
+        self.assertIn(checks.check_shared_cache, registry.get_checks(include_deployment_checks=True))
+        self.assertNotIn(checks.check_shared_cache, registry.get_checks())
+
+    def test_shared_or_unused_cache_passes(self):
+        with self.settings(CACHES=self.redis):
+            self.assertEqual(checks.check_shared_cache(), [])
+        with self.settings(CATALOG_RESPONSE_CACHE=False, CATALOG_CONDITIONAL_GET=False):
+            self.assertEqual(checks.check_shared_cache(), [])
+
+
+@override_settings(SEARCH_INDEX_PATH=None, CATALOG_RESPONSE_CACHE=False)
+class CatalogConditionalGetTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.product = cls.create_product()
+
+    def setUp(self):
+        super().setUp()
+        get_cache().clear()
+
+    @contextmanager
+    def later(self, seconds=2):
+        now = time.time() + seconds
+        with mock.patch.object(time, "time", return_value=now), \
+                mock.patch.object(time, "time_ns", return_value=int(now * 10 ** 9)):
+            yield
+
+    def test_matching_etag_short_circuits_to_304(self):
+        url = f"/api/catalog/products/{self.product.pk}/"
+        first = self.client.get(url)
+        self.assertTrue(first["ETag"].startswith('"'))
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+        with self.later():
+            dated = self.client.get(url)
+            third = self.client.get(url, HTTP_IF_MODIFIED_SINCE=dated["Last-Modified"])
+        self.assertEqual(third.status_code, 304)
+
+    def test_last_modified_waits_for_the_second_to_pass(self):
+        # Tags are created (bumped) by the first request.
+        first = self.client.get("/api/catalog/products/")
+        self.assertNotIn("Last-Modified", first)
+        with self.later():
+            self.assertIn("Last-Modified", self.client.get("/api/catalog/products/"))
+
+    def test_last_modified_follows_writes_without_updated_at(self):
+        url = f"/api/catalog/products/{self.product.pk}/"
+        self.client.get(url)
+        with self.later():
+            before = self.client.get(url)["Last-Modified"]
+        # A bulk write: updated_at and the counts stay, the tag is bumped.
+        with self.later(5):
+            Product.objects.filter(pk=self.product.pk).update(name="Renamed")
+            bump_version(Product)
+        with self.later(10):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=before)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "Renamed")
+        self.assertNotEqual(response["Last-Modified"], before)
+
+    def test_etag_depends_on_query_and_data(self):
+        plain = self.client.get("/api/catalog/products/")
+        filtered = self.client.get("/api/catalog/products/?color=red")
+        self.assertNotEqual(plain["ETag"], filtered["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.variants.first().delete()
+
+        response = self.client.get(
+            "/api/catalog/products/", HTTP_IF_NONE_MATCH=plain["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], plain["ETag"])
+
+
+@override_settings(SEARCH_INDEX_PATH=None, CATALOG_RESPONSE_CACHE=False)
+class SparseFieldsetTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.product = cls.create_product()
+
+    def test_fields_limits_rendered_fields(self):
+        response = self.client.get("/api/catalog/products/?fields=id,name,brand")
+        product = response.json()["results"][0]
+        self.assertEqual(set(product), {"id", "name", "brand"})
+        self.assertEqual(product["brand"]["slug"], "nike")
+
+    def test_expand_limits_nested_relations(self):
+        response = self.client.get(
+            f"/api/catalog/products/{self.product.pk}/?expand=reviews"
+        )
+        product = response.json()
+        self.assertIn("reviews", product)
+        self.assertIn("description", product)
+        for name in ("category", "gender", "brand", "variants", "images"):
+            self.assertNotIn(name, product)
+
+    def test_without_params_everything_is_rendered(self):
+        product = self.client.get("/api/catalog/products/").json()["results"][0]
+        self.assertEqual(len(product["variants"]), 9)
+        self.assertIn(product["variants"][0]["color"]["slug"], {"red", "black", "white"})
+
+
+@override_settings(SEARCH_INDEX_PATH=None, CATALOG_RESPONSE_CACHE=False)
+class CompiledSerializerTests(CatalogFixtures, APITestCase):
+    URLS = [
+        "/api/catalog/products/",
+        "/api/catalog/products/?fields=id,name,variants",
+        "/api/catalog/products/{pk}/",
+        "/api/catalog/products/{pk}/?expand=images",
+        "/api/catalog/variants/",
+        "/api/catalog/variants/?expand=color",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.product = cls.create_product()
+        cls.create_product()
+        ProductVariant.objects.filter(sku__endswith="-8").update(weight=0.5)
+
+    def test_output_is_byte_identical_to_drf(self):
+        for template in self.URLS:
+            url = template.format(pk=self.product.pk)
+            with self.subTest(url=url):
+                with self.settings(CATALOG_COMPILED_SERIALIZERS=False):
+                    expected = self.client.get(url).content
+                self.assertEqual(self.client.get(url).content, expected)
+
+    def test_values_rows_match_instances(self):
+        serializer = ProductVariantSerializer(context={})
+        compiled = CompiledSerializer(serializer)
+        queryset = ProductVariant.objects.order_by("sku")
+
+        rows = queryset.values(*compiled.values_lookups())
+        from_instances = compiled.render_many(queryset.select_related("color", "size"))
+        self.assertEqual(compiled.render_rows(rows), from_instances)
+
+
+@override_settings(SEARCH_INDEX_PATH=None, CATALOG_RESPONSE_CACHE=False)
+class ProductPriceTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.products = [cls.create_product() for _ in range(4)]
+        # Effective prices 80 (fixture default), 60, 90 and no variants.
+        ProductVariant.objects.filter(product=cls.products[1]).update(sale_price=Decimal("60.00"))
+        ProductVariant.objects.filter(product=cls.products[2]).update(
+            price=Decimal("90.00"), sale_price=None
+        )
+        ProductVariant.objects.filter(product=cls.products[3]).delete()
+        refresh_product_prices()
+
+    def names(self, url):
+        return [p["name"] for p in self.client.get(url).json()["results"]]
+
+    def test_ordering_by_effective_price_puts_unpriced_last(self):
+        p = [product.name for product in self.products]
+        self.assertEqual(self.names("/api/catalog/products/?ordering=price"), [p[1], p[0], p[2], p[3]])
+        self.assertEqual(self.names("/api/catalog/products/?ordering=-price"), [p[2], p[0], p[1], p[3]])
+
+    def test_price_range(self):
+        p = [product.name for product in self.products]
+        url = "/api/catalog/products/?price_min=70&price_max=85"
+        self.assertEqual(self.names(url), [p[0]])
+        self.assertEqual(self.client.get("/api/catalog/products/?price_min=abc").status_code, 400)
+
+    @mock.patch.object(KeysetPagination, "page_size", 1)
+    def test_cursor_pages_walk_through_nulls(self):
+        for ordering in ("price", "-price"):
+            with self.subTest(ordering=ordering):
+                url = f"/api/catalog/products/?pagination=cursor&ordering={ordering}"
+                seen = []
+                while url:
+                    body = self.client.get(url).json()
+                    seen += [p["name"] for p in body["results"]]
+                    url = body["next"]
+                self.assertEqual(seen, self.names(f"/api/catalog/products/?ordering={ordering}"))
+
+                back = self.client.get(body["previous"]).json()
+                self.assertEqual([p["name"] for p in back["results"]], seen[-2:-1])
+
+    def test_variant_writes_update_stored_price(self):
+        variant = self.products[0].variants.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            variant.sale_price = Decimal("10.00")
+            variant.save()
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].min_price, Decimal("10.00"))
+
+
+@override_settings(
+    SEARCH_INDEX_PATH=None,
+    CATALOG_RESPONSE_CACHE=False,
+    CATALOG_CONDITIONAL_GET=False,
+)
+@mock.patch.object(KeysetPagination, "page_size", 2)
+class KeysetPaginationTests(CatalogFixtures, APITestCase):
+    url = "/api/catalog/products/?pagination=cursor"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.products = [cls.create_product() for _ in range(5)]
+        # Three products share created_at: the id breaks the tie.
+        tied = cls.products[1].created_at
+        Product.objects.filter(pk__in=[p.pk for p in cls.products[1:4]]).update(created_at=tied)
+        cls.expected = [
+            str(pk) for pk in Product.objects.order_by("-created_at", "-pk").values_list("pk", flat=True)
+        ]
+
+    def ids(self, body):
+        return [p["id"] for p in body["results"]]
+
+    def test_first_page(self):
+        body = self.client.get(self.url).json()
+        self.assertEqual(body["count"], 5)
+        self.assertEqual(self.ids(body), self.expected[:2])
+        self.assertIsNone(body["previous"])
+        self.assertIsNotNone(body["next"])
+
+    def test_next_pages_walk_through_ties(self):
+        url, seen, pages = self.url, [], []
+        while url:
+            body = self.client.get(url).json()
+            seen += self.ids(body)
+            pages.append(body)
+            url = body["next"]
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+
+    def test_previous_pages_walk_back(self):
+        body = self.client.get(self.url).json()
+        body = self.client.get(body["next"]).json()
+        last = self.client.get(body["next"]).json()
+        self.assertEqual(self.ids(last), self.expected[4:])
+
+        back = self.client.get(last["previous"]).json()
+        self.assertEqual(self.ids(back), self.expected[2:4])
+        back = self.client.get(back["previous"]).json()
+        self.assertEqual(self.ids(back), self.expected[:2])
+        self.assertIsNone(back["previous"])
+
+    def test_invalid_cursor_is_not_found(self):
+        def cursor(payload):
+            return base64.urlsafe_b64encode(payload.encode()).decode()
+
+        for value in (
+            "not-base64!",
+            cursor("[1, 2]"),
+            cursor('{"v": ["2026-01-01T00:00:00+00:00"]}'),
+            cursor('{"v": ["notadate", "x"]}'),
+            cursor('{"v": ["2026-01-01T00:00:00+00:00", "not-a-uuid"]}'),
+            cursor('{"v": [{"a": 1}, []]}'),
+        ):
+            with self.subTest(cursor=value):
+                response = self.client.get(f"{self.url}&cursor={value}")
+                self.assertEqual(response.status_code, 404)
+
+    def test_price_cursor_is_checked_against_the_column(self):
+        response = self.client.get(
+            f"{self.url}&ordering=price&cursor="
+            + base64.urlsafe_b64encode(b'{"v": ["cheap", null]}').decode()
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    SEARCH_INDEX_PATH=None,
+    CATALOG_RESPONSE_CACHE=False,
+    CATALOG_IMAGE_DERIVATIVES_ON_UPLOAD=False,
+)
+class FacetIndexTests(CatalogFixtures, APITestCase):
+    SELECTIONS = [
+        "color=red",
+        "color=red,white&size=9",
+        "brand=adidas",
+        "brand=nike,adidas&color=black",
+        "size=8&category=running&gender=men",
+        "category=shoes&color=white",
+        "color=unknown",
+        "search=pegasus&color=red",
+        "price_min=85&size=10",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.products = [cls.create_product() for _ in range(4)]
+        cls.adidas = Brand.objects.create(name="Adidas", slug="adidas")
+        Product.objects.filter(pk=cls.products[1].pk).update(brand=cls.adidas)
+        ProductVariant.objects.filter(product=cls.products[2], color__slug="red").delete()
+        ProductVariant.objects.filter(product=cls.products[3], size__slug="10").update(
+            price=Decimal("150.00")
+        )
+        refresh_product_prices()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response.json()
+
+    def assert_same_as_orm(self):
+        for query in self.SELECTIONS:
+            with self.subTest(query=query):
+                indexed = self.get(f"/api/catalog/products/?{query}")
+                indexed_facets = self.get(f"/api/catalog/products/facets/?{query}")
+                with self.settings(FACET_INDEX=False):
+                    orm = self.get(f"/api/catalog/products/?{query}")
+                    orm_facets = self.get(f"/api/catalog/products/facets/?{query}")
+                self.assertEqual(indexed, orm)
+                self.assertEqual(indexed_facets, orm_facets)
+
+    def test_matches_orm_filters_and_counts(self):
+        self.assert_same_as_orm()
+
+    def test_refreshed_from_signals(self):
+        facet_index.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            variant = self.products[0].variants.get(color__slug="red", size__slug="8")
+            variant.color = Color.objects.create(name="Blue", slug="blue", hex_code="#0000ff")
+            variant.save()
+            self.products[3].delete()
+            self.create_product()
+
+        self.assertEqual(self.get("/api/catalog/products/?color=blue")["count"], 1)
+        self.assert_same_as_orm()
+
+    def test_rebuilt_when_another_process_writes(self):
+        index = facet_index.get_index()
+        self.assertIs(facet_index.get_index(), index)
+        # Another worker's write: this process gets no signal, only the
+        # version tag it bumps after commit.
+        ProductVariant.objects.filter(product=self.products[0], color__slug="red").update(
+            color=Color.objects.create(name="Blue", slug="blue", hex_code="#0000ff")
+        )
+        self.assertEqual(self.get("/api/catalog/products/?color=blue")["count"], 0)
+        bump_version(ProductVariant)
+
+        self.assertEqual(self.get("/api/catalog/products/?color=blue")["count"], 1)
+        self.assertIsNot(facet_index.get_index(), index)
+        self.assert_same_as_orm()
+
+
+@override_settings(
+    SEARCH_INDEX_PATH=None,
+    CATALOG_RESPONSE_CACHE=False,
+    CATALOG_CONDITIONAL_GET=False,
+)
+class ProductCardFilterTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.products = [cls.create_product() for _ in range(3)]
+        red, black, _ = cls.colors
+        # 2: red sold out; 3: black only, size 10 only.
+        ProductVariant.objects.filter(product=cls.products[1], color=red).update(in_stock=0)
+        ProductVariant.objects.filter(product=cls.products[2]).exclude(color=black).delete()
+        ProductVariant.objects.filter(product=cls.products[2]).exclude(size=cls.sizes[2]).delete()
+        refresh_product_cards()
+
+    def slugs(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return sorted(row["slug"] for row in response.json()["results"])
+
+    def test_color_and_size_match_products_listing(self):
+        for query in ("color=red", "color=black", "color=red,white", "size=10",
+                      "size=8", "color=black&size=10", "color=green"):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.slugs(f"/api/catalog/product-cards/?{query}"),
+                    self.slugs(f"/api/catalog/products/?{query}"),
+                )
+
+    def test_sold_out_color_still_matches(self):
+        self.assertEqual(
+            self.slugs("/api/catalog/product-cards/?color=red"), ["nike-pegasus-1", "nike-pegasus-2"]
+        )
+        card = ProductCard.objects.get(product=self.products[1])
+        self.assertNotIn("red", card.color_slugs)
+
+    @override_settings(CATALOG_RESPONSE_CACHE=True)
+    def test_deleting_a_product_drops_it_from_cached_card_list(self):
+        get_cache().clear()
+        # No variants: the cascade bumps no ProductVariant tag.
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductVariant.objects.filter(product=self.products[2]).delete()
+        self.assertIn("nike-pegasus-3", self.slugs("/api/catalog/product-cards/"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(pk=self.products[2].pk).delete()
+        self.assertEqual(self.slugs("/api/catalog/product-cards/"), ["nike-pegasus-1", "nike-pegasus-2"])
+
+    def test_filters_use_the_variant_keys(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/catalog/product-cards/?color=red&size=9")
+        self.assertFalse(any("LIKE" in q["sql"].upper() for q in queries.captured_queries))
+
+
+@override_settings(
+    SEARCH_INDEX_PATH=None,
+    CATALOG_RESPONSE_CACHE=False,
+    CATALOG_CONDITIONAL_GET=False,
+)
+class CategoryTreeTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.trail = Category.objects.create(name="Trail", slug="trail", parent=cls.running)
+        cls.apparel = Category.objects.create(name="Apparel", slug="apparel")
+        cls.products = [cls.create_product() for _ in range(3)]
+        Product.objects.filter(pk=cls.products[2].pk).update(category=cls.trail)
+        refresh_product_cards()
+
+    def slugs(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return sorted(row["slug"] for row in response.json()["results"])
+
+    def test_paths(self):
+        self.assertEqual(self.shoes.depth, 0)
+        self.assertEqual(self.trail.depth, 2)
+        self.assertTrue(self.trail.path.startswith(self.running.path))
+        self.assertTrue(self.running.path.startswith(self.shoes.path))
+
+    def test_parent_category_matches_subtree(self):
+        for use_index in (True, False):
+            with self.subTest(facet_index=use_index), self.settings(FACET_INDEX=use_index):
+                self.assertEqual(
+                    self.slugs("/api/catalog/products/?category=shoes"),
+                    ["nike-pegasus-1", "nike-pegasus-2", "nike-pegasus-3"],
+                )
+                self.assertEqual(
+                    self.slugs("/api/catalog/products/?category=trail"), ["nike-pegasus-3"]
+                )
+                self.assertEqual(self.slugs("/api/catalog/products/?category=apparel"), [])
+                counts = self.client.get("/api/catalog/products/facets/").json()["category"]
+                self.assertEqual(counts, {"shoes": 3, "running": 3, "trail": 1})
+
+    def test_product_cards_match_subtree(self):
+        self.assertEqual(len(self.slugs("/api/catalog/product-cards/?category=running")), 3)
+        self.assertEqual(len(self.slugs("/api/catalog/product-cards/?category=trail")), 1)
+
+    def test_move_reroots_descendants(self):
+        facet_index.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.running.parent = self.apparel
+            self.running.save()
+
+        self.trail.refresh_from_db()
+        self.assertTrue(self.trail.path.startswith(self.apparel.path))
+        self.assertEqual(self.trail.depth, 2)
+        self.assertEqual(len(self.slugs("/api/catalog/products/?category=apparel")), 3)
+        self.assertEqual(self.slugs("/api/catalog/products/?category=shoes"), [])
+
+    def test_cannot_move_under_own_subtree(self):
+        self.shoes.parent = self.trail
+        with self.assertRaises(ValidationError):
+            self.shoes.save()
+
+    def test_tree(self):
+        with self.assertNumQueries(1):
+            tree = self.client.get("/api/catalog/categories/tree/").json()
+        self.assertEqual([node["slug"] for node in tree], ["apparel", "shoes"])
+        running = tree[1]["children"][0]
+        self.assertEqual(running["slug"], "running")
+        self.assertEqual([node["slug"] for node in running["children"]], ["trail"])
+
+
+@override_settings(SEARCH_INDEX_PATH=None, CATALOG_RESPONSE_CACHE=True)
+class TaxonomyEndpointTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+
+    def setUp(self):
+        super().setUp()
+        get_cache().clear()
+
+    def test_returns_every_section_unpaginated(self):
+        response = self.client.get("/api/catalog/taxonomy/")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([row["slug"] for row in data["sizes"]], ["8", "9", "10"])
+        self.assertEqual([row["slug"] for row in data["categories"]], ["shoes", "running"])
+        self.assertEqual(len(data["collections"]), 1)
+        self.assertEqual(response["ETag"], f'"{data["version"]}"')
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_repeat_and_revalidation_skip_the_database(self):
+        etag = self.client.get("/api/catalog/taxonomy/")["ETag"]
+        with self.assertNumQueries(0):
+            self.client.get("/api/catalog/taxonomy/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/catalog/taxonomy/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_versioned_url_is_immutable(self):
+        version = self.client.get("/api/catalog/taxonomy/").json()["version"]
+        response = self.client.get(f"/api/catalog/taxonomy/{version}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+    def test_payload_outlives_the_response_cache_timeout(self):
+        version = self.client.get("/api/catalog/taxonomy/").json()["version"]
+        later = time.time() + 10 * settings.CATALOG_CACHE_TIMEOUT
+        with mock.patch.object(time, "time", return_value=later):
+            self.assertIsNotNone(get_cache().get(taxonomy.PAYLOAD_PREFIX + version))
+
+    def test_write_changes_version(self):
+        version = self.client.get("/api/catalog/taxonomy/").json()["version"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Brand.objects.create(name="Adidas", slug="adidas")
+
+        data = self.client.get("/api/catalog/taxonomy/").json()
+        self.assertNotEqual(data["version"], version)
+        self.assertIn("adidas", [row["slug"] for row in data["brands"]])
+
+        response = self.client.get(f"/api/catalog/taxonomy/{version}/")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], f"/api/catalog/taxonomy/{data['version']}/")
+
+
+@override_settings(
+    SEARCH_INDEX_PATH=None,
+    CATALOG_RESPONSE_CACHE=False,
+    CATALOG_CONDITIONAL_GET=False,
+    CATALOG_DETAIL_REVIEWS=2,
+)
+class ProductRatingTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.product = cls.create_product()
+        cls.other = cls.create_product()
+        cls.reviewers = [
+            User.objects.create_user(email=f"reviewer{n}@example.com", password="x")
+            for n in range(4)
+        ]
+        for user, rating in zip(cls.reviewers, (5, 5, 2, 1)):
+            Review.objects.create(product=cls.product, user=user, rating=rating)
+
+    def assert_aggregates(self, product, count, avg, histogram):
+        product.refresh_from_db()
+        self.assertEqual(product.rating_count, count)
+        self.assertEqual(product.rating_avg, avg)
+        self.assertEqual(product.rating_histogram, histogram)
+
+    def test_maintained_on_create_update_delete(self):
+        # The fixture review (4 stars) plus 5, 5, 2, 1.
+        self.assert_aggregates(
+            self.product, 5, 3.4, {"1": 1, "2": 1, "3": 0, "4": 1, "5": 2}
+        )
+
+        review = Review.objects.get(product=self.product, user=self.reviewers[3])
+        review.rating = 3
+        review.save()
+        review.comment = "Grew on me."
+        review.save()
+        self.assert_aggregates(
+            self.product, 5, 3.8, {"1": 0, "2": 1, "3": 1, "4": 1, "5": 2}
+        )
+
+        review.product = self.other
+        review.save()
+        self.assert_aggregates(self.other, 2, 3.5, {"1": 0, "2": 0, "3": 1, "4": 1, "5": 0})
+
+        Review.objects.filter(product=self.product, rating=5).delete()
+        self.assert_aggregates(
+            self.product, 2, 3.0, {"1": 0, "2": 1, "3": 0, "4": 1, "5": 0}
+        )
+
+    def test_matches_recount(self):
+        review = Review.objects.get(product=self.product, user=self.reviewers[0])
+        review.rating = 1
+        review.save()
+        expected = Product.objects.values_list(
+            "rating_count", "rating_total", "rating_avg", "rating_1", "rating_5"
+        ).get(pk=self.product.pk)
+        refresh_product_ratings()
+        self.assertEqual(
+            Product.objects.values_list(
+                "rating_count", "rating_total", "rating_avg", "rating_1", "rating_5"
+            ).get(pk=self.product.pk),
+            expected,
+        )
+
+    def test_detail_embeds_newest_reviews_only(self):
+        data = self.client.get(f"/api/catalog/products/{self.product.pk}/").json()
+        self.assertEqual(data["rating_count"], 5)
+        self.assertEqual(data["rating_histogram"]["5"], 2)
+        newest = Review.objects.filter(product=self.product).order_by("-created_at", "-id")
+        self.assertEqual(
+            [review["id"] for review in data["reviews"]],
+            [str(review.pk) for review in newest[:2]],
+        )
+
+    def test_reviews_are_cursor_paginated(self):
+        url = f"/api/catalog/products/{self.product.pk}/reviews/"
+        seen = []
+        with mock.patch.object(KeysetPagination, "page_size", 2):
+            while url:
+                data = self.client.get(url).json()
+                self.assertEqual(data["count"], 5)
+                seen.extend(review["id"] for review in data["results"])
+                url = data["next"]
+        newest = Review.objects.filter(product=self.product).order_by("-created_at", "-id")
+        self.assertEqual(seen, [str(review.pk) for review in newest])
+
+        missing = self.client.get(f"/api/catalog/products/{self.reviewers[0].pk}/reviews/")
+        self.assertEqual(missing.status_code, 404)
+        malformed = self.client.get("/api/catalog/products/not-a-uuid/reviews/")
+        self.assertEqual(malformed.status_code, 404)
+
+
+class ImageDerivativeTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.product = cls.create_product()
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = self.settings(
+            MEDIA_ROOT=media_root,
+            CATALOG_IMAGE_WIDTHS=(200, 400, 800),
+            CATALOG_RESPONSE_CACHE=False,
+            CATALOG_CONDITIONAL_GET=False,
+            SEARCH_INDEX_PATH=None,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def upload(self, name="shoe.png", size=(600, 300)):
+        buffer = io.BytesIO()
+        Image.new("RGBA", size, (200, 30, 30, 128)).save(buffer, "PNG")
+        return ContentFile(buffer.getvalue(), name=name)
+
+    def create_rendered(self, **kwargs):
+        # Render in this thread instead of the background one, which can't
+        # see the test's uncommitted rows.
+        with mock.patch.object(images, "render_later", side_effect=images.refresh_derivatives):
+            with self.captureOnCommitCallbacks(execute=True):
+                image = ProductImage.objects.create(product=self.product, **kwargs)
+        image.refresh_from_db()
+        return image
+
+    def test_upload_request_only_queues_rendering(self):
+        with mock.patch.object(images, "render_later") as render_later:
+            with self.captureOnCommitCallbacks(execute=True):
+                image = ProductImage.objects.create(product=self.product, image=self.upload())
+        render_later.assert_called_once_with(image.pk)
+        self.assertEqual(ProductImage.objects.get(pk=image.pk).derivatives, {})
+
+    def test_renditions_on_upload(self):
+        image = self.create_rendered(image=self.upload())
+
+        manifest = image.derivatives
+        self.assertEqual(manifest["source"], image.image.name)
+        self.assertEqual((manifest["width"], manifest["height"]), (600, 300))
+        # No upscaling past the 600px source.
+        for fmt in ("webp", "jpeg"):
+            self.assertEqual([r["width"] for r in manifest["renditions"][fmt]], [200, 400])
+        for rendition in manifest["renditions"]["jpeg"]:
+            with default_storage.open(rendition["name"]) as stored:
+                self.assertEqual(
+                    rendition["name"],
+                    images.derivative_name(image.image.name, "jpeg", rendition["width"], stored.read()),
+                )
+                stored.seek(0)
+                self.assertEqual(Image.open(stored).width, rendition["width"])
+
+        data = self.client.get(f"/api/catalog/products/{self.product.pk}/").json()
+        srcset = next(img["srcset"] for img in data["images"] if img["url"].endswith(".png"))
+        self.assertEqual(sorted(srcset), ["image/jpeg", "image/webp"])
+        self.assertRegex(srcset["image/webp"], r"^http://testserver/media/\S+-200w\.\w{16}\.webp 200w, ")
+
+    def test_card_serves_primary_image_srcset(self):
+        ProductImage.objects.filter(product=self.product).update(is_primary=False)
+        image = self.create_rendered(image=self.upload(), is_primary=True)
+
+        card = self.client.get("/api/catalog/product-cards/").json()["results"][0]
+        self.assertTrue(card["image"].endswith(image.image.name))
+        self.assertEqual(sorted(card["srcset"]), ["image/jpeg", "image/webp"])
+        self.assertRegex(card["srcset"]["image/jpeg"], r"^http://testserver/media/\S+-200w\.\w{16}\.jpg 200w, ")
+
+        # A replaced file isn't served the old renditions.
+        card = ProductCard.objects.get(product=self.product)
+        card.primary_image = "products/other.png"
+        self.assertEqual(ProductCardSerializer(card).data["srcset"], {})
+
+    def test_stale_manifest_is_not_served(self):
+        image = self.create_rendered(image=self.upload())
+        image.image = self.upload("other.png")
+        self.assertEqual(images.srcset(image, str), {})
+
+    def test_backfill_command(self):
+        ProductImage.objects.filter(product=self.product).update(is_primary=False)
+        with self.settings(CATALOG_IMAGE_DERIVATIVES_ON_UPLOAD=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                image = ProductImage.objects.create(
+                    product=self.product, image=self.upload(), is_primary=True
+                )
+        self.assertEqual(ProductImage.objects.get(pk=image.pk).derivatives, {})
+
+        out = io.StringIO()
+        call_command("generate_image_derivatives", "--workers", "1", stdout=out)
+        image.refresh_from_db()
+        self.assertTrue(images.is_current(image))
+        self.assertEqual(
+            ProductCard.objects.get(product=self.product).primary_image_derivatives, image.derivatives
+        )
+        # The fixture image has no file behind it.
+        self.assertIn("1 failed", out.getvalue())
+
+
+@override_settings(SEARCH_INDEX_PATH=None, CATALOG_RESPONSE_CACHE=False)
+class ImportCatalogTests(CatalogFixtures, APITestCase):
+    HEADER = "slug,name,brand,category,gender,collections,sku,price,sale_price,color,size,in_stock\n"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.existing = cls.create_product()
+
+    def feed(self, content, suffix=".csv"):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with open(handle, "w", encoding="utf-8") as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_import(self, path, *args):
+        out = io.StringIO()
+        call_command("import_catalog", path, *args, "--batch-size", "2", stdout=out)
+        return out.getvalue()
+
+    def test_creates_then_updates_only_changes(self):
+        path = self.feed(self.HEADER + (
+            "air-max,Air Max,nike,running,men,best-sellers,AM-8,120,,red,8,3\n"
+            "air-max,Air Max,nike,running,men,best-sellers,AM-9,130,99.50,red,9,0\n"
+            "nike-pegasus-1,Pegasus Renamed,nike,running,men,,PEG1-red-8,100,80,red,8,5\n"
+            "broken,Broken,nike,running,men,,BR-1,abc,,red,8,1\n"
+            "broken,Broken,nike,running,men,,BR-2,10,,purple,8,1\n"
+        ))
+        output = self.run_import(path)
+        self.assertIn("products +1 ~1, variants +2 ~1", output)
+        self.assertIn("2 rows skipped", output)
+        self.assertIn("invalid price", output)
+        self.assertIn("unknown color 'purple'", output)
+
+        product = Product.objects.get(slug="air-max")
+        self.assertEqual(product.min_price, Decimal("99.50"))
+        self.assertEqual(product.card.total_stock, 3)
+        self.assertTrue(product.product_collections.filter(collection__slug="best-sellers").exists())
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Pegasus Renamed")
+
+        # Unchanged rows are only looked up, never written.
+        with self.assertNumQueries(11):
+            output = self.run_import(self.feed(self.HEADER + (
+                "air-max,Air Max,nike,running,men,best-sellers,AM-8,120,,red,8,3\n"
+                "air-max,Air Max,nike,running,men,best-sellers,AM-9,130,99.50,red,9,0\n"
+            )))
+        self.assertIn("products +0 ~0, variants +0 ~0, collection memberships +0", output)
+
+    def test_dry_run_writes_nothing(self):
+        path = self.feed(
+            '{"slug": "air-max", "name": "Air Max", "brand": "nike", "category": "running", '
+            '"gender": "men", "collections": ["best-sellers"], "sku": "AM-8", "price": 120, '
+            '"color": "red", "size": "8"}\n'
+            '{"slug": "nike-pegasus-1", "name": "Nike Pegasus 1", "brand": "nike", '
+            '"category": "running", "gender": "men", "sku": "PEG1-red-8", "price": "90", '
+            '"color": "red", "size": "8", "in_stock": 5}\n',
+            suffix=".jsonl",
+        )
+        # Slug maps, then one lookup each for products, variants and
+        # memberships (plus the batch savepoint).
+        with self.assertNumQueries(11):
+            output = self.run_import(path, "--dry-run")
+        self.assertIn("+ product air-max", output)
+        self.assertIn("+ collection best-sellers <- air-max", output)
+        self.assertIn("~ variant PEG1-red-8: price Decimal('100.00') -> Decimal('90.00')", output)
+        self.assertFalse(Product.objects.filter(slug="air-max").exists())
+        self.assertEqual(ProductVariant.objects.get(sku="PEG1-red-8").price, Decimal("100.00"))
+
+    def test_search_snapshot_is_only_rewritten_on_request(self):
+        snapshot = self.feed("live index", suffix=".pickle")
+        path = self.feed(self.HEADER + "air-max,Air Max,nike,running,men,,AM-8,120,,red,8,3\n")
+        with self.settings(SEARCH_INDEX_PATH=snapshot):
+            output = self.run_import(path)
+            self.assertIn("Search index snapshot left alone", output)
+            with open(snapshot) as stream:
+                self.assertEqual(stream.read(), "live index")
+
+            Product.objects.filter(slug="air-max").update(name="Old Name")
+            output = self.run_import(path, "--write-search-snapshot")
+        self.assertIn("Search index snapshot rewritten", output)
+        with open(snapshot, "rb") as stream:
+            index = pickle.load(stream)
+        self.assertEqual(index.search("air max"), [str(Product.objects.get(slug="air-max").pk)])
+
+    def test_non_finite_prices_and_bad_json_lines_are_skipped(self):
+        path = self.feed(
+            '{"slug": "air-max", "name": "Air Max", "brand": "nike", "category": "running", '
+            '"gender": "men", "sku": "AM-8", "price": "NaN", "color": "red", "size": "8"}\n'
+            '{"slug": "air-max", "name": "Air Max", "brand": "nike", "category": "running",\n'
+            '\n'
+            '["not", "an", "object"]\n'
+            '{"slug": "air-max", "name": "Air Max", "brand": "nike", "category": "running", '
+            '"gender": "men", "sku": "AM-9", "price": "120", "sale_price": "-Infinity", '
+            '"color": "red", "size": "9"}\n'
+            '{"slug": "air-max", "name": "Air Max", "brand": "nike", "category": "running", '
+            '"gender": "men", "sku": "AM-10", "price": "120", "color": "red", "size": "10"}\n',
+            suffix=".jsonl",
+        )
+        output = self.run_import(path)
+        self.assertIn("4 rows skipped", output)
+        self.assertIn("invalid price: 'NaN'", output)
+        self.assertIn("invalid sale_price: '-Infinity'", output)
+        self.assertIn("line 2: invalid JSON", output)
+        self.assertIn("line 4: expected a JSON object", output)
+        self.assertEqual(
+            list(ProductVariant.objects.filter(product__slug="air-max").values_list("sku", flat=True)),
+            ["AM-10"],
+        )
+
+    def test_sale_price_must_be_between_zero_and_price(self):
+        output = self.run_import(self.feed(self.HEADER + (
+            "air-max,Air Max,nike,running,men,,AM-8,120,-5,red,8,3\n"
+            "air-max,Air Max,nike,running,men,,AM-9,120,130,red,9,3\n"
+            "air-max,Air Max,nike,running,men,,AM-10,-1,,red,10,3\n"
+            "air-max,Air Max,nike,running,men,,AM-11,120,99,red,10,3\n"
+        )))
+        self.assertIn("3 rows skipped", output)
+        self.assertIn("sale_price must be non-negative", output)
+        self.assertIn("sale_price cannot be greater than price", output)
+        self.assertIn("price must be non-negative", output)
+        self.assertEqual(
+            list(ProductVariant.objects.filter(product__slug="air-max").values_list("sku", flat=True)),
+            ["AM-11"],
+        )
+
+    def test_caches_and_indexes_change_only_on_commit(self):
+        models = [Product, ProductVariant, ProductCard]
+        versions = response_cache.get_versions(models)
+        index = facet_index.get_index()
+        path = self.feed(self.HEADER + "air-max,Air Max,nike,running,men,,AM-8,120,,black,8,3\n")
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.run_import(path)
+        self.assertEqual(response_cache.get_versions(models), versions)
+        self.assertNotIn(str(Product.objects.get(slug="air-max").pk), index.doc_values)
+
+        for callback in callbacks:
+            callback()
+        self.assertTrue(all(
+            new != old for new, old in zip(response_cache.get_versions(models), versions)
+        ))
+        self.assertIn(str(Product.objects.get(slug="air-max").pk), index.doc_values)
+
+    def test_loaded_indexes_see_imported_products(self):
+        search_index, facets = search.get_index(), facet_index.get_index()
+        path = self.feed(self.HEADER + (
+            "air-max,Air Max,nike,running,men,,AM-8,120,,black,8,3\n"
+            "nike-pegasus-1,Pegasus Renamed,nike,running,men,,PEG1-red-8,100,80,red,8,5\n"
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import(path)
+
+        air_max = Product.objects.get(slug="air-max")
+        self.assertEqual(search_index.search("air max"), [str(air_max.pk)])
+        self.assertEqual(search_index.search("renamed"), [str(self.existing.pk)])
+        self.assertEqual(facets.doc_values[str(air_max.pk)]["color"], frozenset({"black"}))
+
+
+class GenerateCatalogTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = self.settings(MEDIA_ROOT=media_root, SEARCH_INDEX_PATH=None)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.media_root = media_root
+
+    def generate(self, *args):
+        call_command(
+            "generate_catalog", "--products", "12", "--variants-per-product", "3",
+            "--reviews-per-product", "2", "--users", "4", "--orders", "5",
+            "--batch-size", "5", *args, stdout=io.StringIO(),
+        )
+
+    def snapshot(self):
+        return (
+            list(Product.objects.order_by("slug").values_list("pk", "slug", "rating_count", "min_price")),
+            list(ProductVariant.objects.order_by("sku").values_list("pk", "sku", "price", "color__slug", "size__slug")),
+            list(Order.objects.order_by("pk").values_list("pk", "total_amount")),
+        )
+
+    def test_generates_requested_rows(self):
+        self.generate()
+
+        self.assertEqual(Product.objects.filter(slug__startswith="gen-").count(), 12)
+        self.assertEqual(ProductVariant.objects.count(), 36)
+        self.assertEqual(Review.objects.count(), 24)
+        self.assertEqual(User.objects.filter(email__startswith="gen-user-").count(), 4)
+        self.assertEqual(Order.objects.count(), 5)
+        # Derived data the signals would have written.
+        product = Product.objects.get(slug="gen-0000000")
+        self.assertEqual(product.rating_count, 2)
+        self.assertIsNotNone(product.min_price)
+        self.assertEqual(ProductCard.objects.count(), 12)
+        image = ProductImage.objects.filter(product=product).get()
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, image.image.name)))
+
+        with self.assertRaises(CommandError):
+            self.generate()
+
+    def test_seed_images_skip_non_image_files(self):
+        stray = SEED_IMAGES_DIR / ".DS_Store"
+        if not stray.exists():
+            stray.write_bytes(b"")
+            self.addCleanup(stray.unlink)
+        images = seed_images()
+        self.assertTrue(images)
+        self.assertNotIn(stray, images)
+        self.assertTrue(all(path.suffix in SEED_IMAGE_SUFFIXES for path in images))
+
+    def test_search_snapshot_is_left_alone(self):
+        handle, snapshot = tempfile.mkstemp(suffix=".pickle")
+        with open(handle, "w") as stream:
+            stream.write("live index")
+        self.addCleanup(os.remove, snapshot)
+        with self.settings(SEARCH_INDEX_PATH=snapshot):
+            self.generate()
+        with open(snapshot) as stream:
+            self.assertEqual(stream.read(), "live index")
+
+    def test_same_seed_same_rows(self):
+        self.generate()
+        first = self.snapshot()
+        Order.objects.all().delete()
+        Product.objects.all().delete()
+        User.objects.all().delete()
+
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+
+
+@override_settings(SEARCH_INDEX_PATH=None, CATALOG_RESPONSE_CACHE=True, CATALOG_LOW_STOCK=5)
+class ProductAvailabilityTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.product = cls.create_product()
+        variants = ProductVariant.objects.filter(product=cls.product)
+        variants.filter(sku__endswith="-white-10").delete()
+        variants.filter(sku__endswith="-black-8").update(in_stock=0)
+        variants.filter(sku__endswith="-red-10").update(in_stock=20)
+
+    def setUp(self):
+        super().setUp()
+        get_cache().clear()
+        self.url = f"/api/catalog/products/{self.product.pk}/availability/"
+
+    def test_matrix(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        data = response.json()
+        self.assertEqual([color["slug"] for color in data["colors"]], ["black", "red", "white"])
+        self.assertEqual(data["sizes"], [{"slug": s, "name": s} for s in ("8", "9", "10")])
+
+        black, red, white = data["matrix"]
+        self.assertEqual(
+            black[0],
+            {"variant": str(ProductVariant.objects.get(sku="PEG1-black-8").pk), "price": "100.00", "stock": "out"},
+        )
+        self.assertEqual((red[1]["price"], red[1]["stock"]), ("80.00", "low"))
+        self.assertEqual(red[2]["stock"], "in")
+        self.assertIsNone(white[2])
+
+        # Cached, and revalidated without a body.
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.json(), data)
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_invalidated_by_variant_changes(self):
+        etag = self.client.get(self.url)["ETag"]
+        variant = ProductVariant.objects.get(sku="PEG1-black-8")
+        with self.captureOnCommitCallbacks(execute=True):
+            variant.in_stock = 3
+            variant.sale_price = Decimal("70.00")
+            variant.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["matrix"][0][0]["stock"], "low")
+        self.assertEqual(response.json()["matrix"][0][0]["price"], "70.00")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_unknown_product(self):
+        self.assertEqual(self.client.get("/api/catalog/products/not-a-uuid/availability/").status_code, 404)
+        missing = "/api/catalog/products/00000000-0000-4000-8000-000000000000/availability/"
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+
+@override_settings(SEARCH_INDEX_PATH=None, CATALOG_RESPONSE_CACHE=True, CATALOG_WISHLIST_BATCH=3)
+class WishlistBulkTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.products = [cls.create_product() for _ in range(3)]
+        cls.shopper = User.objects.create_user(email="grid@example.com", password="x")
+        Wishlist.objects.create(user=cls.shopper, product=cls.products[0])
+
+    def setUp(self):
+        super().setUp()
+        get_cache().clear()
+        self.client.force_authenticate(self.shopper)
+        self.ids = [str(product.pk) for product in self.products]
+
+    def membership(self):
+        response = self.client.get(f"/api/catalog/wishlist/membership/?product_ids={','.join(self.ids)}")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["wishlisted"]
+
+    def test_membership_from_cached_set(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.membership(), self.ids[:1])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.membership(), self.ids[:1])
+        response = self.client.post(
+            "/api/catalog/wishlist/membership/", {"product_ids": self.ids[1:]}, format="json",
+        )
+        self.assertEqual(response.json(), {"wishlisted": []})
+
+        # A single add through the list endpoint drops the cached set.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/catalog/wishlist/", {"product_id": self.ids[2]}, format="json")
+        self.assertEqual(self.membership(), [self.ids[0], self.ids[2]])
+
+    def test_bulk_add_and_remove(self):
+        missing = "00000000-0000-4000-8000-000000000000"
+        self.membership()  # cache the set
+        with self.captureOnCommitCallbacks(execute=True):
+            # Product lookup, one INSERT, re-read of the inserted rows, one popularity UPDATE.
+            with self.assertNumQueries(4):
+                response = self.client.post(
+                    "/api/catalog/wishlist/bulk-add/", {"product_ids": self.ids[1:] + [missing]}, format="json",
+                )
+        self.assertEqual(response.json(), {"added": sorted(self.ids[1:])})
+        self.assertEqual(self.membership(), self.ids)
+
+        before = dict(Product.objects.values_list("pk", "popularity"))
+        added_at = dict(
+            Wishlist.objects.filter(user=self.shopper, product_id__in=self.ids[:2]).values_list("product_id", "added_at")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            # Row lookup, one DELETE, one popularity UPDATE, however many rows.
+            with self.assertNumQueries(3):
+                response = self.client.post(
+                    "/api/catalog/wishlist/bulk-remove/", {"product_ids": self.ids[:2]}, format="json",
+                )
+        self.assertEqual(response.json(), {"removed": 2})
+        self.assertEqual(self.membership(), self.ids[2:])
+        for product_id, when in added_at.items():
+            self.assertAlmostEqual(
+                Product.objects.get(pk=product_id).popularity,
+                before[product_id] - 0.5 * popularity.weight(when),
+            )
+        # Other users' wishlists are untouched.
+        self.assertEqual(Wishlist.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_add_reports_only_inserted_rows(self):
+        self.membership()  # cache the set, then make it stale (no signals)
+        Wishlist.objects.bulk_create([Wishlist(user=self.shopper, product=self.products[1])])
+        before = Product.objects.get(pk=self.products[1].pk).popularity
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/catalog/wishlist/bulk-add/", {"product_ids": self.ids[1:]}, format="json",
+            )
+        self.assertEqual(response.json(), {"added": [self.ids[2]]})
+        self.assertEqual(Product.objects.get(pk=self.products[1].pk).popularity, before)
+        self.assertGreater(Product.objects.get(pk=self.products[2].pk).popularity, before)
+
+    def test_validation(self):
+        url = "/api/catalog/wishlist/bulk-add/"
+        self.assertEqual(self.client.post(url, {"product_ids": ["nope"]}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"product_ids": []}, format="json").status_code, 400)
+        too_many = self.ids + ["00000000-0000-4000-8000-000000000000"]
+        self.assertEqual(self.client.post(url, {"product_ids": too_many}, format="json").status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.get("/api/catalog/wishlist/membership/").status_code, (401, 403))
+
+
+@override_settings(SEARCH_INDEX_PATH=None, CATALOG_RESPONSE_CACHE=False)
+class BoughtTogetherTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.products = [cls.create_product() for _ in range(4)]
+        refresh_product_cards()
+        address = Address.objects.create(
+            user=cls.user, type=Address.AddressType.SHIPPING, line1="1 Main St",
+            city="Portland", state="OR", country="US", postal_code="97201",
+        )
+        p1, p2, p3, p4 = cls.products
+        for status, lines in (
+            (OrderStatus.PAID, [p1, p2]),
+            (OrderStatus.DELIVERED, [p1, p2]),
+            (OrderStatus.SHIPPED, [p1, p1, p2, p3]),  # two variants of p1
+            (OrderStatus.PAID, [p1, p3]),
+            (OrderStatus.CANCELLED, [p1, p4]),
+            (OrderStatus.PAID, [p4]),
+        ):
+            order = Order.objects.create(
+                user=cls.user, status=status, total_amount=Decimal("0.00"),
+                shipping_address=address, billing_address=address,
+            )
+            variants = {}
+            for product in lines:
+                variants.setdefault(product, iter(product.variants.order_by("sku")))
+                OrderItem.objects.create(
+                    order=order, product_variant=next(variants[product]),
+                    price_at_purchase=Decimal("100.00"),
+                )
+
+    def neighbours(self, product):
+        return [
+            (row.related_id, row.rank, row.orders)
+            for row in ProductAssociation.objects.filter(product=product).order_by("rank")
+        ]
+
+    def test_counts_baskets(self):
+        counts = associations.count_baskets(
+            [(1, "a"), (1, "b"), (1, "b"), (2, "a"), (2, "c"), (3, "a"), (3, "b"), (3, "c")],
+            max_basket=2,
+        )
+        self.assertEqual(counts.baskets, 3)
+        self.assertEqual(
+            {counts.products[position]: n for position, n in counts.items.items()},
+            {"a": 3, "b": 2, "c": 2},
+        )
+        # The three-product order counts for its products, not for pairs.
+        pairs = {
+            tuple(counts.products[position] for position in counts.pair(key)): n
+            for key, n in counts.pairs.items()
+        }
+        self.assertEqual(pairs, {("a", "b"): 1, ("a", "c"): 1})
+
+    def test_rebuild_cosine(self):
+        p1, p2, p3, p4 = self.products
+        out = io.StringIO()
+        call_command("rebuild_product_associations", stdout=out)
+        self.assertIn("5 orders", out.getvalue())
+
+        # p1 in 4 purchased orders, p2 in 3, p3 in 2; the p2/p3 pair is
+        # seen once, under --min-orders.
+        self.assertEqual(self.neighbours(p1), [(p2.pk, 1, 3), (p3.pk, 2, 2)])
+        self.assertEqual(self.neighbours(p2), [(p1.pk, 1, 3)])
+        self.assertEqual(self.neighbours(p4), [])
+        self.assertAlmostEqual(ProductAssociation.objects.get(product=p1, rank=1).score, 3 / 12 ** 0.5, 5)
+
+        # Rebuilt from scratch, not appended to.
+        associations.rebuild(metric="lift", min_orders=1)
+        self.assertEqual(ProductAssociation.objects.filter(product=p2).count(), 2)
+        self.assertAlmostEqual(ProductAssociation.objects.get(product=p1, related=p2).score, 1.25, 5)
+
+    def test_endpoint(self):
+        p1, p2, p3, p4 = self.products
+        associations.rebuild()
+        Product.objects.filter(pk=p3.pk).update(is_published=False)
+        refresh_product_cards([p3.pk])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/catalog/products/{p1.pk}/bought-together/")
+        self.assertEqual(response.status_code, 200)
+        (result,) = response.json()["results"]
+        self.assertEqual((result["id"], result["slug"], result["orders"]), (str(p2.pk), p2.slug, 3))
+
+        empty = self.client.get(f"/api/catalog/products/{p4.pk}/bought-together/")
+        self.assertEqual(empty.json(), {"product": str(p4.pk), "results": []})
+        missing = "/api/catalog/products/00000000-0000-4000-8000-000000000000/bought-together/"
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+
+@override_settings(
+    SEARCH_INDEX_PATH=None,
+    CATALOG_RESPONSE_CACHE=False,
+    CATALOG_CONDITIONAL_GET=False,
+    CATALOG_POPULARITY_WISHLIST_WEIGHT=0.5,
+)
+class PopularityTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.products = [cls.create_product() for _ in range(3)]  # one wishlist add each
+        cls.staff = User.objects.create_user(email="staff@example.com", password="x", is_staff=True)
+        address = Address.objects.create(
+            user=cls.user, type=Address.AddressType.SHIPPING, line1="1 Main St",
+            city="Portland", state="OR", country="US", postal_code="97201",
+        )
+        cls.order = Order.objects.create(
+            user=cls.user, total_amount=Decimal("300.00"),
+            shipping_address=address, billing_address=address,
+        )
+        OrderItem.objects.create(
+            order=cls.order, product_variant=cls.products[1].variants.first(),
+            quantity=3, price_at_purchase=Decimal("100.00"),
+        )
+
+    def scores(self):
+        return [
+            Product.objects.get(pk=product.pk).popularity / popularity.weight(self.order.created_at)
+            for product in self.products
+        ]
+
+    def assertScores(self, expected):
+        for score, value in zip(self.scores(), expected):
+            self.assertAlmostEqual(score, value, places=3)
+
+    def ordered(self):
+        response = self.client.get("/api/catalog/products/?ordering=-popularity&fields=slug")
+        return [row["slug"] for row in response.json()["results"]]
+
+    def test_paid_orders_and_wishlists_are_counted_incrementally(self):
+        self.assertScores([0.5, 0.5, 0.5])
+
+        self.client.force_authenticate(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/orders/orders/{self.order.pk}/mark-paid/")
+        self.assertEqual(response.status_code, 200)
+        self.assertScores([0.5, 3.5, 0.5])
+        self.assertEqual(self.ordered()[0], self.products[1].slug)
+
+        # Shipping keeps the count; cancelling takes it back out.
+        order = Order.objects.get(pk=self.order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = OrderStatus.SHIPPED
+            order.save()
+        self.assertScores([0.5, 3.5, 0.5])
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = OrderStatus.CANCELLED
+            order.save()
+        self.assertScores([0.5, 0.5, 0.5])
+
+        Wishlist.objects.get(user=self.user, product=self.products[2]).delete()
+        self.assertScores([0.5, 0.5, 0.0])
+        self.client.post(
+            "/api/catalog/wishlist/bulk-add/", {"product_ids": [str(self.products[2].pk)]}, format="json",
+        )
+        self.assertScores([0.5, 0.5, 0.5])  # the staff user's add
+
+    def test_compaction_matches_incremental_scores(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.get(pk=self.order.pk)
+            order.status = OrderStatus.DELIVERED
+            order.save()
+        incremental = self.scores()
+        Product.objects.update(popularity=0.0)
+
+        out = io.StringIO()
+        call_command("compact_popularity", stdout=out)
+        self.assertIn("3 products", out.getvalue())
+        for score, expected in zip(self.scores(), incremental):
+            self.assertAlmostEqual(score, expected, places=6)
+
+    def test_score_changes_bump_the_product_version(self):
+        version = response_cache.get_versions([Product])
+        with self.captureOnCommitCallbacks(execute=True):
+            Wishlist.objects.get(user=self.user, product=self.products[2]).delete()
+        self.assertNotEqual(response_cache.get_versions([Product]), version)
+
+    def test_newer_events_weigh_more(self):
+        created = self.order.created_at
+        self.assertAlmostEqual(
+            popularity.weight(created) / popularity.weight(created - timedelta(days=14)), 2.0,
+        )
+
+
+
+@override_settings(
+    SEARCH_INDEX_PATH=None,
+    CATALOG_RESPONSE_CACHE=False,
+    CATALOG_CONDITIONAL_GET=False,
+)
+class FacetCountTests(CatalogFixtures, APITestCase):
+    """Expected /products/facets/ counts, with and without the bitmap index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.products = [cls.create_product() for _ in range(4)]
+        cls.adidas = Brand.objects.create(name="Adidas", slug="adidas")
+        Product.objects.filter(pk=cls.products[1].pk).update(brand=cls.adidas)
+        ProductVariant.objects.filter(product=cls.products[2], color__slug="red").delete()
+
+    def facets(self, query=""):
+        results = []
+        for use_index in (True, False):
+            with self.settings(FACET_INDEX=use_index):
+                facet_index.reset_index()
+                response = self.client.get(f"/api/catalog/products/facets/?{query}")
+                self.assertEqual(response.status_code, 200)
+                results.append(response.json())
+        self.assertEqual(results[0], results[1], query)
+        return results[0]
+
+    def test_unfiltered_counts(self):
+        data = self.facets()
+        self.assertEqual(data["total"], 4)
+        self.assertEqual(data["color"], {"red": 3, "black": 4, "white": 4})
+        self.assertEqual(data["size"], {"8": 4, "9": 4, "10": 4})
+        self.assertEqual(data["brand"], {"nike": 3, "adidas": 1})
+        self.assertEqual(data["gender"], {"men": 4})
+        self.assertEqual(data["category"], {"shoes": 4, "running": 4})
+
+    def test_own_facet_is_excluded(self):
+        data = self.facets("color=red")
+        self.assertEqual(data["total"], 3)
+        # Colors are counted without ?color=, so other colors stay selectable.
+        self.assertEqual(data["color"], {"red": 3, "black": 4, "white": 4})
+        self.assertEqual(data["size"], {"8": 3, "9": 3, "10": 3})
+        self.assertEqual(data["brand"], {"nike": 2, "adidas": 1})
+
+        data = self.facets("brand=adidas")
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(data["brand"], {"nike": 3, "adidas": 1})
+        self.assertEqual(data["color"], {"red": 1, "black": 1, "white": 1})
+
+    def test_multi_value_facets(self):
+        # Values of one facet are OR-ed, facets are AND-ed.
+        data = self.facets("color=red,white&brand=nike,adidas")
+        self.assertEqual(data["total"], 4)
+        data = self.facets("color=red&brand=nike,adidas&size=9")
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(data["brand"], {"nike": 2, "adidas": 1})
+        self.assertEqual(data["color"], {"red": 3, "black": 4, "white": 4})
+        self.assertEqual(self.facets("color=red&brand=adidas,puma")["total"], 1)
+        self.assertEqual(self.facets("color=unknown")["total"], 0)
+
+
+class SearchIndexTests(APITestCase):
+    def setUp(self):
+        self.index = search.SearchIndex()
+        self.index.add("a", {"name": "Pegasus Trail", "description": "Road and trail running shoe."})
+        self.index.add("b", {"name": "Air Max", "description": "Pegasus cushioning for the road."})
+        self.index.add("c", {"name": "Blazer", "brand": "Nike", "description": "Court classic."})
+
+    def test_and_semantics_and_prefix(self):
+        self.assertEqual(sorted(self.index.search("pegasus")), ["a", "b"])
+        self.assertEqual(self.index.search("pegasus trail"), ["a"])
+        self.assertEqual(self.index.search("road peg"), ["a", "b"])  # last term is a prefix
+        self.assertEqual(self.index.search("pegasus court"), [])
+        self.assertEqual(self.index.search("!!"), [])
+
+    def test_name_hits_rank_above_description_hits(self):
+        self.assertEqual(self.index.search("pegasus"), ["a", "b"])
+        self.assertEqual(self.index.search("nike"), ["c"])
+        self.assertEqual(self.index.search("pegasus", limit=1), ["a"])
+
+    def test_updates_and_removals(self):
+        self.index.add("b", {"name": "Air Max Plus"})  # re-add replaces
+        self.assertEqual(self.index.search("pegasus"), ["a"])
+        self.index.remove("a")
+        self.assertEqual(self.index.search("pegasus"), [])
+        self.assertEqual(len(self.index), 2)
+        self.assertNotIn("trail", self.index.postings)
+
+    def test_exact_id_lookup(self):
+        doc_id = "6f1c0d6e-8d8e-4c8f-9a43-6a7f7b0e5c11"
+        self.index.add(doc_id, {"name": "Cortez"})
+        self.assertEqual(self.index.search(doc_id.upper()), [doc_id])
+
+
+@override_settings(
+    SEARCH_INDEX_PATH=None,
+    CATALOG_RESPONSE_CACHE=False,
+    CATALOG_CONDITIONAL_GET=False,
+)
+class ProductSearchTests(CatalogFixtures, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_taxonomy()
+        cls.products = [cls.create_product() for _ in range(3)]
+        Product.objects.filter(pk=cls.products[2].pk).update(
+            name="Nike Vomero", description="Plush like the Pegasus.",
+        )
+
+    def slugs(self, query):
+        response = self.client.get(f"/api/catalog/products/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return [row["slug"] for row in response.json()["results"]], response.json()
+
+    def test_ranked_results(self):
+        slugs, data = self.slugs("search=pegasus")
+        # Name matches first; the description-only match comes last.
+        self.assertEqual(slugs[-1], "nike-pegasus-3")
+        self.assertEqual(set(slugs[:2]), {"nike-pegasus-1", "nike-pegasus-2"})
+        self.assertEqual(data["count"], 3)
+        self.assertIs(data["search_truncated"], False)
+
+        # An explicit ordering wins over relevance.
+        slugs, _ = self.slugs("search=pegasus&ordering=-created_at")
+        self.assertEqual(slugs, ["nike-pegasus-3", "nike-pegasus-2", "nike-pegasus-1"])
+        self.assertEqual(self.slugs("search=vomer")[0], ["nike-pegasus-3"])
+        self.assertEqual(self.slugs("search=nothing")[0], [])
+        self.assertNotIn("search_truncated", self.slugs("")[1])
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_truncation_is_reported(self):
+        slugs, data = self.slugs("search=pegasus")
+        self.assertEqual((len(slugs), data["count"], data["search_truncated"]), (2, 2, True))
+        facets = self.client.get("/api/catalog/products/facets/?search=pegasus").json()
+        self.assertIs(facets["search_truncated"], True)
+
+    def test_signals_update_the_index(self):
+        search.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.get(pk=self.products[0].pk)
+            product.name = "Nike Invincible"
+            product.save()
+        self.assertEqual(self.slugs("search=invincible")[0], ["nike-pegasus-1"])
+
+    def test_other_processes_writes_show_up_after_max_age(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, "search_index.pickle")
+        with self.settings(SEARCH_INDEX_PATH=path, SEARCH_INDEX_MAX_AGE=60):
+            self.assertEqual(len(search.get_index()), 3)
+            self.assertTrue(os.path.exists(path))  # written for the other workers
+
+            # A write this process never saw (another worker, a command).
+            Product.objects.filter(pk=self.products[0].pk).update(name="Nike Invincible")
+            self.assertEqual(self.slugs("search=invincible")[0], [])
+            with mock.patch("apps.catalog.search.time.time", return_value=time.time() + 61):
+                self.assertEqual(self.slugs("search=invincible")[0], ["nike-pegasus-1"])
+
+            # A snapshot rewritten by a command is loaded on the next search.
+            Product.objects.filter(pk=self.products[1].pk).update(name="Nike Zegama")
+            search.rewrite_snapshot()
+            os.utime(path, (time.time() + 1, time.time() + 1))
+            self.assertEqual(self.slugs("search=zegama")[0], ["nike-pegasus-2"])
@@ -6,6 +6,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ProductViewSet,
     ProductVariantViewSet,
+    ProductCardViewSet,
     CategoryViewSet,
     CollectionViewSet,
     GenderViewSet,
@@ -14,11 +15,14 @@ from .views import (
     BrandViewSet,
     ReviewViewSet,
     WishlistViewSet,
+    CatalogCacheStatsView,
+    TaxonomyView,
 )
 
 router = DefaultRouter()
 router.register("products", ProductViewSet, basename="product")
 router.register("variants", ProductVariantViewSet, basename="variant")
+router.register("product-cards", ProductCardViewSet, basename="product-card")
 router.register("categories", CategoryViewSet, basename="category")
 router.register("collections", CollectionViewSet, basename="collection")
 router.register("genders", GenderViewSet, basename="gender")
@@ -29,5 +33,12 @@ router.register("reviews", ReviewViewSet, basename="review")
 router.register("wishlist", WishlistViewSet, basename="wishlist")
 
 urlpatterns = [
+    path("cache-stats/", CatalogCacheStatsView.as_view(), name="catalog-cache-stats"),
+    path("taxonomy/", TaxonomyView.as_view(), name="catalog-taxonomy"),
+    path(
+        "taxonomy/<str:version>/",
+        TaxonomyView.as_view(),
+        name="catalog-taxonomy-version",
+    ),
     path("", include(router.urls)),
 ]
@@ -1,9 +1,19 @@
 # apps/catalog/views.py
 
+import uuid
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import viewsets, mixins, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from django.db.models import Prefetch
+from rest_framework.views import APIView
+from django.conf import settings
+from django.db.models import Count, F, Prefetch, Q
+from django.http import Http404
+from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response, patch_cache_control
 
 from .models.products import Product, ProductImage
 from .models.variants import ProductVariant
@@ -15,6 +25,7 @@ from .models.filters.colors import Color
 from .models.filters.sizes import Size
 from .models.brands import Brand  # if you created a separate brands.py
 from .models.wishlists import Wishlist  # if separate file
+from .models.cards import ProductCard
 
 from .serializers.serializers import (
     ProductSerializer,
@@ -26,80 +37,257 @@ from .serializers.serializers import (
     GenderSerializer,
     BrandSerializer,
     WishlistSerializer,
+    WishlistProductIdsSerializer,
+    ProductCardSerializer,
 )
 
 from .serializers.ProductVariant import ColorSerializer,SizeSerializer
+from .serializers.dynamic import is_included
+
+from . import cache as response_cache
+from . import associations, availability, facet_index, taxonomy, wishlist
+from .cache import CachedResponseMixin
+from .filters import CatalogOrderingFilter, IndexedSearchFilter
+from .pagination import CatalogPagination, KeysetPagination
 
 from apps.core.permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly
 
 
 # ---------- Catalog: read-only for users, writable for admin ----------
 
-class ProductViewSet(viewsets.ModelViewSet):
+# Query param -> lookup, shared by the product filters and facet counts.
+PRODUCT_FACETS = {
+    "color": "variants__color__slug",
+    "size": "variants__size__slug",
+    "gender": "gender__slug",
+    "brand": "brand__slug",
+    "category": "category__slug",
+}
+
+
+def split_param(params, key):
+    value = params.get(key)
+    if not value:
+        return []
+    return value.split(",")
+
+
+def category_subtree_q(slugs, prefix="category__"):
     """
-    /api/catalog/products/
-    List, retrieve, search, filter products.
-    Admins can create/update/delete.
+    Q for rows whose category is one of `slugs` or a descendant of one:
+    a range on the indexed materialized path per selected category.
     """
+    condition = Q(pk__in=[])
+    for path in Category.objects.filter(slug__in=slugs).values_list("path", flat=True):
+        condition |= Category.subtree_q(path, prefix=prefix)
+    return condition
 
-    def get_queryset(self):
 
-        def split_param(key):
-            value = request.GET.get(key)
-            if not value:
-                return []
-            split = value.split(",")
-            return split
+def category_subtree_counts(direct_counts):
+    """{category path: count} -> {slug: count for the whole subtree}."""
+    slugs = dict(Category.objects.values_list("path", "slug"))
+    counts = {}
+    for path, count in direct_counts.items():
+        for ancestor in Category.ancestor_paths(path):
+            slug = slugs.get(ancestor)
+            if slug is not None:
+                counts[slug] = counts.get(slug, 0) + count
+    return counts
 
-        queryset = (
-            Product.objects
-            .select_related("category", "gender", "brand", "default_variant")
-            .prefetch_related(
-                "variants",
-                "images",
-                Prefetch("reviews", queryset=Review.objects.select_related("user")),
-            )
-        )
-        request = self.request
 
-        # 🔹 MULTI-VALUE FILTERS (comma-separated)
-        colors = split_param("color")
-        sizes = split_param("size")
-        genders = split_param("gender")
-        brands = split_param("brand")
-        categories = split_param("category")
-
-        if colors:
-            queryset = queryset.filter(
-                variants__color__slug__in=colors
-            )
+class SparseFieldsetMixin:
+    """
+    ?fields=id,name,slug renders only those fields and ?expand=images
+    only those nested relations (an empty ?expand= renders none).
+    Applies to list/retrieve; get_queryset() can ask renders() to skip
+    joins and prefetches for fields that are not rendered.
+    """
 
-        if sizes:
-            queryset = queryset.filter(
-                variants__size__slug__in=sizes
-            )
+    sparse_actions = ("list", "retrieve")
 
-        if genders:
-            queryset = queryset.filter(
-                gender__slug__in=genders
-            )
+    def sparse_fieldset(self):
+        if self.action not in self.sparse_actions:
+            return None, None
+        params = self.request.query_params
+        fields = split_param(params, "fields") or None
+        expand = None
+        if "expand" in params:
+            expand = [name for name in split_param(params, "expand") if name]
+        return fields, expand
 
-        if brands:
-            queryset = queryset.filter(
-                brand__slug__in=brands
-            )
+    def renders(self, name):
+        fields, expand = self.sparse_fieldset()
+        expandable = getattr(self.get_serializer_class(), "expandable_fields", ())
+        return is_included(name, fields, expand, expandable)
 
-        if categories:
-            queryset = queryset.filter(
-                category__slug__in=categories
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.sparse_fieldset()
+        kwargs.setdefault("fields", fields)
+        kwargs.setdefault("expand", expand)
+        return super().get_serializer(*args, **kwargs)
+
+
+class ProductViewSet(CachedResponseMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
+    """
+    /api/catalog/products/
+    List, retrieve, search, filter products.
+    Admins can create/update/delete.
+    """
+
+    cache_models = (
+        Product, ProductVariant, ProductImage, Review,
+        Category, Gender, Brand, Color, Size,
+    )
+
+    def get_queryset(self):
+        queryset = Product.objects.all()
+
+        # Everything the serializers render is fetched up front, so a page
+        # costs the same number of queries whatever its size. Relations
+        # left out by ?fields= / ?expand= are not joined or prefetched.
+        related = [name for name in ("category", "gender", "brand") if self.renders(name)]
+        if related:
+            queryset = queryset.select_related(*related)
+        if not self.renders("description"):
+            queryset = queryset.defer("description")
+
+        if self.action in ("list", "retrieve"):
+            if self.renders("variants"):
+                queryset = queryset.prefetch_related(
+                    Prefetch(
+                        "variants",
+                        queryset=ProductVariant.objects.select_related("color", "size"),
+                    ),
+                )
+            if self.renders("images"):
+                queryset = queryset.prefetch_related("images")
+        if self.action == "retrieve" and self.renders("reviews"):
+            # Only the newest few; the rest are paged by the reviews action.
+            limit = getattr(settings, "CATALOG_DETAIL_REVIEWS", 5)
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "reviews",
+                    queryset=(
+                        Review.objects
+                        .select_related("user")
+                        .order_by("-created_at", "-id")[:limit]
+                    ),
+                    to_attr="_recent_reviews",
+                ),
             )
 
-        return queryset.distinct()
+        # Facet-only listings are paged straight off the bitmap index,
+        # see filter_queryset().
+        if self.indexed_listing() is not None:
+            return queryset
+
+        queryset = self.filter_price(queryset)
+        matched = self.match_facets()
+        if matched is not None:
+            return queryset.filter(pk__in=matched)
+        return self.filter_facets(queryset).distinct()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        listing = self.indexed_listing()
+        if listing is not None:
+            index, bitmap = listing
+            return facet_index.IndexedResults(index, bitmap, queryset)
+        return queryset
+
+    def split_param(self, key):
+        return split_param(self.request.GET, key)
+
+    def facet_selection(self):
+        return {
+            facet: values
+            for facet in PRODUCT_FACETS
+            if (values := self.split_param(facet))
+        }
+
+    def indexed_listing(self):
+        """
+        (index, bitmap) when the request is a plain facet-filtered list in
+        the default (newest first) order, which the index can page itself.
+        """
+        if self.action != "list" or not facet_index.is_enabled():
+            return None
+        params = self.request.query_params
+        if any(params.get(param) for param in (
+            "ordering", "search", "price_min", "price_max", "cursor", "pagination",
+        )):
+            return None
+        selection = self.facet_selection()
+        if not selection:
+            return None
+        index = facet_index.get_index()
+        return index, index.match(selection)
+
+    def match_facets(self):
+        """
+        Product ids matching the facet filters, from the bitmap index.
+        None when there is nothing to filter, the index is off or the
+        match is too large to pass as an id list (the joins are used).
+        """
+        selection = self.facet_selection()
+        if not selection or not facet_index.is_enabled():
+            return None
+        index = facet_index.get_index()
+        bitmap = index.match(selection)
+        if bitmap.bit_count() > getattr(settings, "FACET_INDEX_MAX_IDS", 10000):
+            return None
+        return index.product_ids(bitmap)
+
+    def filter_facets(self, queryset, exclude=None):
+        """
+        Apply the comma-separated facet filters from the query string,
+        optionally leaving one facet out (used for facet counts).
+        """
+        # 🔹 MULTI-VALUE FILTERS (comma-separated)
+        for facet, lookup in PRODUCT_FACETS.items():
+            if facet == exclude:
+                continue
+            values = self.split_param(facet)
+            if not values:
+                continue
+            if facet == "category":
+                # Parent categories include everything below them. The
+                # paths are looked up once per request, not per facet count.
+                if not hasattr(self, "_category_q"):
+                    self._category_q = category_subtree_q(values)
+                queryset = queryset.filter(self._category_q)
+            else:
+                queryset = queryset.filter(**{f"{lookup}__in": values})
+        return queryset
+
+    def filter_price(self, queryset):
+        """
+        💰 PRICE RANGE on the stored effective price (Product.min_price),
+        so no per-request aggregate over the variants.
+        """
+        params = self.request.query_params
+        for param, lookup in (("price_min", "min_price__gte"), ("price_max", "min_price__lte")):
+            value = params.get(param)
+            if not value:
+                continue
+            try:
+                value = Decimal(value)
+            except InvalidOperation:
+                value = None
+            if value is None or not value.is_finite():
+                raise ValidationError({param: "A valid number is required."})
+            queryset = queryset.filter(**{lookup: value})
+        return queryset
 
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = CatalogPagination
+    # Search runs last so it can rank results when no ?ordering= is given.
+    filter_backends = [CatalogOrderingFilter, IndexedSearchFilter]
     search_fields = ["id","name", "description", "brand__name", "category__name"]
-    ordering_fields = ["created_at", "updated_at"]
+    ordering_fields = ["created_at", "updated_at", "price", "popularity"]
+    # ?ordering=price sorts on the stored lowest effective variant price;
+    # ?ordering=-popularity is best selling first (see popularity.py).
+    ordering_aliases = {"price": "min_price"}
     ordering = ["-created_at"]
 
     def get_serializer_class(self):
@@ -124,8 +312,132 @@ class ProductViewSet(viewsets.ModelViewSet):
         )
         return Response(serializer.data)
 
+    @action(detail=True, methods=["get"], permission_classes=[permissions.AllowAny])
+    def availability(self, request, pk=None):
+        """
+        GET /api/catalog/products/{id}/availability/
+        Color x size matrix of variant id, effective price and stock
+        bucket (see availability.py). Cached per product until its
+        variants change; poll with If-None-Match.
+        """
+        try:
+            product_id = uuid.UUID(str(pk))
+        except ValueError:
+            raise Http404
+        data, etag = availability.get(product_id)
+        if data is None:
+            raise Http404
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(data)
+        response["ETag"] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    @action(
+        detail=True, methods=["get"], url_path="bought-together",
+        permission_classes=[permissions.AllowAny],
+    )
+    def bought_together(self, request, pk=None):
+        """
+        GET /api/catalog/products/{id}/bought-together/
+        Product cards of what is most often ordered with this product,
+        best first, with the score and number of shared orders. Built
+        offline by `manage.py rebuild_product_associations`.
+        """
+        try:
+            product_id = uuid.UUID(str(pk))
+        except ValueError:
+            raise Http404
+        rows = associations.bought_together(product_id)
+        if not rows and not Product.objects.filter(pk=product_id).exists():
+            raise Http404
+
+        cards = ProductCardSerializer(
+            [row.related.card for row in rows], many=True, context={"request": request},
+        ).data
+        return Response({
+            "product": str(product_id),
+            "results": [
+                {**card, "score": row.score, "orders": row.orders}
+                for row, card in zip(rows, cards)
+            ],
+        })
+
+    @action(detail=True, methods=["get"], permission_classes=[permissions.AllowAny])
+    def reviews(self, request, pk=None):
+        """
+        GET /api/catalog/products/{id}/reviews/
+        A product's reviews, newest first, keyset-paginated (?cursor=).
+        """
+        return self.cached_response(self._reviews, request, pk=pk)
+
+    def _reviews(self, request, pk=None):
+        # DRF's get_object_or_404: a malformed id is a 404, not a 500.
+        product = get_object_or_404(Product.objects.only("pk"), pk=pk)
+        queryset = (
+            Review.objects
+            .filter(product=product)
+            .select_related("user")
+            .order_by("-created_at", "-id")
+        )
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = ReviewSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """
+        GET /api/catalog/products/facets/?color=red,black&size=9
+        Product counts per facet value for the current filter set.
+        Each facet is counted with every other filter applied but not its
+        own, so counts stay correct for multi-select. Counted on the bitmap
+        index (plus one id query when ?search= or a price range narrows
+        the set), or with one aggregate query per facet without it.
+        """
+        return self.cached_response(self._facets, request)
+
+    def _facets(self, request):
+        base = self.filter_price(self.filter_queryset(Product.objects.all()))
+
+        if facet_index.is_enabled():
+            index = facet_index.get_index()
+            within = None
+            if base.query.where:
+                within = index.bitmap_of(base.values_list("pk", flat=True))
+            data = index.counts(self.facet_selection(), within)
+            if hasattr(request, "search_truncated"):
+                data["search_truncated"] = request.search_truncated
+            return Response(data)
+
+        data = {}
+        for facet, lookup in PRODUCT_FACETS.items():
+            if facet == "category":
+                lookup = "category__path"
+            matching = self.filter_facets(base, exclude=facet).values("pk")
+            rows = (
+                Product.objects
+                .filter(pk__in=matching)
+                .values(value=F(lookup))
+                .annotate(count=Count("pk", distinct=True))
+                .order_by()
+            )
+            data[facet] = {
+                row["value"]: row["count"]
+                for row in rows
+                if row["value"] is not None
+            }
+        data["category"] = category_subtree_counts(data["category"])
+
+        data["total"] = self.filter_facets(base).distinct().count()
+        if hasattr(request, "search_truncated"):
+            data["search_truncated"] = request.search_truncated
+        return Response(data)
 
-class ProductVariantViewSet(viewsets.ReadOnlyModelViewSet):
+
+class ProductVariantViewSet(CachedResponseMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Read-only list of variants.
     Filtering happens here (color, size, price, stock).
@@ -133,6 +445,8 @@ class ProductVariantViewSet(viewsets.ReadOnlyModelViewSet):
 
     serializer_class = ProductVariantSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = CatalogPagination
+    cache_models = (ProductVariant, Color, Size)
 
     # ordering
     filter_backends = [filters.OrderingFilter]
@@ -140,9 +454,10 @@ class ProductVariantViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ["price"]
 
     def get_queryset(self):
-        queryset = ProductVariant.objects.select_related(
-            "product", "color", "size"
-        )
+        queryset = ProductVariant.objects.all()
+        related = [name for name in ("color", "size") if self.renders(name)]
+        if related:
+            queryset = queryset.select_related(*related)
 
         params = self.request.query_params
 
@@ -179,40 +494,158 @@ class ProductVariantViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Category.objects.select_related("parent").all()
-    serializer_class = CategorySerializer
+class ProductCardViewSet(CachedResponseMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    /api/catalog/product-cards/
+    Product listing served from the denormalized ProductCard table:
+    one indexed query per page, no joins or prefetches.
+    Takes the same color/size/gender/brand/category filters as /products/,
+    with the same meaning: ?color=red matches a product with any red
+    variant, even if the card's color_slugs (in stock only) omit it.
+    """
+
+    serializer_class = ProductCardSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = CatalogPagination
+    # Variants too: the color/size filters read them.
+    cache_models = (ProductCard, ProductVariant)
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ["created_at"]
+    ordering = ["-created_at"]
 
+    def get_queryset(self):
+        queryset = ProductCard.objects.all()
+        params = self.request.query_params
 
-class CollectionViewSet(viewsets.ReadOnlyModelViewSet):
+        for facet in ("gender", "brand"):
+            values = split_param(params, facet)
+            if values:
+                queryset = queryset.filter(**{f"{facet}_slug__in": values})
+
+        categories = split_param(params, "category")
+        if categories:
+            subtree = Category.objects.filter(category_subtree_q(categories, prefix=""))
+            queryset = queryset.filter(category_slug__in=subtree.values("slug"))
+
+        # Matched against the variants, like /products/ (sold-out variants
+        # included), through the indexed variant color/size foreign keys;
+        # the card's slug arrays only list in-stock options.
+        for facet in ("color", "size"):
+            values = split_param(params, facet)
+            if values:
+                variants = ProductVariant.objects.filter(**{f"{facet}__slug__in": values})
+                queryset = queryset.filter(product_id__in=variants.values("product_id"))
+
+        return queryset
+
+
+class CategoryViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+    permission_classes = [permissions.AllowAny]
+    cache_models = (Category,)
+
+    @action(detail=False, methods=["get"])
+    def tree(self, request):
+        """
+        GET /api/catalog/categories/tree/
+        The whole category tree as nested `children`, built from one query
+        (parents come before their children when ordered by depth).
+        """
+        return self.cached_response(self._tree, request)
+
+    def _tree(self, request):
+        categories = list(Category.objects.order_by("depth", "name"))
+        data = self.get_serializer(categories, many=True).data
+
+        nodes = {}
+        roots = []
+        for category, node in zip(categories, data):
+            node["children"] = []
+            nodes[category.pk] = node
+            if category.parent_id in nodes:
+                nodes[category.parent_id]["children"].append(node)
+            else:
+                roots.append(node)
+        return Response(roots)
+
+
+class CollectionViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
     permission_classes = [permissions.AllowAny]
+    cache_models = (Collection,)
 
 
-class GenderViewSet(viewsets.ReadOnlyModelViewSet):
+class GenderViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Gender.objects.all()
     serializer_class = GenderSerializer
     permission_classes = [permissions.AllowAny]
+    cache_models = (Gender,)
 
 
-class ColorViewSet(viewsets.ReadOnlyModelViewSet):
+class ColorViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Color.objects.all()
     serializer_class = ColorSerializer
     permission_classes = [permissions.AllowAny]
+    cache_models = (Color,)
 
 
-class SizeViewSet(viewsets.ReadOnlyModelViewSet):
+class SizeViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Size.objects.all().order_by("sort_order")
     serializer_class = SizeSerializer
     permission_classes = [permissions.AllowAny]
+    cache_models = (Size,)
 
 
-class BrandViewSet(viewsets.ReadOnlyModelViewSet):
+class BrandViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
     permission_classes = [permissions.AllowAny]
+    cache_models = (Brand,)
+
+
+class TaxonomyView(APIView):
+    """
+    GET /api/catalog/taxonomy/
+    Genders, colors, sizes, brands, categories and collections in one
+    unpaginated response, plus its `version`. Revalidate with the ETag.
+
+    GET /api/catalog/taxonomy/<version>/
+    The same payload, cacheable forever. An outdated version redirects
+    to the current one.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, version=None):
+        current = taxonomy.current_version()
+        if version is not None and version != current:
+            response = redirect("catalog-taxonomy-version", version=current)
+            patch_cache_control(response, no_cache=True)
+            return response
+
+        etag = f'"{current}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(taxonomy.get_payload(current))
+        response["ETag"] = etag
+        if version is None:
+            patch_cache_control(response, public=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+        return response
+
+
+class CatalogCacheStatsView(APIView):
+    """
+    GET /api/catalog/cache-stats/
+    Response-cache hit/miss counters for ops (staff only); the same
+    counter as catalog_cache_requests_total on /metrics.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.stats())
 
 
 # ---------- Reviews (user-owned content) ----------
@@ -256,3 +689,46 @@ class WishlistViewSet(viewsets.ModelViewSet):
         # Prevent duplicates at app level (also enforce unique_together in model)
         instance = serializer.save(user=self.request.user)
         return instance
+
+    def _product_ids(self, data):
+        serializer = WishlistProductIdsSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["product_ids"]
+
+    @action(detail=False, methods=["get", "post"])
+    def membership(self, request):
+        """
+        GET  /api/catalog/wishlist/membership/?product_ids=<id>,<id>
+        POST /api/catalog/wishlist/membership/ {"product_ids": [...]}
+        Which of the given products are wishlisted, from the user's
+        cached id set (see wishlist.py); POST for long lists.
+        """
+        if request.method == "GET":
+            raw = request.query_params.get("product_ids", "")
+            data = {"product_ids": [value for value in raw.split(",") if value]}
+        else:
+            data = request.data
+        product_ids = self._product_ids(data)
+        wishlisted = wishlist.contains(request.user.pk, product_ids)
+        return Response({
+            "wishlisted": [str(pk) for pk in product_ids if str(pk) in wishlisted],
+        })
+
+    @action(detail=False, methods=["post"], url_path="bulk-add")
+    def bulk_add(self, request):
+        """
+        POST /api/catalog/wishlist/bulk-add/ {"product_ids": [...]}
+        Adds every product in one INSERT; unknown and already
+        wishlisted ids are skipped.
+        """
+        added = wishlist.add(request.user.pk, self._product_ids(request.data))
+        return Response({"added": sorted(added)}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"], url_path="bulk-remove")
+    def bulk_remove(self, request):
+        """
+        POST /api/catalog/wishlist/bulk-remove/ {"product_ids": [...]}
+        Removes every product in one DELETE.
+        """
+        removed = wishlist.remove(request.user.pk, self._product_ids(request.data))
+        return Response({"removed": removed}, status=status.HTTP_200_OK)
@@ -0,0 +1,100 @@
+# apps/catalog/wishlist.py
+"""
+A user's wishlisted product ids, kept as one set per user in the catalog
+cache so a product grid can ask "which of these are wishlisted?" without
+loading the wishlist:
+
+    wishlist.contains(user.pk, [id1, id2, ...])  ->  {id2}
+
+The set is dropped when the user's wishlist changes: by the signals on
+saves and deletes (see signals.py), and by add() and remove() here,
+whose bulk writes send none (they also count the change toward
+popularity themselves).
+"""
+from typing import FrozenSet, Iterable, Set
+
+from django.conf import settings
+from django.db import transaction
+
+from . import cache as response_cache
+from . import popularity
+from .models import Product, Wishlist
+
+
+IDS_PREFIX = "catalog:wishlist:"
+
+
+def _key(user_id) -> str:
+    return f"{IDS_PREFIX}{user_id}"
+
+
+def product_ids(user_id) -> FrozenSet[str]:
+    """Every product id (as a string) on the user's wishlist."""
+    cache = response_cache.get_cache() if response_cache.is_enabled() else None
+    if cache is not None:
+        ids = cache.get(_key(user_id))
+        if ids is not None:
+            return ids
+
+    ids = frozenset(
+        str(pk) for pk in
+        Wishlist.objects.filter(user_id=user_id).values_list("product_id", flat=True)
+    )
+    if cache is not None:
+        cache.set(_key(user_id), ids, getattr(settings, "CATALOG_CACHE_TIMEOUT", 300))
+    return ids
+
+
+def contains(user_id, ids: Iterable) -> Set[str]:
+    """The subset of `ids` on the user's wishlist."""
+    return product_ids(user_id).intersection(str(pk) for pk in ids)
+
+
+def invalidate(user_id) -> None:
+    response_cache.get_cache().delete(_key(user_id))
+
+
+def add(user_id, ids: Iterable) -> Set[str]:
+    """Wishlist the products in `ids` in one INSERT; the ids newly added.
+    Unknown products are skipped, ones already there left alone."""
+    wanted = {str(pk) for pk in ids} - product_ids(user_id)
+    if not wanted:
+        return set()
+    existing = {
+        str(pk) for pk in Product.objects.filter(pk__in=wanted).values_list("pk", flat=True)
+    }
+    # Rows already there (a stale cached set, a concurrent add) hit
+    # unique_together and are skipped, but bulk_create(ignore_conflicts)
+    # still returns them: only the rows stored under the pks generated
+    # here were inserted.
+    rows = Wishlist.objects.bulk_create(
+        [Wishlist(user_id=user_id, product_id=pk) for pk in existing],
+        ignore_conflicts=True,
+    )
+    added = {
+        str(pk) for pk in
+        Wishlist.objects.filter(pk__in=[row.pk for row in rows]).values_list("product_id", flat=True)
+    }
+    if added:
+        popularity.apply_wishlist(added, rows[0].added_at)
+    transaction.on_commit(lambda: invalidate(user_id))
+    return added
+
+
+def remove(user_id, ids: Iterable) -> int:
+    """Drop the products in `ids` from the wishlist; the number removed."""
+    rows = list(
+        Wishlist.objects
+        .filter(user_id=user_id, product_id__in=list(ids))
+        .values_list("pk", "product_id", "added_at")
+    )
+    if not rows:
+        return 0
+    # A raw DELETE: QuerySet.delete() would collect the rows again and
+    # send post_delete per row, each with its own popularity UPDATE.
+    # Nothing references Wishlist rows, so there is nothing to cascade.
+    deleted = Wishlist.objects.filter(pk__in=[pk for pk, _, _ in rows])
+    removed = deleted._raw_delete(deleted.db)
+    popularity.unapply_wishlist_rows((product_id, added_at) for _, product_id, added_at in rows)
+    transaction.on_commit(lambda: invalidate(user_id))
+    return removed
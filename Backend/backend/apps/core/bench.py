@@ -0,0 +1,258 @@
+# apps/core/bench.py
+"""
+In-process HTTP benchmark of the public API (see `manage.py bench_api`).
+
+Each scenario is a named endpoint with a pool of requests drawn from the
+database (filter combinations, product ids, users with orders...). The
+pool is cycled through Django's test client, so requests go through the
+full middleware, auth, view and rendering stack, but no network. Per
+endpoint we record latency percentiles, single-client throughput and
+the SQL queries each request ran.
+
+Reports are plain JSON so runs can be compared between commits with
+`compare()`.
+"""
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+
+from apps.catalog.models import (
+    Brand,
+    Category,
+    Color,
+    Gender,
+    Product,
+    ProductVariant,
+    Size,
+)
+from apps.orders.models import Order
+
+User = get_user_model()
+
+POOL_SIZE = 50
+
+
+@dataclass
+class Call:
+    method: str
+    path: str
+    data: Optional[dict] = None
+    user: Optional[object] = None  # user pk; None is anonymous
+
+
+@dataclass
+class Scenario:
+    name: str
+    calls: List[Call] = field(default_factory=list)
+
+
+# ---------- Scenarios ----------
+
+def _slugs(model, rng, count) -> List[str]:
+    slugs = sorted(model.objects.values_list("slug", flat=True))
+    return rng.sample(slugs, min(count, len(slugs)))
+
+
+def build_scenarios(seed: int = 42) -> List[Scenario]:
+    """The benchmarked flows, with request pools drawn from the database."""
+    rng = random.Random(seed)
+    products = list(
+        Product.objects.filter(is_published=True).order_by("slug").values_list("pk", flat=True)[:1000]
+    )
+    variants = list(
+        ProductVariant.objects.filter(in_stock__gt=0).order_by("sku").values_list("pk", flat=True)[:1000]
+    )
+    shoppers = list(
+        User.objects.filter(orders__isnull=False).distinct().order_by("email").values_list("pk", flat=True)[:20]
+    )
+    orders = list(
+        Order.objects.filter(user__in=shoppers).order_by("pk").values_list("user_id", "pk")
+    )
+    categories, colors, sizes = _slugs(Category, rng, 6), _slugs(Color, rng, 6), _slugs(Size, rng, 6)
+    brands, genders = _slugs(Brand, rng, 4), _slugs(Gender, rng, 3)
+
+    def pick(values, most=2):
+        return ",".join(rng.sample(values, rng.randint(1, min(most, len(values)))))
+
+    filters = [
+        lambda: f"category={pick(categories, 1)}",
+        lambda: f"color={pick(colors)}&size={pick(sizes)}",
+        lambda: f"gender={pick(genders, 1)}&brand={pick(brands)}",
+        lambda: f"category={pick(categories, 1)}&color={pick(colors, 1)}&ordering=price",
+        lambda: f"price_min={rng.randint(40, 90)}&price_max={rng.randint(100, 200)}",
+        lambda: f"search={rng.choice(['pegasus', 'air max', 'dunk', 'metcon', 'trail'])}",
+    ]
+    scenarios = [
+        Scenario("products.list", [
+            Call("GET", f"/api/catalog/products/?{query}")
+            for query in ("", "ordering=price", "ordering=-price", "page=2", "pagination=cursor")
+        ]),
+        Scenario("products.filter", [
+            Call("GET", f"/api/catalog/products/?{rng.choice(filters)()}")
+            for _ in range(POOL_SIZE)
+        ]),
+        Scenario("product-cards.filter", [
+            Call("GET", f"/api/catalog/product-cards/?{rng.choice(filters[:3])()}")
+            for _ in range(POOL_SIZE)
+        ]),
+        Scenario("products.detail", [
+            Call("GET", f"/api/catalog/products/{pk}/")
+            for pk in rng.sample(products, min(POOL_SIZE, len(products)))
+        ]),
+        Scenario("variants.search", [
+            Call(
+                "GET",
+                f"/api/catalog/variants/?color={pick(colors)}&size={pick(sizes)}"
+                f"&price_max={rng.randint(60, 200)}&in_stock=true",
+            )
+            for _ in range(POOL_SIZE)
+        ]),
+    ]
+    if shoppers and variants:
+        scenarios += [
+            Scenario("carts.add-item", [
+                Call(
+                    "POST", "/api/carts/carts/current/add-item/",
+                    {"product_variant": str(rng.choice(variants)), "quantity": 1},
+                    rng.choice(shoppers),
+                )
+                for _ in range(POOL_SIZE)
+            ]),
+            Scenario("carts.current", [
+                Call("GET", "/api/carts/carts/current/", user=user) for user in shoppers
+            ]),
+        ]
+    if orders:
+        scenarios += [
+            Scenario("orders.list", [
+                Call("GET", "/api/orders/orders/", user=user) for user in shoppers
+            ]),
+            Scenario("orders.detail", [
+                Call("GET", f"/api/orders/orders/{pk}/", user=user)
+                for user, pk in rng.sample(orders, min(POOL_SIZE, len(orders)))
+            ]),
+        ]
+    return scenarios
+
+
+# ---------- Running ----------
+
+class QueryCounter:
+    """Counts queries through connection.execute_wrapper; far cheaper than
+    capturing them with a debug cursor."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Linear-interpolated percentile (0 <= q <= 100) of sorted values."""
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(timings: List[float], queries: List[int], errors: int) -> dict:
+    """Stats for one endpoint from per-request seconds and query counts."""
+    ordered = sorted(timings)
+    total = sum(ordered)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "mean_ms": round(total / len(ordered) * 1000, 3) if ordered else 0.0,
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "throughput_rps": round(len(ordered) / total, 1) if total else 0.0,
+        "queries_mean": round(sum(queries) / len(queries), 2) if queries else 0.0,
+        "queries_max": max(queries, default=0),
+    }
+
+
+class Runner:
+    def __init__(self, requests: int = 200, warmup: int = 20):
+        self.requests = requests
+        self.warmup = warmup
+        self.clients: Dict[object, Client] = {}
+
+    def client(self, user) -> Client:
+        if user not in self.clients:
+            client = Client()
+            if user is not None:
+                client.force_login(User.objects.get(pk=user))
+            self.clients[user] = client
+        return self.clients[user]
+
+    def call(self, call: Call):
+        client = self.client(call.user)
+        if call.method == "GET":
+            return client.get(call.path)
+        return client.generic(
+            call.method, call.path, json.dumps(call.data), content_type="application/json",
+        )
+
+    def run(self, scenario: Scenario) -> dict:
+        calls = scenario.calls
+        for n in range(self.warmup):
+            self.call(calls[n % len(calls)])
+
+        timings, queries, errors = [], [], 0
+        for n in range(self.requests):
+            counter = QueryCounter()
+            call = calls[n % len(calls)]
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                response = self.call(call)
+                timings.append(time.perf_counter() - started)
+            queries.append(counter.count)
+            if response.status_code >= 400:
+                errors += 1
+        return summarize(timings, queries, errors)
+
+
+# ---------- Comparing ----------
+
+def compare(
+    report: dict,
+    baseline: dict,
+    max_latency_regression: float = 0.25,
+    min_latency_ms: float = 1.0,
+    max_query_regression: int = 0,
+) -> List[str]:
+    """
+    Regressions of `report` against `baseline`: p95 latency up by more
+    than `max_latency_regression` (a fraction) and `min_latency_ms`, or
+    the most queries per request up by more than `max_query_regression`.
+    Failed requests always count. Endpoints missing from the baseline
+    are skipped.
+    """
+    problems = []
+    previous = baseline.get("endpoints", {})
+    for name, stats in report["endpoints"].items():
+        if stats["errors"]:
+            problems.append(f"{name}: {stats['errors']} failed requests")
+        before = previous.get(name)
+        if before is None:
+            continue
+        p95, old_p95 = stats["p95_ms"], before["p95_ms"]
+        if p95 > old_p95 * (1 + max_latency_regression) and p95 - old_p95 > min_latency_ms:
+            problems.append(f"{name}: p95 {old_p95:.2f}ms -> {p95:.2f}ms")
+        if stats["queries_max"] > before["queries_max"] + max_query_regression:
+            problems.append(
+                f"{name}: queries per request {before['queries_max']} -> {stats['queries_max']}"
+            )
+    return problems
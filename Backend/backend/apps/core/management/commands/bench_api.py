@@ -0,0 +1,159 @@
+# apps/core/management/commands/bench_api.py
+import io
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from apps.catalog import cache as response_cache
+from apps.catalog import facet_index, search
+from apps.core import bench
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the public API in-process (listing, filters, detail, variant "
+        "search, cart, orders) against a generated catalog in a throwaway test "
+        "database. Writes a JSON report; with --baseline, fails on regressions."
+    )
+
+    def add_arguments(self, parser):
+        dataset = parser.add_argument_group("dataset (see generate_catalog)")
+        dataset.add_argument("--products", type=int, default=2000)
+        dataset.add_argument("--variants-per-product", type=int, default=6)
+        dataset.add_argument("--reviews-per-product", type=int, default=3)
+        dataset.add_argument("--users", type=int, default=100)
+        dataset.add_argument("--orders", type=int, default=1000)
+        dataset.add_argument("--seed", type=int, default=42)
+
+        parser.add_argument("--requests", type=int, default=200, help="Timed requests per endpoint.")
+        parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per endpoint first.")
+        parser.add_argument("--only", nargs="*", help="Endpoint names (prefixes) to run.")
+        parser.add_argument(
+            "--cache", action="store_true",
+            help="Keep the catalog response cache and conditional GET on "
+                 "(off by default, so the views' own work is measured).",
+        )
+        parser.add_argument("--output", default="bench-report.json")
+        parser.add_argument("--baseline", help="Report from an earlier run to compare with.")
+        parser.add_argument(
+            "--max-latency-regression", type=float, default=0.25,
+            help="Allowed p95 increase as a fraction of the baseline.",
+        )
+        parser.add_argument(
+            "--min-latency-ms", type=float, default=1.0,
+            help="p95 increases below this are noise, whatever the fraction.",
+        )
+        parser.add_argument(
+            "--max-query-regression", type=int, default=0,
+            help="Allowed increase of the most queries per request.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            try:
+                baseline = json.loads(Path(options["baseline"]).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            overrides = {"SEARCH_INDEX_PATH": None}  # never load the real catalog's snapshot
+            if not options["cache"]:
+                overrides.update(CATALOG_RESPONSE_CACHE=False, CATALOG_CONDITIONAL_GET=False)
+            with override_settings(**overrides):
+                report = self._bench(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        Path(options["output"]).write_text(json.dumps(report, indent=2) + "\n")
+        self.stdout.write(f"Report written to {options['output']}")
+
+        if baseline is not None and baseline.get("meta", {}).get("dataset") != report["meta"]["dataset"]:
+            self.stdout.write(self.style.WARNING(
+                "⚠️  The baseline was run on a different dataset; timings are not comparable."
+            ))
+        problems = bench.compare(
+            report,
+            baseline or {},
+            max_latency_regression=options["max_latency_regression"],
+            min_latency_ms=options["min_latency_ms"],
+            max_query_regression=options["max_query_regression"],
+        )
+        for problem in problems:
+            self.stdout.write(self.style.ERROR(f"❌ {problem}"))
+        if problems:
+            raise CommandError(f"{len(problems)} regression(s) against the baseline.")
+        if baseline is not None:
+            self.stdout.write(self.style.SUCCESS(f"✅ No regressions against {options['baseline']}."))
+
+    def _bench(self, options):
+        dataset = {
+            key: options[key]
+            for key in ("products", "variants_per_product", "reviews_per_product", "users", "orders", "seed")
+        }
+        self.stdout.write("Generating the dataset...")
+        call_command(
+            "generate_catalog",
+            *[f"--{key.replace('_', '-')}={value}" for key, value in dataset.items()],
+            "--images=none",
+            stdout=self.stdout if options["verbosity"] > 1 else io.StringIO(),
+        )
+        search.reset_index()
+        facet_index.reset_index()
+        response_cache.get_cache().clear()
+
+        scenarios = bench.build_scenarios(options["seed"])
+        if options["only"]:
+            scenarios = [
+                scenario for scenario in scenarios
+                if any(scenario.name.startswith(prefix) for prefix in options["only"])
+            ]
+
+        runner = bench.Runner(requests=options["requests"], warmup=options["warmup"])
+        endpoints = {}
+        self.stdout.write(
+            f"{'endpoint':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}{'errors':>8}"
+        )
+        for scenario in scenarios:
+            stats = endpoints[scenario.name] = runner.run(scenario)
+            self.stdout.write(
+                f"{scenario.name:<22}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}"
+                f"{stats['p99_ms']:>9.2f}{stats['throughput_rps']:>9.1f}"
+                f"{stats['queries_max']:>9}{stats['errors']:>8}"
+            )
+
+        return {
+            "meta": {
+                "created_at": timezone.now().isoformat(),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "cache": options["cache"],
+                "requests": options["requests"],
+                "warmup": options["warmup"],
+                "dataset": dataset,
+            },
+            "endpoints": endpoints,
+        }
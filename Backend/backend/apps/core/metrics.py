@@ -0,0 +1,250 @@
+# apps/core/metrics.py
+"""
+Prometheus metrics, served in the text exposition format at /metrics.
+
+Recording is an in-memory update under a per-metric lock, so it stays
+cheap on the hot path:
+
+    from apps.core import metrics
+    metrics.CART_ITEMS_ADDED.inc()
+    metrics.REQUEST_LATENCY.observe(0.042, method="GET", route="api/catalog/")
+
+With several worker processes (gunicorn), set PROMETHEUS_MULTIPROC_DIR
+(setting or environment variable) to a directory shared by the workers
+and emptied at deploy. Each process then writes its samples to its own
+file there from a background thread every METRICS_FLUSH_INTERVAL
+seconds (never on a request), when it serves a scrape and at exit.
+A scrape adds up all the files. Counters and histogram buckets sum
+correctly across processes, including workers that have exited. A
+scrape can lag the other workers by up to one flush interval.
+"""
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY[name] = self
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Dict[str, float]:
+        """{sample line key: value}, ready to be summed across processes."""
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Dict[str, float]:
+        with self._lock:
+            items = list(self._values.items())
+        return {_sample(self.name, key): value for key, value in items}
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # One count per bucket plus +Inf, then the sum.
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def samples(self) -> Dict[str, float]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        samples = {}
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), state):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format(bound)
+                samples[_sample(f"{self.name}_bucket", key + (("le", le),))] = cumulative
+            samples[_sample(f"{self.name}_count", key)] = cumulative
+            samples[_sample(f"{self.name}_sum", key)] = state[-1]
+        return samples
+
+
+REGISTRY: Dict[str, Metric] = {}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"),
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL queries per HTTP request by route.",
+    ("method", "route"), QUERY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "catalog_cache_requests_total", "Catalog response cache lookups.", ("result",),
+)
+CART_ITEMS_ADDED = Counter("cart_items_added_total", "Cart add-item requests.")
+ORDERS_CREATED = Counter("orders_created_total", "Orders created.")
+SIGN_INS = Counter("sign_ins_total", "Sign-in attempts by result.", ("result",))
+
+
+# ---------- Multiprocess files ----------
+
+def multiproc_dir() -> Optional[Path]:
+    path = getattr(settings, "PROMETHEUS_MULTIPROC_DIR", None) or os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    return Path(path) if path else None
+
+
+def local_samples() -> Dict[str, Dict[str, float]]:
+    """{metric name: samples} of this process."""
+    return {name: metric.samples() for name, metric in REGISTRY.items()}
+
+
+# One file per process; the start time keeps a reused pid from
+# overwriting the counts of an earlier worker.
+_process_file = f"{os.getpid()}-{time.time_ns()}.json"
+_process_pid = os.getpid()
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def flush() -> None:
+    """Write this process's samples to its file in the multiprocess dir."""
+    global _process_file, _process_pid
+
+    directory = multiproc_dir()
+    if directory is None:
+        return
+    if os.getpid() != _process_pid:
+        # Forked after import (gunicorn --preload): a file of our own.
+        _process_pid = os.getpid()
+        _process_file = f"{_process_pid}-{time.time_ns()}.json"
+    directory.mkdir(parents=True, exist_ok=True)
+    temporary = directory / f".{_process_file}.tmp"
+    temporary.write_text(json.dumps(local_samples()))
+    os.replace(temporary, directory / _process_file)
+
+
+def start_flusher() -> None:
+    """
+    Start this process's flush thread, once. Cheap enough to call per
+    request: the thread is only started on the first call after a fork
+    (threads don't survive one), and not at all without a multiprocess dir.
+    """
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+        if multiproc_dir() is not None:
+            threading.Thread(target=_flush_periodically, name="metrics-flush", daemon=True).start()
+
+
+def _flush_periodically() -> None:
+    while True:
+        time.sleep(getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0))
+        try:
+            flush()
+        except OSError:
+            logger.warning("Could not write the metrics file", exc_info=True)
+
+
+atexit.register(lambda: multiproc_dir() and flush())
+
+
+def collect() -> Dict[str, Dict[str, float]]:
+    """Samples of every process (or just this one without a multiprocess dir)."""
+    directory = multiproc_dir()
+    if directory is None:
+        return local_samples()
+
+    flush()
+    totals = {name: {} for name in REGISTRY}
+    for path in directory.glob("*.json"):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # being replaced, or unreadable
+        for name, samples in data.items():
+            family = totals.setdefault(name, {})
+            for key, value in samples.items():
+                family[key] = family.get(key, 0) + value
+    return totals
+
+
+def cache_lookups(totals: Dict[str, Dict[str, float]]) -> Tuple[float, float]:
+    """(hits, misses) of the catalog response cache in collect() output."""
+    cache = totals.get(CACHE_REQUESTS.name, {})
+    hits = cache.get(_sample(CACHE_REQUESTS.name, (("result", "hit"),)), 0)
+    misses = cache.get(_sample(CACHE_REQUESTS.name, (("result", "miss"),)), 0)
+    return hits, misses
+
+
+def render() -> str:
+    """Everything in the Prometheus text format (version 0.0.4)."""
+    totals = collect()
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.type}")
+        for key, value in totals.get(name, {}).items():
+            lines.append(f"{key} {_format(value)}")
+
+    # Derived from the summed counters: a ratio can't be added up per process.
+    hits, misses = cache_lookups(totals)
+    lines.append("# HELP catalog_cache_hit_ratio Share of catalog cache lookups that hit.")
+    lines.append("# TYPE catalog_cache_hit_ratio gauge")
+    lines.append(f"catalog_cache_hit_ratio {_format(round(hits / (hits + misses), 4)) if hits + misses else 'NaN'}")
+    return "\n".join(lines) + "\n"
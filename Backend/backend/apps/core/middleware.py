@@ -0,0 +1,210 @@
+# apps/core/middleware.py
+"""
+Request instrumentation: SQL stats on every request, cheap enough to
+leave on in production, an on-demand profiler for staff
+(ProfilerMiddleware, see profiling.py) and Prometheus request metrics
+(MetricsMiddleware, see metrics.py).
+
+Every query of the request goes through a `connection.execute_wrapper`
+that adds up the count and time spent in the database, and counts each
+SQL statement (parameters aside). A statement seen SQL_DUPLICATE_THRESHOLD
+times in one request is the N+1 signature. For a sample of requests
+(SQL_STACK_SAMPLE_RATE), the stack that ran it is captured once.
+
+The totals go out as a `Server-Timing` header (visible in the browser's
+network panel):
+
+    Server-Timing: db;dur=4.21;desc="12 queries, 9 duplicates", app;dur=18.50
+
+and as one JSON log line per request on the `apps.core.sql` logger:
+INFO normally, WARNING when an N+1 pattern was found.
+"""
+import json
+import logging
+import random
+import sys
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+
+from . import metrics, profiling
+
+
+logger = logging.getLogger("apps.core.sql")
+
+# Frames from these paths are left out of captured stacks.
+_LIBRARY_MARKERS = ("site-packages", "dist-packages", "/django/", "/rest_framework/")
+
+
+def _stack() -> list:
+    frames = [
+        f"{frame.filename}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()[:-2]  # drop our own frames
+        if not any(marker in frame.filename for marker in _LIBRARY_MARKERS)
+    ]
+    return frames[-8:]
+
+
+class QueryStats:
+    """Query totals of one request; used as a connection.execute_wrapper."""
+
+    def __init__(self, threshold: int, sample_stacks: bool):
+        self.threshold = threshold
+        self.sample_stacks = sample_stacks
+        self.count = 0
+        self.duration = 0.0
+        self.statements = {}
+        self.stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            seen = self.statements.get(sql, 0) + 1
+            self.statements[sql] = seen
+            if seen == self.threshold and self.sample_stacks:
+                self.stacks[sql] = _stack()
+
+    @property
+    def duplicates(self) -> int:
+        return self.count - len(self.statements)
+
+    def repeated(self) -> list:
+        """[(statement, times run)] at or over the threshold, most first."""
+        return sorted(
+            ((sql, seen) for sql, seen in self.statements.items() if seen >= self.threshold),
+            key=lambda item: -item[1],
+        )
+
+
+class SQLInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "SQL_INSTRUMENTATION", True)
+        self.threshold = getattr(settings, "SQL_DUPLICATE_THRESHOLD", 5)
+        self.sample_rate = getattr(settings, "SQL_STACK_SAMPLE_RATE", 0.01)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        stats = request.query_stats = QueryStats(self.threshold, random.random() < self.sample_rate)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        timing = (
+            f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries, '
+            f'{stats.duplicates} duplicates", app;dur={elapsed * 1000:.2f}'
+        )
+        if response.has_header("Server-Timing"):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response["Server-Timing"] = timing
+
+        self.log(request, response, stats, elapsed)
+        return response
+
+    def log(self, request, response, stats, elapsed):
+        repeated = stats.repeated()
+        level = logging.WARNING if repeated else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 2),
+            "db_ms": round(stats.duration * 1000, 2),
+            "queries": stats.count,
+            "duplicates": stats.duplicates,
+        }
+        if repeated:
+            record["repeated"] = [
+                {"sql": sql[:300], "count": seen, **({"stack": stats.stacks[sql]} if sql in stats.stacks else {})}
+                for sql, seen in repeated[:5]
+            ]
+        logger.log(level, json.dumps(record))
+
+
+class ProfilerMiddleware:
+    """
+    Profile one request on demand, for staff users only:
+
+    - `?__profile=1` answers with the profile (JSON) instead of the page,
+    - `?__profile=collapsed` with its folded stacks as text, ready for
+      flamegraph.pl or speedscope,
+    - an `X-Profile: 1` request header keeps the normal response and
+      adds an `X-Profile-Id` header; fetch it from /api/profiles/<id>/.
+
+    Every profile is stored, see apps/core/profiling.py. Must come after
+    AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "PROFILER_ENABLED", True)
+        self.interval = getattr(settings, "PROFILER_INTERVAL", 0.001)
+
+    def __call__(self, request):
+        mode = request.GET.get("__profile")
+        header = request.headers.get("X-Profile")
+        if not (mode or header) or not self.enabled:
+            return self.get_response(request)
+        user = getattr(request, "user", None)
+        if not (user and user.is_authenticated and user.is_staff):
+            return self.get_response(request)
+
+        sampler = profiling.Sampler(sys._getframe(), self.interval).start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        profile = sampler.profile(
+            method=request.method,
+            path=request.get_full_path(),
+            status=response.status_code,
+            user=str(user.pk),
+        )
+        profile_id = profiling.save(profile)
+
+        if mode == "collapsed":
+            return HttpResponse(profile["collapsed"], content_type="text/plain; charset=utf-8")
+        if mode:
+            return JsonResponse(profile)
+        response["X-Profile-Id"] = profile_id
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Request count, latency and SQL queries per route for /metrics (see
+    metrics.py). Goes first, so the latency covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match is not None else "unmatched"
+        metrics.REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+        metrics.REQUEST_LATENCY.observe(elapsed, method=request.method, route=route)
+        stats = getattr(request, "query_stats", None)
+        if stats is not None:
+            metrics.REQUEST_QUERIES.observe(stats.count, method=request.method, route=route)
+        metrics.start_flusher()
+        return response
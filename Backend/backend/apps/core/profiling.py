@@ -0,0 +1,168 @@
+# apps/core/profiling.py
+"""
+On-demand sampling profiler for single requests (see ProfilerMiddleware).
+
+While the request runs, a background thread reads the request thread's
+Python stack every PROFILER_INTERVAL seconds. Each sample is put in a
+phase by what its stack is doing: running SQL (`orm`), serializing
+(`serializer`), rendering the response (`render`) or anything else in
+the view and middleware (`view`).
+
+Profiles are stored in PROFILER_DIR as JSON. The `collapsed` member is
+in the folded-stacks format read by flamegraph.pl, speedscope and
+inferno, one line per unique stack, rooted at its phase:
+
+    orm;ProductViewSet.list (apps/catalog/views.py:301);...;execute (...) 12
+
+Only the newest PROFILER_MAX_FILES profiles are kept.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+
+PHASES = ("view", "serializer", "orm", "render")
+
+# Checked in this order; a stack matching several (SQL run while
+# serializing, say) goes in the first.
+_PHASE_MARKERS = (
+    ("orm", ("/django/db/",)),
+    ("render", ("/rest_framework/renderers.py", "/django/template/", "/json/encoder.py")),
+    ("serializer", (
+        "/rest_framework/serializers.py", "/rest_framework/fields.py",
+        "/rest_framework/relations.py", "/serializers/", "/serializers.py",
+    )),
+)
+
+
+def profiles_dir() -> Path:
+    return Path(getattr(settings, "PROFILER_DIR", Path(settings.BASE_DIR) / "profiles"))
+
+
+def _label(code) -> str:
+    filename = code.co_filename
+    for root in (str(settings.BASE_DIR), "site-packages"):
+        index = filename.find(root)
+        if index != -1:
+            filename = filename[index + len(root):].lstrip(os.sep)
+            break
+    name = getattr(code, "co_qualname", code.co_name)
+    # ";" separates frames in the folded format.
+    return f"{name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _phase(stack) -> str:
+    for phase, markers in _PHASE_MARKERS:
+        for code in stack:
+            if any(marker in code.co_filename for marker in markers):
+                return phase
+    return "view"
+
+
+class Sampler:
+    """Samples one thread's stack, below `root` (a frame of that thread)."""
+
+    def __init__(self, root, interval: float = 0.001):
+        self.root = root
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> "Sampler":
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                # Code objects are cheap to hash; labels are built once at the end.
+                self.samples[tuple(reversed(stack))] += 1
+
+    def profile(self, **meta) -> dict:
+        total = sum(self.samples.values())
+        phases = Counter()
+        folded = Counter()
+        labels = {}
+        for stack, count in self.samples.items():
+            phase = _phase(stack)
+            phases[phase] += count
+            frames = [labels.setdefault(code, _label(code)) for code in stack]
+            folded[";".join([phase, *frames])] += count
+
+        duration_ms = self.duration * 1000
+        return {
+            **meta,
+            "created_at": timezone.now().isoformat(),
+            "duration_ms": round(duration_ms, 2),
+            "interval_ms": self.interval * 1000,
+            "samples": total,
+            # Wall time per phase, in proportion to its samples.
+            "phases": {
+                phase: round(duration_ms * phases[phase] / total, 2) if total else 0.0
+                for phase in PHASES
+            },
+            "collapsed": "\n".join(
+                f"{stack} {count}" for stack, count in sorted(folded.items())
+            ),
+        }
+
+
+# ---------- Storage ----------
+
+def save(profile: dict) -> str:
+    """Write a profile, drop the oldest beyond PROFILER_MAX_FILES; its id."""
+    directory = profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:6]}"
+    profile["id"] = profile_id
+    temporary = directory / f".{profile_id}.tmp"
+    temporary.write_text(json.dumps(profile))
+    os.replace(temporary, directory / f"{profile_id}.json")
+
+    keep = getattr(settings, "PROFILER_MAX_FILES", 200)
+    for old in list_ids()[keep:]:
+        try:
+            (directory / f"{old}.json").unlink()
+        except FileNotFoundError:
+            pass  # removed by another worker
+    return profile_id
+
+
+def list_ids() -> List[str]:
+    """Stored profile ids, newest first (ids sort by time)."""
+    directory = profiles_dir()
+    if not directory.is_dir():
+        return []
+    return sorted((path.stem for path in directory.glob("*.json")), reverse=True)
+
+
+def load(profile_id: str) -> Optional[dict]:
+    if Path(profile_id).name != profile_id:
+        return None  # no path traversal
+    try:
+        return json.loads((profiles_dir() / f"{profile_id}.json").read_text())
+    except (FileNotFoundError, ValueError):
+        return None
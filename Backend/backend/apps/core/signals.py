@@ -0,0 +1,16 @@
+# apps/core/signals.py
+
+from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.dispatch import receiver
+
+from . import metrics
+
+
+@receiver(user_logged_in)
+def count_sign_in(sender, request, user, **kwargs):
+    metrics.SIGN_INS.inc(result="success")
+
+
+@receiver(user_login_failed)
+def count_failed_sign_in(sender, credentials, request=None, **kwargs):
+    metrics.SIGN_INS.inc(result="failure")
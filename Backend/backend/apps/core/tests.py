@@ -1,3 +1,267 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from apps.catalog.models import Color
+
+from . import bench, metrics, profiling
+from .middleware import SQLInstrumentationMiddleware
+
+
+class BenchStatsTests(TestCase):
+    def test_summarize(self):
+        stats = bench.summarize([0.001 * n for n in range(1, 101)], [3] * 99 + [5], errors=0)
+        self.assertEqual(stats["requests"], 100)
+        self.assertAlmostEqual(stats["p50_ms"], 50.5)
+        self.assertAlmostEqual(stats["p99_ms"], 99.01)
+        self.assertEqual(stats["max_ms"], 100.0)
+        self.assertEqual(stats["queries_max"], 5)
+        self.assertAlmostEqual(stats["throughput_rps"], 19.8)
+
+    def test_compare(self):
+        def report(p95, queries, errors=0):
+            return {"endpoints": {"products.list": {"p95_ms": p95, "queries_max": queries, "errors": errors}}}
+
+        baseline = report(10.0, 4)
+        self.assertEqual(bench.compare(report(12.0, 4), baseline), [])
+        # Within the fraction, or under the noise floor.
+        self.assertEqual(bench.compare(report(1.2, 4), report(0.5, 4)), [])
+        self.assertEqual(
+            bench.compare(report(13.0, 5), baseline),
+            [
+                "products.list: p95 10.00ms -> 13.00ms",
+                "products.list: queries per request 4 -> 5",
+            ],
+        )
+        self.assertEqual(
+            bench.compare(report(10.0, 4, errors=2), {}), ["products.list: 2 failed requests"],
+        )
+
+
+# On the class, so setUpTestData's generate_catalog never touches the
+# real search snapshot either.
+@override_settings(
+    SEARCH_INDEX_PATH=None,
+    CATALOG_RESPONSE_CACHE=False,
+    SQL_INSTRUMENTATION=False,  # the order list's N+1 would be logged
+)
+class BenchScenarioTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        cls.addClassCleanup(overrides.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generate_catalog", "--products", "30", "--users", "5", "--orders", "20",
+            "--images", "none", stdout=io.StringIO(),
+        )
+
+    def test_every_flow_succeeds(self):
+        scenarios = bench.build_scenarios(seed=1)
+        self.assertEqual(
+            [scenario.name for scenario in scenarios],
+            [
+                "products.list", "products.filter", "product-cards.filter", "products.detail",
+                "variants.search", "carts.add-item", "carts.current", "orders.list", "orders.detail",
+            ],
+        )
+        runner = bench.Runner(requests=3, warmup=1)
+        for scenario in scenarios:
+            stats = runner.run(scenario)
+            self.assertEqual(stats["errors"], 0, scenario.name)
+            self.assertGreater(stats["queries_max"], 0, scenario.name)
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=False, CATALOG_CONDITIONAL_GET=False)
+class SQLInstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(3):
+            Color.objects.create(name=f"Color {n}", slug=f"color-{n}", hex_code="#000000")
+
+    def test_server_timing_header(self):
+        with self.assertLogs("apps.core.sql", "INFO") as logs:
+            response = self.client.get("/api/catalog/colors/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="2 queries, 0 duplicates", app;dur=[\d.]+$',
+        )
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, "INFO")
+        self.assertEqual((record["path"], record["status"], record["queries"]), ("/api/catalog/colors/", 200, 2))
+
+    @override_settings(SQL_DUPLICATE_THRESHOLD=3, SQL_STACK_SAMPLE_RATE=1.0)
+    def test_repeated_statements_are_logged_with_stack(self):
+        def view(request):
+            for color in Color.objects.values_list("pk", flat=True):
+                Color.objects.get(pk=color)
+            return HttpResponse()
+
+        with self.assertLogs("apps.core.sql", "WARNING") as logs:
+            response = SQLInstrumentationMiddleware(view)(RequestFactory().get("/n-plus-one/"))
+        self.assertIn('desc="4 queries, 2 duplicates"', response["Server-Timing"])
+        (repeated,) = json.loads(logs.records[0].getMessage())["repeated"]
+        self.assertEqual(repeated["count"], 3)
+        self.assertIn("in view", repeated["stack"][-1])
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=False, CATALOG_CONDITIONAL_GET=False, PROFILER_INTERVAL=0.0005)
+class ProfilerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_user(email="staff@example.com", password="pw", is_staff=True)
+        cls.shopper = User.objects.create_user(email="shopper@example.com", password="pw")
+        Color.objects.create(name="Red", slug="red", hex_code="#FF0000")
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overrides = self.settings(PROFILER_DIR=directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_staff_gets_profile(self):
+        self.client.force_login(self.staff)
+        response = self.client.get("/api/catalog/colors/?__profile=1")
+        self.assertEqual(response.status_code, 200)
+        profile = response.json()
+        self.assertEqual(set(profile["phases"]), {"view", "serializer", "orm", "render"})
+        self.assertEqual((profile["path"], profile["status"]), ("/api/catalog/colors/?__profile=1", 200))
+        for line in filter(None, profile["collapsed"].splitlines()):
+            stack, count = line.rsplit(" ", 1)
+            self.assertIn(stack.split(";")[0], profiling.PHASES)
+            self.assertGreater(int(count), 0)
+
+        # Stored, and served back to staff.
+        self.assertEqual(self.client.get("/api/profiles/").json(), {"profiles": [profile["id"]]})
+        self.assertEqual(self.client.get(f"/api/profiles/{profile['id']}/").json(), profile)
+        collapsed = self.client.get(f"/api/profiles/{profile['id']}/collapsed/")
+        self.assertEqual(collapsed.content.decode(), profile["collapsed"])
+
+    def test_header_keeps_response(self):
+        self.client.force_login(self.staff)
+        response = self.client.get("/api/catalog/colors/", HTTP_X_PROFILE="1")
+        self.assertEqual(response.json()["results"][0]["slug"], "red")
+        self.assertIsNotNone(profiling.load(response["X-Profile-Id"]))
+
+    def test_only_staff(self):
+        self.client.force_login(self.shopper)
+        response = self.client.get("/api/catalog/colors/?__profile=1")
+        self.assertIn("results", response.json())
+        self.assertEqual(profiling.list_ids(), [])
+        self.assertEqual(self.client.get("/api/profiles/").status_code, 403)
+
+    @override_settings(PROFILER_MAX_FILES=2)
+    def test_retention(self):
+        ids = [profiling.save({"collapsed": ""}) for _ in range(3)]
+        self.assertEqual(profiling.list_ids(), ids[:0:-1])
+        self.assertIsNone(profiling.load("../settings"))
+
+
+def sample_value(text, sample):
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=True, CATALOG_CONDITIONAL_GET=False, SEARCH_INDEX_PATH=None)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email="metrics@example.com", password="pw")
+
+    def scrape(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        return response.content.decode()
+
+    def test_request_and_domain_metrics(self):
+        route = 'method="GET",route="api/catalog/colors/$"'
+        requests = f'http_requests_total{{{route},status="200"}}'
+        before = self.scrape()
+
+        self.client.get("/api/catalog/colors/")
+        self.client.get("/api/catalog/colors/")
+        self.client.login(email="metrics@example.com", password="pw")
+        self.client.login(email="metrics@example.com", password="wrong")
+
+        text = self.scrape()
+        self.assertEqual(sample_value(text, requests) - sample_value(before, requests), 2)
+        count = f"http_request_duration_seconds_count{{{route}}}"
+        self.assertEqual(sample_value(text, count) - sample_value(before, count), 2)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}', text)
+        self.assertIn(f"http_request_db_queries_bucket{{{route},le=\"0\"}}", text)
+        for sample, delta in (
+            ('catalog_cache_requests_total{result="hit"}', 1),
+            ('catalog_cache_requests_total{result="miss"}', 1),
+            ('sign_ins_total{result="success"}', 1),
+            ('sign_ins_total{result="failure"}', 1),
+        ):
+            self.assertEqual(sample_value(text, sample) - sample_value(before, sample), delta, sample)
+        self.assertIn("# TYPE catalog_cache_hit_ratio gauge", text)
+
+    def test_only_allowed_addresses(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.1.2.3").status_code, 404)
+
+    def test_metric_types_must_define_samples(self):
+        class Gauge(metrics.Metric):
+            type = "gauge"
+
+        with self.assertRaises(TypeError):
+            Gauge("incomplete_gauge", "No samples().")
+        self.assertNotIn("incomplete_gauge", metrics.REGISTRY)
+
+    def test_multiprocess_files_are_summed(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(PROMETHEUS_MULTIPROC_DIR=directory):
+            local = sample_value(metrics.render(), "orders_created_total")
+            # Another worker's file, e.g. one that has exited.
+            with open(os.path.join(directory, "4242-1.json"), "w") as other:
+                json.dump({"orders_created_total": {"orders_created_total": 3}}, other)
+            metrics.ORDERS_CREATED.inc()
+
+            self.assertEqual(sample_value(metrics.render(), "orders_created_total"), local + 4)
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_requests_leave_flushing_to_a_background_thread(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        flushed_by = []
+        flush = metrics.flush
+
+        def record(*args):
+            flushed_by.append(threading.current_thread())
+            flush(*args)
+
+        with override_settings(PROMETHEUS_MULTIPROC_DIR=directory, METRICS_FLUSH_INTERVAL=0.01), \
+                mock.patch.object(metrics, "_flusher_pid", None), \
+                mock.patch.object(metrics, "flush", side_effect=record):
+            self.client.get("/api/catalog/colors/")
+            deadline = time.monotonic() + 5
+            while not os.listdir(directory) and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(len(os.listdir(directory)), 1)
+        self.assertTrue(flushed_by)
+        self.assertNotIn(threading.current_thread(), flushed_by)
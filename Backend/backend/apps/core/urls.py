@@ -0,0 +1,16 @@
+# apps/core/urls.py
+
+from django.urls import path
+
+from .views import ProfileDetailView, ProfileListView
+
+urlpatterns = [
+    path("", ProfileListView.as_view(), name="profile-list"),
+    path("<str:profile_id>/", ProfileDetailView.as_view(), name="profile-detail"),
+    path(
+        "<str:profile_id>/collapsed/",
+        ProfileDetailView.as_view(),
+        {"collapsed": True},
+        name="profile-collapsed",
+    ),
+]
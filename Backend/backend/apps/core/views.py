@@ -1,3 +1,48 @@
-from django.shortcuts import render
+# apps/core/views.py
 
-# Create your views here.
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import metrics, profiling
+
+
+class ProfileListView(APIView):
+    """
+    GET /api/profiles/
+    Ids of the stored request profiles, newest first (staff only).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({"profiles": profiling.list_ids()})
+
+
+class ProfileDetailView(APIView):
+    """
+    GET /api/profiles/<id>/            the profile (JSON)
+    GET /api/profiles/<id>/collapsed/  its folded stacks, for flame graphs
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id, collapsed=False):
+        profile = profiling.load(profile_id)
+        if profile is None:
+            raise Http404
+        if collapsed:
+            return HttpResponse(profile["collapsed"], content_type="text/plain; charset=utf-8")
+        return Response(profile)
+
+
+def metrics_view(request):
+    """
+    GET /metrics
+    Prometheus scrape endpoint; METRICS_ALLOWED_IPS limits who may read
+    it (None: anyone).
+    """
+    allowed = getattr(settings, "METRICS_ALLOWED_IPS", None)
+    if allowed is not None and request.META.get("REMOTE_ADDR") not in allowed:
+        raise Http404
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -15,6 +15,10 @@ class OrderStatus(models.TextChoices):
     CANCELLED = "cancelled", "Cancelled"
 
 
+# Orders that count as sales (bought-together, popularity).
+PURCHASED_STATUSES = (OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.DELIVERED)
+
+
 class PaymentMethod(models.TextChoices):
     STRIPE = "stripe", "Stripe"
     PAYPAL = "paypal", "PayPal"
@@ -6,7 +6,7 @@ from rest_framework.decorators import action
 
 from django.contrib.auth import get_user_model
 
-from .models import Order, OrderItem, Payment, Coupon
+from .models import Order, OrderItem, OrderStatus, Payment, Coupon
 from .serializers import (
     OrderSerializer,
     OrderDetailSerializer,
@@ -15,6 +15,7 @@ from .serializers import (
     CouponSerializer,
 )
 
+from apps.core import metrics
 from apps.core.permissions import IsOwnerOrReadOnly, IsAdminOrReadOnly
 
 User = get_user_model()
@@ -45,6 +46,7 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        metrics.ORDERS_CREATED.inc()
 
     @action(detail=True, methods=["post"], url_path="mark-paid", permission_classes=[permissions.IsAdminUser])
     def mark_paid(self, request, pk=None):
@@ -53,7 +55,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         Simple admin action to mark order as paid (for testing).
         """
         order = self.get_object()
-        order.status = Order.Status.PAID  # assuming you used TextChoices
+        order.status = OrderStatus.PAID
         order.save(update_fields=["status"])
         return Response(OrderDetailSerializer(order).data)
 
@@ -71,12 +71,18 @@ CSRF_COOKIE_HTTPONLY = True
 # CSRF_COOKIE_SECURE = False  # True in production
 
 MIDDLEWARE = [
+    # Outermost, so request latency covers every other middleware.
+    "apps.core.middleware.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    # First, so the session and auth queries are counted too.
+    "apps.core.middleware.SQLInstrumentationMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Needs request.user: staff only.
+    'apps.core.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -183,5 +189,113 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 15,
 }
 
+# LocMemCache is per process: fine for runserver and the tests, but the
+# catalog cache invalidates by writing to it, so a deployment with more
+# than one worker needs a shared backend (Redis, Memcached, database).
+# `manage.py check --deploy` fails on a per-process catalog cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Per-request query count / DB time in Server-Timing headers and a JSON
+# log line on `apps.core.sql` (apps/core/middleware.py). A statement run
+# SQL_DUPLICATE_THRESHOLD times in one request is logged as an N+1
+# warning, with its stack for SQL_STACK_SAMPLE_RATE of requests.
+SQL_INSTRUMENTATION = True
+SQL_DUPLICATE_THRESHOLD = 5
+SQL_STACK_SAMPLE_RATE = 0.01
+
+# Staff-only request profiler (apps/core/profiling.py): ?__profile=1 or
+# an X-Profile: 1 header. Profiles are kept in PROFILER_DIR, newest
+# PROFILER_MAX_FILES only.
+PROFILER_ENABLED = True
+PROFILER_INTERVAL = 0.001
+PROFILER_DIR = BASE_DIR / 'profiles'
+PROFILER_MAX_FILES = 200
+
+# Prometheus metrics at /metrics (apps/core/metrics.py). With several
+# worker processes, point PROMETHEUS_MULTIPROC_DIR (env) at a directory
+# shared by them and emptied at deploy; each worker writes its samples
+# there from a background thread every METRICS_FLUSH_INTERVAL seconds.
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # INFO logs every request; WARNING only the N+1 ones.
+        'apps.core.sql': {
+            'handlers': ['console'],
+            'level': os.getenv('SQL_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Catalog response cache (see apps/catalog/cache.py). Entries are also
+# invalidated by per-model version tags, the timeout only bounds memory.
+CATALOG_RESPONSE_CACHE = True
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 300
+# The taxonomy payload (apps/catalog/taxonomy.py) is keyed by its version
+# hash, so it is kept far longer; None keeps it until evicted.
+CATALOG_TAXONOMY_TIMEOUT = 7 * 24 * 3600
+# ETag / Last-Modified headers and 304s on the same catalog views.
+CATALOG_CONDITIONAL_GET = True
+# Render product/variant/image responses through the compiled serializers
+# (apps/catalog/serializers/compiled.py); False falls back to plain DRF.
+CATALOG_COMPILED_SERIALIZERS = True
+# Reviews embedded in product detail; the rest are paged from
+# /api/catalog/products/<id>/reviews/.
+CATALOG_DETAIL_REVIEWS = 5
+# /products/<id>/availability/ reports up to this many units as "low".
+CATALOG_LOW_STOCK = 5
+# Most product ids per wishlist membership / bulk add / bulk remove call.
+CATALOG_WISHLIST_BATCH = 100
+# ?ordering=popularity (apps/catalog/popularity.py): units sold plus
+# wishlist adds, weighing half as much every HALF_LIFE days. Stored
+# scores are relative to the epoch and double every half-life; floats
+# overflow after ~1000 of them, so move the epoch forward (then run
+# `manage.py compact_popularity`) every decade or so.
+CATALOG_POPULARITY_EPOCH = '2026-01-01'
+CATALOG_POPULARITY_HALF_LIFE = 14
+CATALOG_POPULARITY_WISHLIST_WEIGHT = 0.5
+
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Resized product image renditions (apps/catalog/images.py), served as
+# srcset on product images and cards. With ..._ON_UPLOAD an upload is
+# rendered on a background thread after commit; without it, only by
+# `manage.py generate_image_derivatives` (run it from cron). "avif" can
+# be added to the formats where Pillow is built with AVIF support.
+CATALOG_IMAGE_WIDTHS = (200, 400, 800, 1600)
+CATALOG_IMAGE_FORMATS = ('webp', 'jpeg')
+CATALOG_IMAGE_DERIVATIVES_ON_UPLOAD = True
+
+# In-process product search index (see apps/catalog/search.py).
+# `manage.py rebuild_search_index` writes the snapshot workers load.
+# A worker's index older than SEARCH_INDEX_MAX_AGE seconds is reloaded
+# from a fresher snapshot or rebuilt, so writes made by other workers
+# show up in ?search= within that time.
+SEARCH_INDEX_PATH = BASE_DIR / 'search_index.pickle'
+SEARCH_INDEX_MAX_AGE = 300
+# Matches returned per search; responses say `"search_truncated": true`
+# when there were more (their `count` is then this cap).
+SEARCH_MAX_RESULTS = 1000
+SEARCH_RANKED_RESULTS = 100
+
+# Bitmap index for the product facet filters (apps/catalog/facet_index.py).
+# Each worker rebuilds it when another worker's write bumps the catalog
+# cache version tags, and at the latest after FACET_INDEX_MAX_AGE
+# seconds; larger matches fall back to SQL joins.
+FACET_INDEX = True
+FACET_INDEX_MAX_AGE = 300
+FACET_INDEX_MAX_IDS = 10000
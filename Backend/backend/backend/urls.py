@@ -19,12 +19,16 @@ from django.urls import path,include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from apps.core.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/',include('apps.auth_app.urls',namespace='auth_app')),
     path("api/catalog/", include("apps.catalog.urls")),
     path("api/carts/", include("apps.carts.urls")),
     path("api/orders/", include("apps.orders.urls")),
+    path("api/profiles/", include("apps.core.urls")),
+    path("metrics", metrics_view, name="metrics"),
     # path("api/accounts/", include("apps.accounts.urls")),
 ]
 